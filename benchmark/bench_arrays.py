@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :bench_arrays
+"""
+import timeit
+
+import payloads
+from okex_restful_api.arrays import (depth_to_arrays, kline_to_records,
+                                     trades_to_records)
+
+N = 200
+
+
+def depth_dicts(resp):
+    asks = sorted((float(p), float(s)) for p, s in resp['asks'])
+    bids = sorted(((float(p), float(s)) for p, s in resp['bids']),
+                  reverse=True)
+    return asks, bids
+
+
+def kline_dicts(resp):
+    return [dict(ts=int(b[0]), open=float(b[1]), high=float(b[2]),
+                 low=float(b[3]), close=float(b[4]), volume=float(b[5]))
+            for b in resp]
+
+
+def trades_dicts(resp):
+    return [dict(tid=t['tid'], price=float(t['price']),
+                 amount=float(t['amount']), side=t['type']) for t in resp]
+
+
+cases = [('depth 200', payloads.depth(), depth_dicts, depth_to_arrays),
+         ('trades 600', payloads.trades(), trades_dicts, trades_to_records),
+         ('kline 2000', payloads.kline(), kline_dicts, kline_to_records)]
+
+
+
+def depth_notional_dicts(resp):
+    asks, bids = depth_dicts(resp)
+    return sum(p * s for p, s in asks) + sum(p * s for p, s in bids)
+
+
+def depth_notional_numpy(resp):
+    book = depth_to_arrays(resp)
+    return sum(float(side[:, 0] @ side[:, 1]) for side in book.values())
+
+
+def trades_vwap_dicts(resp):
+    rows = trades_dicts(resp)
+    volume = sum(r['amount'] for r in rows)
+    return sum(r['price'] * r['amount'] for r in rows) / volume
+
+
+def trades_vwap_numpy(resp):
+    rec = trades_to_records(resp)
+    return float(rec.price @ rec.amount / rec.amount.sum())
+
+
+def kline_range_dicts(resp):
+    rows = kline_dicts(resp)
+    return max(r['high'] for r in rows) - min(r['low'] for r in rows)
+
+
+def kline_range_numpy(resp):
+    rec = kline_to_records(resp)
+    return float(rec.high.max() - rec.low.min())
+
+
+def report(title, cases):
+    print(title)
+    print('%-12s %12s %12s %8s' % ('payload', 'dict us', 'numpy us',
+                                   'ratio'))
+    for name, resp, py, np_ in cases:
+        t_py = min(timeit.repeat(lambda: py(resp), number=N, repeat=3)) / N
+        t_np = min(timeit.repeat(lambda: np_(resp), number=N, repeat=3)) / N
+        print('%-12s %12.1f %12.1f %7.1fx' % (name, t_py * 1e6, t_np * 1e6,
+                                              t_py / t_np))
+
+
+report('decode only', cases)
+report('decode + aggregate', [
+    ('depth 200', cases[0][1], depth_notional_dicts, depth_notional_numpy),
+    ('trades 600', cases[1][1], trades_vwap_dicts, trades_vwap_numpy),
+    ('kline 2000', cases[2][1], kline_range_dicts, kline_range_numpy)])
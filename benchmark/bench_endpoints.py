@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :bench_endpoints
+"""
+import os
+import sys
+import time
+import tempfile
+import timeit
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+import payloads
+from okex_restful_api import FutureApi, SpotApi, HttpSession
+from okex_restful_api.api_utils import (rest_api, set_domain, json_codec,
+                                        Signer, Response, RecordingTransport,
+                                        ReplayTransport, ReplayServer)
+from okex_restful_api.api_utils.api_base import DEFAULT_DOMAIN
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+THREADS = 4
+api_key = 'a2f1c2b6-0c36-4b1e-9f3e-2f1c6f2d3a4b'
+secret_key = '3F5E1A2B4C6D8E0F1A2B3C4D5E6F7A8B'
+
+ORDER = dict(order_id=20914907, result=True)
+ORDERS = dict(orders=[dict(order_id=20914907 + i, status=0, deal_amount=0,
+                           price=8400.0, amount=1) for i in range(20)],
+              result=True)
+
+# {(市场, 接口名): (调用, 响应)}
+CALLS = {
+    ('spot', 'ticker'): (lambda s: s.ticker('btc_usdt'),
+                         dict(date='1521510000',
+                              ticker=dict(buy='8412.33', last='8413.02'))),
+    ('spot', 'depth'): (lambda s: s.depth('btc_usdt', 200),
+                        payloads.depth()),
+    ('spot', 'trades'): (lambda s: s.trades('btc_usdt'), payloads.trades()),
+    ('spot', 'kline'): (lambda s: s.kline('btc_usdt', '1min'),
+                        payloads.kline()),
+    ('spot', 'userinfo'): (lambda s: s.userinfo(),
+                           dict(info=dict(funds=dict(free=dict(btc='1')))),
+                           ),
+    ('spot', 'trade'): (lambda s: s.trade('btc_usdt', 'buy', price=8400,
+                                          amount=1), ORDER),
+    ('spot', 'batch_trade'): (
+        lambda s: s.batch_trade('btc_usdt',
+                                "[{price:8400,amount:1,type:'buy'}]"),
+        dict(order_info=[ORDER], result=True)),
+    ('spot', 'cancel_order'): (lambda s: s.cancel_order('btc_usdt',
+                                                        20914907), ORDER),
+    ('spot', 'order_info'): (lambda s: s.order_info('btc_usdt', 20914907),
+                             ORDERS),
+    ('spot', 'orders_info'): (lambda s: s.orders_info('btc_usdt', '1,2', 0),
+                              ORDERS),
+    ('spot', 'order_history'): (lambda s: s.order_history('btc_usdt', 0, 1,
+                                                          200),
+                                dict(ORDERS, total=20)),
+    ('spot', 'withdraw'): (lambda s: s.withdraw('btc_usd', 0.002, 'pwd',
+                                                'addr', 0.1, 'address'),
+                           dict(withdraw_id=301, result=True)),
+    ('spot', 'cancel_withdraw'): (lambda s: s.cancel_withdraw('btc_usd', 301),
+                                  dict(withdraw_id=301, result=True)),
+    ('spot', 'withdraw_info'): (lambda s: s.withdraw_info('btc_usd', 301),
+                                dict(withdraw=[dict(withdraw_id=301)],
+                                     result=True)),
+    ('spot', 'account_records'): (
+        lambda s: s.account_records('btc_usd', 0, 1, 50),
+        dict(records=[dict(addr='a', amount=0.1, status=1)] * 50,
+             symbol='btc_usd')),
+    ('future', 'ticker'): (lambda f: f.ticker('btc_usd', 'quarter'),
+                           dict(date='1521510000',
+                                ticker=dict(buy='8412.33', last='8413.02'))),
+    ('future', 'depth'): (lambda f: f.depth('btc_usd', 'quarter', 200),
+                          payloads.depth()),
+    ('future', 'trades'): (lambda f: f.trades('btc_usd', 'quarter'),
+                           payloads.trades()),
+    ('future', 'index'): (lambda f: f.index('btc_usd'),
+                          dict(future_index=8410.2)),
+    ('future', 'exchange_rate'): (lambda f: f.exchange_rate(),
+                                  dict(rate=6.32)),
+    ('future', 'estimated_price'): (lambda f: f.estimated_price('btc_usd'),
+                                    dict(forecast_price=8411.1)),
+    ('future', 'kline'): (lambda f: f.kline('btc_usd', '1min', 'quarter'),
+                          payloads.kline()),
+    ('future', 'hold_amount'): (lambda f: f.hold_amount('btc_usd',
+                                                        'quarter'),
+                                [dict(amount=1520334,
+                                      contract_name='BTC0330')]),
+    ('future', 'price_limit'): (lambda f: f.price_limit('btc_usd',
+                                                        'quarter'),
+                                dict(high=8650.0, low=8150.0)),
+    ('future', 'userinfo'): (lambda f: f.userinfo(),
+                             dict(info=dict(btc=dict(account_rights=1)),
+                                  result=True)),
+    ('future', 'position'): (lambda f: f.position('btc_usd', 'quarter'),
+                             dict(holding=[dict(buy_amount=1)],
+                                  result=True)),
+    ('future', 'trade'): (lambda f: f.trade('btc_usd', 'quarter', 8400, 1,
+                                            1), ORDER),
+    ('future', 'trades_history'): (
+        lambda f: f.trades_history('btc_usd', '2018-03-20', 0),
+        payloads.trades()),
+    ('future', 'batch_trade'): (
+        lambda f: f.batch_trade('btc_usd', 'quarter',
+                                '[{price:8400,amount:1,type:1}]'),
+        dict(order_info=[ORDER], result=True)),
+    ('future', 'cancel'): (lambda f: f.cancel('20914907', 'btc_usd',
+                                              'quarter'), ORDER),
+    ('future', 'order_info'): (lambda f: f.order_info('btc_usd', 'quarter',
+                                                      1), ORDERS),
+    ('future', 'orders_info'): (lambda f: f.orders_info('btc_usd', 'quarter',
+                                                        '1,2'), ORDERS),
+    ('future', 'userinfo_4fix'): (lambda f: f.userinfo_4fix(),
+                                  dict(info=dict(btc=dict(balance=1)),
+                                       result=True)),
+    ('future', 'position_4fix'): (lambda f: f.position_4fix('btc_usd',
+                                                            'quarter'),
+                                  dict(holding=[dict(buy_amount=1)],
+                                       result=True)),
+    ('future', 'explosive'): (lambda f: f.explosive('btc_usd', 'quarter',
+                                                    status=1),
+                              dict(data=[dict(amount=1, price=8000)] * 50)),
+    ('future', 'devolve'): (lambda f: f.devolve('btc_usd', 1, 1),
+                            dict(result=True)),
+}
+
+
+def endpoints():
+    for market in ('spot', 'future'):
+        for name, url in sorted(getattr(rest_api, market).urls.items()):
+            yield market, name, url
+
+
+class PathTransport:
+    """
+    按路径返回固定响应, 用于生成回放记录
+    """
+
+    def __init__(self, bodies):
+        self.bodies = bodies
+        self.posts = dict()
+
+    def get(self, url, headers=None, timeout=None):
+        return Response(self.bodies[urlsplit(url).path])
+
+    def post(self, url, params=None, headers=None, timeout=None):
+        path = urlsplit(url).path
+        self.posts[path] = {k: v for k, v in params.items() if k != 'sign'}
+        return Response(self.bodies[path])
+
+
+def clients(session):
+    return dict(spot=SpotApi(api_key, secret_key, session=session),
+                future=FutureApi(api_key, secret_key, session=session))
+
+
+def per_call_us(fn, n):
+    return min(timeit.repeat(fn, number=n, repeat=3)) / n * 1e6
+
+
+def throughput(fn, n, threads=THREADS):
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        start = time.perf_counter()
+        for _ in executor.map(lambda _: fn(), range(n)):
+            pass
+    return n / (time.perf_counter() - start)
+
+
+missing = [(m, name) for m, name, _ in endpoints() if (m, name) not in CALLS]
+assert not missing, 'no benchmark for %s' % missing
+
+bodies = {urlsplit(url).path: payloads.encoded(CALLS[m, name][1])
+          for m, name, url in endpoints()}
+
+# 1. 录制一遍所有接口, 再从记录文件回放
+path = os.path.join(tempfile.mkdtemp(), 'okex.jsonl.gz')
+fake = PathTransport(bodies)
+with RecordingTransport(fake, path) as recorder:
+    api = clients(recorder)
+    for (market, name), (call, _) in CALLS.items():
+        call(api[market])
+replay = ReplayTransport(path=path)
+signer = Signer(api_key, secret_key)
+
+print('python %s, json %s, %d recorded calls in %d bytes'
+      % (sys.version.split()[0], json_codec.name, recorder.count,
+         os.path.getsize(path)))
+print('%-24s %10s %9s %9s %9s %9s %10s' % (
+    'endpoint', 'bytes', 'call us', 'sign us', 'decode us', 'other us',
+    'net req/s'))
+
+# 2. 进程内回放: 每次调用的开销, 签名和解析各自的耗时
+api = clients(replay)
+rows = []
+for market, name, url in endpoints():
+    call = CALLS[market, name][0]
+    body = bodies[urlsplit(url).path]
+    n = max(20, N * 200 // len(body)) if len(body) > 200 else N
+    total = per_call_us(lambda: call(api[market]), n)
+    decode = per_call_us(lambda: json_codec.loads(body), n)
+    params = fake.posts.get(urlsplit(url).path)
+    sign = per_call_us(lambda: signer.sign_params(dict(params)), n) \
+        if params else 0.0
+    rows.append([market + '.' + name, len(body), total, sign, decode,
+                 max(0.0, total - sign - decode)])
+assert not replay.misses
+
+# 3. 通过本地回放服务的吞吐量
+with ReplayServer(replay) as server, \
+        HttpSession(pool_maxsize=THREADS) as session:
+    set_domain(server.url)
+    api = clients(session)
+    for row, (market, name, _) in zip(rows, endpoints()):
+        call = CALLS[market, name][0]
+        row.append(throughput(lambda: call(api[market]), max(50, N // 10)))
+    set_domain(DEFAULT_DOMAIN)
+
+for row in rows:
+    print('%-24s %10d %9.1f %9.1f %9.1f %9.1f %10.0f' % tuple(row))
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :bench_import
+"""
+import os
+import sys
+import subprocess
+
+from stub_server import StubServer
+
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 每个用例在新进程中执行, 输出耗时(ms)和已加载的重量级模块
+CASES = [
+    ('import okex_restful_api', 'import okex_restful_api'),
+    ('import + OkexApi', 'from okex_restful_api import OkexApi\n'
+                         'OkexApi("k", "s")'),
+    ('import + first request',
+     'from okex_restful_api import FutureApi, api_utils\n'
+     'api_utils.set_domain(%(url)r)\n'
+     'FutureApi().ticker("btc_usd", "quarter")'),
+    ('import requests', 'import requests'),
+]
+
+TEMPLATE = '''
+import sys, time
+start = time.perf_counter()
+%s
+elapsed = (time.perf_counter() - start) * 1000
+heavy = [m for m in ('requests', 'asyncio', 'http.server', 'orjson')
+         if m in sys.modules]
+print('%%.2f %%s' %% (elapsed, ','.join(heavy) or '-'))
+'''
+
+
+def run(code):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    out = subprocess.check_output([sys.executable, '-c', TEMPLATE % code],
+                                  env=env)
+    elapsed, heavy = out.decode().split()
+    return float(elapsed), heavy
+
+
+with StubServer(tls=False) as server:
+    print('python %s, best/median of %d fresh processes'
+          % (sys.version.split()[0], RUNS))
+    print('%-26s %9s %9s  %s' % ('case', 'best ms', 'median ms',
+                                 'loaded'))
+    for name, code in CASES:
+        results = sorted(run(code % dict(url=server.url))
+                         for _ in range(RUNS))
+        print('%-26s %9.1f %9.1f  %s' % (name, results[0][0],
+                                         results[len(results) // 2][0],
+                                         results[0][1]))
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :bench_json
+"""
+import json
+import timeit
+
+import payloads
+from okex_restful_api.api_utils import json_codec
+
+N = 200
+
+bodies = [('depth 200', payloads.encoded(payloads.depth())),
+          ('trades 600', payloads.encoded(payloads.trades())),
+          ('kline 2000', payloads.encoded(payloads.kline()))]
+
+decoders = [('text+json', lambda b: json.loads(b.decode('utf-8')))]
+for name in json_codec.PREFERENCE:
+    try:
+        decoders.append((name, json_codec.load_decoder(name)))
+    except ImportError:
+        print('%s not installed' % name)
+
+print('selected decoder: %s' % json_codec.name)
+print('%-12s %8s' % ('payload', 'bytes') +
+      ''.join('%12s' % n for n, _ in decoders) + '   (us per decode)')
+for title, body in bodies:
+    cols = []
+    for _, loads in decoders:
+        t = min(timeit.repeat(lambda: loads(body), number=N, repeat=3)) / N
+        cols.append('%12.1f' % (t * 1e6))
+    print('%-12s %8d' % (title, len(body)) + ''.join(cols))
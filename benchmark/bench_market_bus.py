@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :bench_market_bus
+"""
+import sys
+import time
+import threading
+import multiprocessing
+
+import numpy as np
+
+import payloads
+from stub_server import StubServer
+from okex_restful_api import FutureApi, HttpSession, api_utils
+from okex_restful_api.arrays import depth_to_arrays
+from okex_restful_api.market_bus import MarketBusPublisher, MarketBusReader
+
+LEVELS = 20
+DURATION = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+# 发布者每秒写入的次数
+RATE = 1000
+KEY = ('btc_usd', 'quarter')
+
+
+def http_latency(n=300):
+    """
+    现在每个策略进程各自请求depth的耗时
+    """
+    path = api_utils.rest_api.future.paths['depth']
+    body = payloads.encoded(payloads.depth(LEVELS))
+    with StubServer(tls=False, payloads={path: body}) as server:
+        api_utils.set_domain(server.url)
+        api = FutureApi(session=HttpSession())
+        api.depth(*KEY, LEVELS)
+        times = []
+        for _ in range(n):
+            start = time.perf_counter()
+            api.depth(*KEY, LEVELS)
+            times.append(time.perf_counter() - start)
+    return np.percentile(times, [50, 99]) * 1e6
+
+
+def publish(publisher, stop):
+    books = [depth_to_arrays(payloads.depth(LEVELS, mid))
+             for mid in (8400.0, 8401.0)]
+    i = 0
+    while not stop.is_set():
+        publisher.publish_depth(*KEY, books[i % 2])
+        i += 1
+        time.sleep(1.0 / RATE)
+
+
+def reader(name, duration, queue):
+    with MarketBusReader(name) as bus:
+        times, stale = [], []
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            start = time.perf_counter_ns()
+            book = bus.depth(*KEY)
+            times.append(time.perf_counter_ns() - start)
+            stale.append(time.time() * 1000 - book['ts'])
+            # 读的是一致的快照: 两边的档位来自同一次写入
+            assert book['asks'][0, 0] - book['bids'][0, 0] < 0.03
+        queue.put((len(times), np.percentile(times, [50, 99]) / 1000,
+                   np.median(stale)))
+
+
+def fanout(name, processes):
+    queue = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=reader,
+                                     args=(name, DURATION, queue))
+             for _ in range(processes)]
+    for p in procs:
+        p.start()
+    results = [queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+    reads = sum(r[0] for r in results)
+    p50 = np.median([r[1][0] for r in results])
+    p99 = np.max([r[1][1] for r in results])
+    stale = np.median([r[2] for r in results])
+    return reads / DURATION, p50, p99, stale
+
+
+if __name__ == '__main__':
+    print('python %s, numpy %s, depth %d levels, publisher %d writes/s'
+          % (sys.version.split()[0], np.__version__, LEVELS, RATE))
+    p50, p99 = http_latency()
+    print('http depth per process: p50 %.0fus p99 %.0fus, '
+          'exchange load x processes' % (p50, p99))
+    with MarketBusPublisher(depths=[KEY], levels=LEVELS) as publisher:
+        stop = threading.Event()
+        thread = threading.Thread(target=publish, args=(publisher, stop))
+        thread.start()
+        time.sleep(0.1)
+        print('%-10s %12s %10s %10s %12s' % ('readers', 'reads/s',
+                                             'p50 us', 'p99 us',
+                                             'stale ms'))
+        for n in (1, 2, 4, 8, 16):
+            if n > 2 * multiprocessing.cpu_count():
+                break
+            rate, p50, p99, stale = fanout(publisher.name, n)
+            print('%-10d %12.0f %10.2f %10.2f %12.2f'
+                  % (n, rate, p50, p99, stale))
+        stop.set()
+        thread.join()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :bench_models
+"""
+import gc
+import sys
+import json
+import time
+import tracemalloc
+
+import payloads
+from okex_restful_api.models import orders_objects
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+
+def notional_dicts(orders):
+    return sum(float(o['price']) * float(o['deal_amount']) for o in orders)
+
+
+def notional_objects(orders):
+    return sum(o.price * o.deal_amount for o in orders)
+
+
+def retained(decode, data):
+    """
+    :return: 解析结果常驻的字节数, 解析过程中的峰值字节数
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = decode(data)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, peak
+
+
+def parsed(data):
+    orders = orders_objects(json.loads(data))['orders']
+    notional_objects(orders)
+    return orders
+
+
+def timed(func, *args):
+    best = None
+    for _ in range(3):
+        gc.collect()
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def report(strings):
+    data = payloads.encoded(payloads.orders(N, strings=strings))
+    dicts = json.loads(data)['orders']
+    objects = orders_objects(json.loads(data))['orders']
+    print('\n%d orders, %s numerics, %.1f MB json'
+          % (N, 'string' if strings else 'number', len(data) / 1e6))
+
+    print('%-24s %12s %12s' % ('memory', 'retained MB', 'peak MB'))
+    for name, decode in (
+            ('dict', lambda d: json.loads(d)['orders']),
+            ('object, not accessed',
+             lambda d: orders_objects(json.loads(d))['orders']),
+            ('object, accessed', parsed)):
+        current, peak = retained(decode, data)
+        print('%-24s %12.1f %12.1f' % (name, current / 1e6, peak / 1e6))
+
+    print('%-24s %12s %12s' % ('time', 'dict ms', 'object ms'))
+    rows = (('decode', lambda: json.loads(data)['orders'],
+             lambda: orders_objects(json.loads(data))['orders']),
+            # 每次重新解码, 第一次访问包含字段转换
+            ('decode + 1st pass', lambda: notional_dicts(
+                json.loads(data)['orders']), lambda: notional_objects(
+                orders_objects(json.loads(data))['orders'])),
+            # 已转换过的对象只是slot读取
+            ('later pass', lambda: notional_dicts(dicts),
+             lambda: notional_objects(objects)))
+    for name, by_dict, by_object in rows:
+        print('%-24s %12.1f %12.1f' % (name, timed(by_dict) * 1000,
+                                       timed(by_object) * 1000))
+
+
+if __name__ == '__main__':
+    print('python %s' % sys.version.split()[0])
+    report(strings=False)
+    report(strings=True)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :bench_session
+"""
+import sys
+import time
+
+import requests
+
+from stub_server import StubServer
+from okex_restful_api import HttpSession
+from okex_restful_api.api_utils import http_get
+
+N = 500
+
+
+def per_call(fn, n=N):
+    fn()
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1000
+
+
+with StubServer() as server:
+    resource = server.url + '/api/v1/future_ticker.do'
+    # 每次新建连接, 等同于原先的requests.get
+    cold = per_call(lambda: requests.get(
+        resource + '?symbol=btc_usd&contract_type=this_week').json())
+
+    # 通过共享会话复用连接
+    with HttpSession(pool_maxsize=4) as session:
+        warm = per_call(lambda: http_get(resource, session=session,
+                                         symbol='btc_usd',
+                                         contract_type='this_week'))
+
+print('python %s, %d calls over https' % (sys.version.split()[0], N))
+print('requests.get per call:  %.3f ms' % cold)
+print('HttpSession per call:   %.3f ms' % warm)
+print('speedup:                %.1fx' % (cold / warm))
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :bench_sign
+"""
+import timeit
+
+from okex_restful_api.api_utils import (Signer, build_api_sign,
+                                        build_param_with_sign)
+
+N = 20000
+api_key = 'a2f1c2b6-0c36-4b1e-9f3e-2f1c6f2d3a4b'
+secret_key = '3F5E1A2B4C6D8E0F1A2B3C4D5E6F7A8B'
+signer = Signer(api_key, secret_key)
+
+
+def trade_param():
+    return dict(symbol='btc_usd', contract_type='this_week', price=8412.33,
+                amount=3, type=1, api_key=api_key, lever_rate=20)
+
+
+def order_info_param():
+    return dict(symbol='btc_usd', contract_type='quarter', status=1,
+                order_id=-1, api_key=api_key, current_page=1,
+                page_length=50)
+
+
+cases = [
+    ('trade', lambda: build_param_with_sign(trade_param(), secret_key),
+     lambda: signer.sign_params(trade_param())),
+    ('order_info', lambda: build_param_with_sign(order_info_param(),
+                                                 secret_key),
+     lambda: signer.sign_params(order_info_param())),
+    ('userinfo', lambda: build_api_sign(api_key, secret_key),
+     signer.api_sign),
+]
+
+print('%-12s %14s %14s %8s' % ('params', 'before sign/s', 'after sign/s',
+                               'ratio'))
+for name, before, after in cases:
+    assert before() == after(), name
+    t0 = min(timeit.repeat(before, number=N, repeat=3)) / N
+    t1 = min(timeit.repeat(after, number=N, repeat=3)) / N
+    print('%-12s %14.0f %14.0f %7.1fx' % (name, 1 / t0, 1 / t1, t0 / t1))
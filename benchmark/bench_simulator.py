@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :bench_simulator
+"""
+import os
+import sys
+import time
+import random
+import threading
+import subprocess
+
+from okex_restful_api import FutureApi, HttpSession, Instrumentation, \
+    api_utils
+from okex_restful_api.simulator import Exchange, SimulatorTransport
+
+DURATION = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+THREADS = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+KEY = ('btc_usd', 'quarter')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def worker(api, stop, seed):
+    """
+    一个策略: 看行情, 在盘口附近下单, 查询后撤单
+    """
+    rnd = random.Random(seed)
+    while not stop.is_set():
+        ticker = api.ticker(*KEY)
+        api.depth(*KEY, 20)
+        if not ticker or 'ticker' not in ticker:
+            continue
+        price = round(ticker['ticker']['last'] + rnd.randint(-3, 3) * 0.1, 1)
+        resp = api.trade(*KEY, price, rnd.randint(1, 5), rnd.choice((1, 2)),
+                         lever_rate=10)
+        if not resp or not resp.get('result'):
+            continue
+        api.order_info(*KEY, 1, resp['order_id'])
+        api.cancel(resp['order_id'], *KEY)
+
+
+def accounts():
+    return [('key%d' % i, 'secret%d' % i) for i in range(THREADS)]
+
+
+def serve(*options):
+    """
+    在单独的进程中运行模拟交易所, 不与压测线程争抢GIL
+    :return: (进程, url)
+    """
+    args = [sys.executable, '-m', 'okex_restful_api.simulator', '--port',
+            '0'] + ['--account=%s:%s' % a for a in accounts()] + list(options)
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE,
+                            env=dict(os.environ, PYTHONPATH=ROOT))
+    return proc, proc.stdout.readline().decode().strip()
+
+
+def run(name, session):
+    instrument = Instrumentation()
+    apis = []
+    for i, (api_key, secret_key) in enumerate(accounts()):
+        apis.append(FutureApi(api_key, secret_key, session=session,
+                              instrument=instrument))
+    stop = threading.Event()
+    threads = [threading.Thread(target=worker, args=(api, stop, i))
+               for i, api in enumerate(apis)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(DURATION)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    stats = instrument.stats()
+    total = sum(s['requests'] for s in stats.values())
+    print('\n%s: %d threads, %.0f req/s' % (name, THREADS, total / elapsed))
+    print('%-34s %8s %9s %9s %9s  %s' % ('endpoint', 'requests', 'p50 ms',
+                                         'p99 ms', 'max ms', 'errors'))
+    for path, s in sorted(stats.items()):
+        print('%-34s %8d %9.2f %9.2f %9.2f  %s'
+              % (path, s['requests'], s['p50'] * 1000, s['p99'] * 1000,
+                 s['max'] * 1000, s['errors'] or '-'))
+
+
+if __name__ == '__main__':
+    print('python %s, %.0fs per case' % (sys.version.split()[0], DURATION))
+    exchange = Exchange()
+    for api_key, secret_key in accounts():
+        exchange.add_account(api_key, secret_key)
+    run('in-process', SimulatorTransport(exchange))
+    for name, options in (('http', ()),
+                          ('http + 2ms+exp(3ms) latency, 1% errors',
+                           ('--latency=0.002', '--jitter=0.003',
+                            '--error-rate=0.01', '--seed=7'))):
+        proc, url = serve(*options)
+        try:
+            api_utils.set_domain(url)
+            with HttpSession(pool_maxsize=THREADS) as session:
+                run(name, session)
+        finally:
+            proc.terminate()
+            proc.wait()
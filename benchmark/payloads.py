@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :payloads
+"""
+import json
+import random
+
+random.seed(7)
+
+
+def depth(size=200, mid=8400.0):
+    asks = [[round(mid + 0.01 * (i + 1), 2), random.randint(1, 500)]
+            for i in range(size)][::-1]
+    bids = [[round(mid - 0.01 * (i + 1), 2), random.randint(1, 500)]
+            for i in range(size)]
+    return dict(asks=asks, bids=bids)
+
+
+def trades(n=600, tid=2300000000, ms=1521510000000):
+    return [dict(amount='%.3f' % random.random(), date=(ms + i) // 1000,
+                 date_ms=ms + i, price='%.2f' % (8400 + random.random()),
+                 tid=tid + i, type=random.choice(('buy', 'sell')))
+            for i in range(n)]
+
+
+def kline(n=2000, ts=1521510000000):
+    return [[ts + 60000 * i, 8400.0 + i, 8401.0 + i, 8399.0 + i,
+             8400.5 + i, 1520.0, 0.18] for i in range(n)]
+
+
+def orders(n=100000, order_id=1000000, ms=1521510000000, strings=False):
+    """
+    :param strings: True时数值字段为字符串
+    :return: future order_info接口返回
+    """
+    num = str if strings else float
+    return dict(orders=[dict(
+        amount=num(random.randint(1, 50)), contract_name='BTC0330',
+        create_date=ms + i, deal_amount=num(random.randint(0, 50)), fee=0,
+        lever_rate=10, order_id=order_id + i,
+        price=num(round(8400 + random.random(), 2)),
+        price_avg=num(round(8400 + random.random(), 2)),
+        status=random.choice((0, 1, 2, -1)), symbol='btc_usd',
+        type=random.randint(1, 4), unit_amount=100) for i in range(n)],
+        result=True)
+
+
+def encoded(payload):
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
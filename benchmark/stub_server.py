@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :stub_server
+"""
+import os
+import ssl
+import json
+import tempfile
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+TICKER = {'date': '1521510000',
+          'ticker': {'buy': '8412.33', 'contract_id': 201803300000013,
+                     'high': '8650.0', 'last': '8413.02', 'low': '8200.1',
+                     'sell': '8413.02', 'unit_amount': 100.0,
+                     'vol': '1520334'}}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    payload = json.dumps(TICKER).encode('utf-8')
+
+    def do_GET(self):
+        self.__reply()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        self.__reply()
+
+    def log_message(self, *args):
+        pass
+
+    def __reply(self):
+        body = self.server.payload_for(self.path) or self.payload
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    本地https桩服务, 所有路径返回固定的json
+    """
+    daemon_threads = True
+
+    def __init__(self, tls=True, payloads=None):
+        """
+        :param tls: 是否启用自签名证书的https
+        :param payloads: dict, {path: bytes}, 按路径返回不同内容
+        """
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.payloads = payloads or {}
+        self.cert_file = None
+        if tls:
+            self.cert_file = self.__make_cert()
+            ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            ctx.load_cert_chain(self.cert_file)
+            self.socket = ctx.wrap_socket(self.socket, server_side=True)
+
+    @property
+    def url(self):
+        scheme = 'https' if self.cert_file else 'http'
+        return '%s://127.0.0.1:%d' % (scheme, self.server_address[1])
+
+    def payload_for(self, path):
+        return self.payloads.get(path.split('?', 1)[0])
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        if self.cert_file:
+            # 让requests信任自签名证书
+            os.environ['REQUESTS_CA_BUNDLE'] = self.cert_file
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+    @staticmethod
+    def __make_cert():
+        path = os.path.join(tempfile.mkdtemp(), 'stub.pem')
+        subprocess.check_call(
+            ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+             '-days', '1', '-subj', '/CN=127.0.0.1',
+             '-addext', 'subjectAltName=IP:127.0.0.1',
+             '-keyout', path, '-out', path],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return path
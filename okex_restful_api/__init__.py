@@ -5,13 +5,104 @@
 @Author   : Xin Zhang
 """
 
+from .api_utils import (HttpSession, AsyncHttpSession, RateLimiter,
+                        ResponseCache, Instrumentation, PrometheusExporter,
+                        RetryPolicy, Retrier)
 from .future_api import FutureApi
 from .spot_api import SpotApi
+from .order_batcher import FutureOrderBatcher, SpotOrderBatcher
+from .order_tracker import FutureOrderTracker, SpotOrderTracker
+from .pagination import PageError
+from .order_book import OrderBook
+from .account_pool import AccountPool
+from .polling import PollingScheduler
+from .trade_tape import (TradeTape, SpotTradeCollector,
+                         FutureTradeCollector)
+from .account_state import AccountState
 
 
 class OkexApi:
-    __slots__ = ['future', 'spot']
+    __slots__ = ['future', 'spot', 'session', 'rate_limiter', 'cache',
+                 'instrument', 'retrier']
 
-    def __init__(self, api_key, secret_key):
-        self.future = FutureApi(api_key, secret_key)
-        self.spot = SpotApi(api_key, secret_key)
+    def __init__(self, api_key, secret_key, session=None, rate_limiter=None,
+                 cache=None, result_type=None, instrument=None,
+                 retrier=None):
+        """
+        :param api_key: api_key
+        :param secret_key: secret_key
+        :param session: HttpSession, future和spot共用, 为None时使用默认会话
+        :param rate_limiter: RateLimiter, future和spot共用, None为不限流
+        :param cache: ResponseCache, future和spot共用, None为不缓存
+        :param result_type: None返回原始json, numpy见arrays.py,
+                            object见models.py
+        :param instrument: Instrumentation, future和spot共用, None为不统计
+        :param retrier: Retrier, future和spot共用, None为默认重试配置
+        """
+        self.session = session
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.instrument = instrument
+        self.retrier = retrier
+        self.future = FutureApi(api_key, secret_key, session, rate_limiter,
+                                cache, result_type, instrument, retrier)
+        self.spot = SpotApi(api_key, secret_key, session, rate_limiter, cache,
+                            result_type, instrument, retrier)
+
+
+class AsyncOkexApi:
+    __slots__ = ['future', 'spot', 'session', 'rate_limiter', 'cache',
+                 'instrument', 'retrier', '__own_session']
+
+    def __init__(self, api_key, secret_key, session=None, rate_limiter=None,
+                 cache=None, result_type=None, instrument=None,
+                 retrier=None):
+        """
+        :param api_key: api_key
+        :param secret_key: secret_key
+        :param session: AsyncHttpSession, 为None时新建一个, close时一并关闭
+        :param rate_limiter: RateLimiter, future和spot共用, None为不限流
+        :param cache: ResponseCache, future和spot共用, None为不缓存
+        :param result_type: None返回原始json, numpy见arrays.py,
+                            object见models.py
+        :param instrument: Instrumentation, future和spot共用, None为不统计
+        :param retrier: Retrier, future和spot共用, None为默认重试配置
+        """
+        from .async_api import AsyncFutureApi, AsyncSpotApi
+        self.__own_session = session is None
+        self.session = session or AsyncHttpSession()
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.instrument = instrument
+        self.retrier = retrier
+        self.future = AsyncFutureApi(api_key, secret_key, self.session,
+                                     rate_limiter, cache, result_type,
+                                     instrument, retrier)
+        self.spot = AsyncSpotApi(api_key, secret_key, self.session,
+                                 rate_limiter, cache, result_type, instrument,
+                                 retrier)
+
+    async def close(self):
+        if self.__own_session:
+            await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+
+# 用到时才加载的模块(asyncio等), {名称: 模块}
+_LAZY = dict(AsyncFutureApi='.async_api', AsyncSpotApi='.async_api')
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError('module %r has no attribute %r'
+                             % (__name__, name))
+    import importlib
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :account_pool
+"""
+import threading
+from collections import OrderedDict
+
+from .api_utils import (HttpSession, RateLimiter, ResponseCache,
+                        run_concurrently)
+from .future_api import FutureApi
+from .models import Model
+from .spot_api import SpotApi
+
+
+class Account:
+    """
+    一个api_key的future/spot客户端
+    """
+    __slots__ = ['name', 'api_key', 'future', 'spot']
+
+    def __init__(self, name, api_key, future, spot):
+        self.name = name
+        self.api_key = api_key
+        self.future = future
+        self.spot = spot
+
+
+class AccountPool:
+    """
+    多个账户共用一个连接池/行情缓存/请求统计;
+    签名和限流按api_key分开(RateLimiter按(api_key, url)分别计数)
+    """
+
+    def __init__(self, accounts=None, session=None, rate_limiter=None,
+                 cache=None, result_type=None, instrument=None, retrier=None,
+                 max_workers=32):
+        """
+        :param accounts: dict, {账户名: (api_key, secret_key)}
+        :param session: HttpSession, None时新建一个连接数为max_workers的会话,
+                        close时只关闭新建的会话
+        :param rate_limiter: RateLimiter, None时新建一个
+        :param cache: ResponseCache, 公共行情缓存, None时新建一个
+        :param max_workers: 批量请求的线程数
+        """
+        self.__own_session = session is None
+        self.session = session or HttpSession(pool_maxsize=max_workers)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.cache = cache or ResponseCache()
+        self.result_type = result_type
+        self.instrument = instrument
+        self.retrier = retrier
+        self.max_workers = max_workers
+        self.__accounts = OrderedDict()
+        self.__lock = threading.Lock()
+        # 不需要签名的行情请求
+        self.market = self.__build(None, None, None)
+        for name, (api_key, secret_key) in (accounts or {}).items():
+            self.add(name, api_key, secret_key)
+
+    def add(self, name, api_key, secret_key):
+        """
+        :return: Account
+        """
+        account = self.__build(name, api_key, secret_key)
+        with self.__lock:
+            self.__accounts[name] = account
+        return account
+
+    def remove(self, name):
+        with self.__lock:
+            return self.__accounts.pop(name, None)
+
+    def __getitem__(self, name):
+        return self.__accounts[name]
+
+    def __contains__(self, name):
+        return name in self.__accounts
+
+    def __len__(self):
+        return len(self.__accounts)
+
+    def __iter__(self):
+        return iter(self.names())
+
+    def names(self):
+        with self.__lock:
+            return list(self.__accounts)
+
+    def call_all(self, func, names=None):
+        """
+        对每个账户并发调用
+        :param func: func(account), account为Account
+        :param names: 账户名列表, None为所有账户
+        :return: FanoutResult, {账户名: resp}, 失败的在errors中
+        """
+        with self.__lock:
+            accounts = [self.__accounts[name] for name in
+                        (names if names is not None else self.__accounts)]
+        jobs = {account.name: (lambda a=account: func(a))
+                for account in accounts}
+        return run_concurrently(jobs, self.max_workers)
+
+    def userinfo_all(self, market='future', names=None):
+        """
+        :param market: future 或 spot
+        :return: FanoutResult, {账户名: userinfo}
+        """
+        return self.call_all(lambda a: getattr(a, market).userinfo(), names)
+
+    def position_all(self, symbol, contract_type, names=None):
+        """
+        :return: FanoutResult, {账户名: 全仓持仓}
+        """
+        return self.call_all(lambda a: a.future.position(symbol,
+                                                         contract_type),
+                             names)
+
+    def holdings_all(self, symbol, contract_type, names=None):
+        """
+        所有账户的持仓合并为一个列表
+        :return: (list, errors), 每条holding加上account字段
+        """
+        result = self.position_all(symbol, contract_type, names)
+        holdings = [dict(holding.to_dict() if isinstance(holding, Model)
+                         else holding, account=name)
+                    for name, resp in result.items()
+                    for holding in resp.get('holding') or []]
+        return holdings, result.errors
+
+    def close(self):
+        if self.__own_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __build(self, name, api_key, secret_key):
+        shared = dict(session=self.session, rate_limiter=self.rate_limiter,
+                      cache=self.cache, result_type=self.result_type,
+                      instrument=self.instrument, retrier=self.retrier)
+        return Account(name, api_key, FutureApi(api_key, secret_key, **shared),
+                       SpotApi(api_key, secret_key, **shared))
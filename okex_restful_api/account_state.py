@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :account_state
+"""
+import time
+import logging
+import threading
+from functools import partial
+
+from .api_utils import is_error, endpoint_of
+from .api_utils.api_base import SPOT_PATHS, FUTURE_PATHS
+from .models import Model
+
+log = logging.getLogger(__name__)
+
+# 下单/撤单后需要刷新的数据: future 合约账户和对应持仓, spot 币币账户,
+# devolve 两边的账户
+MUTATIONS = {
+    FUTURE_PATHS['trade']: 'future',
+    FUTURE_PATHS['batch_trade']: 'future',
+    FUTURE_PATHS['cancel']: 'future',
+    FUTURE_PATHS['devolve']: 'devolve',
+    SPOT_PATHS['trade']: 'spot',
+    SPOT_PATHS['batch_trade']: 'spot',
+    SPOT_PATHS['cancel_order']: 'spot',
+}
+
+
+def flatten(value, prefix=()):
+    """
+    :return: dict, {字段路径: 值}; holding等列表按(contract_id, lever_rate)
+             索引, 不受顺序影响
+    """
+    out = dict()
+    if isinstance(value, Model):
+        value = value.to_dict()
+    if isinstance(value, dict):
+        for k, v in value.items():
+            if k != 'result':
+                out.update(flatten(v, prefix + (k,)))
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            key = i
+            if isinstance(item, (dict, Model)) and 'contract_id' in item:
+                key = (item['contract_id'], item.get('lever_rate'))
+            out.update(flatten(item, prefix + (key,)))
+    else:
+        out[prefix] = value
+    return out
+
+
+def diff(old, new):
+    """
+    :return: dict, {字段路径: (旧值, 新值)}, 新增/删除的字段一侧为None
+    """
+    changes = {k: (old.get(k), v) for k, v in new.items()
+               if old.get(k) != v}
+    changes.update({k: (v, None) for k, v in old.items() if k not in new})
+    return changes
+
+
+class _Source:
+    __slots__ = ['name', 'fetch', 'resp', 'fields', 'updated', 'dirty',
+                 'failures', 'next_attempt', 'lock']
+
+    def __init__(self, name, fetch):
+        self.name = name
+        self.fetch = fetch
+        self.resp = None
+        self.fields = dict()
+        self.updated = 0.0
+        # 需要刷新的时间, 0为不需要
+        self.dirty = 0.0
+        # 连续失败的次数, 失败后在next_attempt之前不再请求
+        self.failures = 0
+        self.next_attempt = 0.0
+        self.lock = threading.Lock()
+
+
+class AccountState:
+    """
+    账户/持仓的内存快照: 定时刷新, 自己的下单/撤单/划转之后立即刷新;
+    读取时超过max_age才同步请求; 只把变化的字段通知订阅者
+    """
+
+    def __init__(self, future_api=None, spot_api=None, positions=(),
+                 fixed=False, interval=10.0, max_age=30.0, debounce=0.2,
+                 retry_delay=1.0):
+        """
+        :param future_api: FutureApi, None为不跟踪合约账户
+        :param spot_api: SpotApi, None为不跟踪币币账户
+        :param positions: [(symbol, contract_type)], 跟踪的合约持仓
+        :param fixed: True时同时跟踪逐仓的userinfo_4fix/position_4fix
+        :param interval: 定时刷新的间隔(秒)
+        :param max_age: 读取时允许的最大数据年龄(秒)
+        :param debounce: 下单后等待的秒数, 合并连续下单触发的刷新
+        :param retry_delay: 刷新失败后第一次重试的等待秒数, 之后每次翻倍,
+                            最多等待interval
+        """
+        self.interval = interval
+        self.max_age = max_age
+        self.debounce = debounce
+        self.retry_delay = retry_delay
+        self.__sources = dict()
+        self.__callbacks = []
+        self.__cond = threading.Condition()
+        self.__stop = False
+        self.__thread = None
+        if future_api is not None:
+            self.__add('future_userinfo', future_api.userinfo)
+            if fixed:
+                self.__add('future_userinfo_4fix', future_api.userinfo_4fix)
+            for symbol, contract_type in positions:
+                self.__add(('future_position', symbol, contract_type),
+                           partial(future_api.position, symbol,
+                                   contract_type))
+                if fixed:
+                    self.__add(('future_position_4fix', symbol,
+                                contract_type),
+                               partial(future_api.position_4fix, symbol,
+                                       contract_type))
+        if spot_api is not None:
+            self.__add('spot_userinfo', spot_api.userinfo)
+
+    def attach(self, instrument):
+        """
+        在Instrumentation上注册钩子, 通过它发出的下单/撤单/划转会触发刷新
+        :param instrument: 与future_api/spot_api相同的Instrumentation
+        """
+        instrument.add_post_hook(self.on_response)
+
+    def subscribe(self, callback):
+        """
+        :param callback: callback(name, changes),
+                         changes为{字段路径: (旧值, 新值)}
+        """
+        self.__callbacks.append(callback)
+
+    def names(self):
+        return list(self.__sources)
+
+    def get(self, name, max_age=None):
+        """
+        :param name: future_userinfo future_userinfo_4fix spot_userinfo
+                     ('future_position', symbol, contract_type)
+                     ('future_position_4fix', symbol, contract_type)
+        :param max_age: 超过该秒数时先刷新, 默认为self.max_age
+        :return: 接口返回的dict, 获取失败时为上一次的结果
+        """
+        source = self.__sources[name]
+        max_age = self.max_age if max_age is None else max_age
+        now = time.monotonic()
+        if now - source.updated > max_age and now >= source.next_attempt:
+            self.refresh(name)
+        return source.resp
+
+    def age(self, name):
+        """
+        :return: 距上次成功刷新的秒数
+        """
+        return time.monotonic() - self.__sources[name].updated
+
+    def refresh(self, name):
+        """
+        立即刷新, 并通知变化的字段
+        :return: dict, 变化的字段
+        """
+        source = self.__sources[name]
+        with source.lock:
+            try:
+                resp = source.fetch()
+            except Exception:
+                log.exception('Refreshing %s failed', name)
+                self.__failed(source)
+                return {}
+            if is_error(resp):
+                self.__failed(source)
+                return {}
+            fields = flatten(resp)
+            changes = diff(source.fields, fields)
+            source.resp = resp
+            source.fields = fields
+            source.updated = time.monotonic()
+            source.dirty = 0.0
+            source.failures = 0
+            source.next_attempt = 0.0
+        if changes:
+            self.__publish(name, changes)
+        return changes
+
+    def invalidate(self, names, delay=None):
+        """
+        标记需要刷新, 后台线程在delay秒后刷新
+        """
+        due = time.monotonic() + (self.debounce if delay is None else delay)
+        with self.__cond:
+            for name in names:
+                source = self.__sources.get(name)
+                if source is not None and not source.dirty:
+                    source.dirty = due
+            self.__cond.notify()
+
+    def on_response(self, method, resource, params, result, error, elapsed):
+        """
+        Instrumentation的post hook
+        """
+        kind = MUTATIONS.get(endpoint_of(resource))
+        if kind is not None:
+            self.invalidate(self.__affected(kind, params))
+
+    def start(self):
+        self.__stop = False
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        with self.__cond:
+            self.__stop = True
+            self.__cond.notify()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __add(self, name, fetch):
+        self.__sources[name] = _Source(name, fetch)
+
+    def __affected(self, kind, params):
+        names = []
+        if kind in ('future', 'devolve'):
+            names += ['future_userinfo', 'future_userinfo_4fix']
+        if kind in ('spot', 'devolve'):
+            names.append('spot_userinfo')
+        if kind == 'future':
+            key = (params.get('symbol'), params.get('contract_type'))
+            names += [('future_position',) + key,
+                      ('future_position_4fix',) + key]
+        return names
+
+    def __run(self):
+        while True:
+            with self.__cond:
+                due = self.__due()
+                while not self.__stop and not due:
+                    self.__cond.wait(self.__wait())
+                    due = self.__due()
+                if self.__stop:
+                    return
+            for name in due:
+                self.refresh(name)
+
+    def __failed(self, source):
+        """
+        失败后按指数退避安排下一次请求, 避免后台线程连续请求
+        """
+        source.failures += 1
+        delay = min(self.interval,
+                    self.retry_delay * 2 ** (source.failures - 1))
+        source.next_attempt = time.monotonic() + delay
+        if source.dirty:
+            source.dirty = source.next_attempt
+
+    def __due(self):
+        now = time.monotonic()
+        return [name for name, s in self.__sources.items()
+                if now >= self.__deadline(s)]
+
+    def __wait(self):
+        now = time.monotonic()
+        deadlines = [self.__deadline(s) for s in self.__sources.values()]
+        return max(0.0, min(deadlines, default=now + self.interval) - now)
+
+    def __deadline(self, source):
+        due = source.updated + self.interval
+        if source.dirty:
+            due = min(due, source.dirty)
+        return max(due, source.next_attempt)
+
+    def __publish(self, name, changes):
+        for callback in self.__callbacks:
+            try:
+                callback(name, changes)
+            except Exception:
+                log.exception('Account callback %r failed', callback)
@@ -5,8 +5,36 @@
 @Author   : Xin Zhang
 """
 
-from .api_base import rest_api
+from .api_base import rest_api, endpoint_of, set_domain
+from .http_session import HttpSession, default_session
 from .http_utils import (build_my_sign, build_api_sign,
                          build_my_sign_with_api,
                          build_param_with_sign,
                          http_get, http_post)
+from .async_http_utils import (AsyncHttpSession,
+                               async_http_get, async_http_post)
+from .fanout import (FanoutResult, is_error,
+                     run_concurrently, gather_concurrently)
+from .rate_limit import TokenBucket, RateLimiter
+from .cache import ResponseCache
+from .json_codec import set_decoder as set_json_decoder
+from .signer import Signer
+from .instrument import Instrumentation, PrometheusExporter
+from .retry import RetryPolicy, Retrier, DeadlineExceeded, default_retrier
+from .rest_client import RestClient, AsyncRestClient
+
+# 用到时才加载的模块, {名称: 模块}
+_LAZY = dict.fromkeys(('Response', 'RecordingTransport', 'ReplayTransport',
+                       'AsyncReplayTransport', 'ReplayServer', 'ReplayMiss'),
+                      '.transport')
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError('module %r has no attribute %r'
+                             % (__name__, name))
+    import importlib
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
@@ -4,110 +4,177 @@
 @Date     :2018-03-16-10:29
 @Author   : Xin Zhang
 """
+from functools import lru_cache
+from types import MappingProxyType
+from urllib.parse import urlsplit
 
+DEFAULT_DOMAIN = 'https://www.okex.com'
 
-def domain():
-    return 'https://www.okex.com'
-
-
-class ApiMeta(type):
-    def __new__(cls, *args, **kwargs):
-        name, bases, attr = args
-        for k, v in attr.items():
-            if not k.startswith('__'):
-                attr[k] = '%s%s' % (domain(), str(v))
-        return type.__new__(cls, name, bases, attr)
-
-
-class ApiBase(metaclass=ApiMeta):
-    pass
-
-
-class Spot(ApiBase):
+# 接口名: 路径
+SPOT_PATHS = MappingProxyType({
     # 行情
     # 1 - 币币行情
-    ticker = '/api/v1/ticker.do'
+    'ticker': '/api/v1/ticker.do',
     # 2 - 币币深度信息
-    depth = '/api/v1/depth.do'
+    'depth': '/api/v1/depth.do',
     # 3 - 币币交易记录信息
-    trades = '/api/v1/trades.do'
+    'trades': '/api/v1/trades.do',
     # 4 - 币币K线数据
-    kline = '/api/v1/kline.do'
+    'kline': '/api/v1/kline.do',
     # 交易
     # 1 - 用户信息
-    userinfo = '/api/v1/userinfo.do'
+    'userinfo': '/api/v1/userinfo.do',
     # 2 - 下单交易
-    trade = '/api/v1/trade.do'
+    'trade': '/api/v1/trade.do',
     # 3 - 批量下单
-    batch_trade = '/api/v1/batch_trade.do'
+    'batch_trade': '/api/v1/batch_trade.do',
     # 4 - 撤销订单
-    cancel_order = '/api/v1/cancel_order.do'
+    'cancel_order': '/api/v1/cancel_order.do',
     # 5 - 获取用户的订单信息
-    order_info = '/api/v1/order_info.do'
+    'order_info': '/api/v1/order_info.do',
     # 6 - 批量获取用户订单
-    orders_info = '/api/v1/orders_info.do'
+    'orders_info': '/api/v1/orders_info.do',
     # 7 - 获取历史订单信息，只返回最近两天的信息
-    order_history = '/api/v1/order_history.do'
+    'order_history': '/api/v1/order_history.do',
     # 8 - 提币BTC/LTC/ETH/ETC/BCH
-    withdraw = '/api/v1/withdraw.do'
+    'withdraw': '/api/v1/withdraw.do',
     # 9 - 取消提币BTC/LTC/ETH/ETC/BCH
-    cancel_withdraw = '/api/v1/cancel_withdraw.do'
+    'cancel_withdraw': '/api/v1/cancel_withdraw.do',
     # 10 - 查询提币BTC/LTC/ETH/ETC/BCH信息
-    withdraw_info = '/api/v1/withdraw_info.do'
+    'withdraw_info': '/api/v1/withdraw_info.do',
     # 11 - 获取用户提现/充值记录
-    account_records = '/api/v1/account_records.do'
-
+    'account_records': '/api/v1/account_records.do',
+})
 
-class Future(ApiBase):
+FUTURE_PATHS = MappingProxyType({
     # 行情
     # 1 - 合约行情
-    ticker = '/api/v1/future_ticker.do'
+    'ticker': '/api/v1/future_ticker.do',
     # 2 - 合约深度信息
-    depth = '/api/v1/future_depth.do'
+    'depth': '/api/v1/future_depth.do',
     # 3 - 合约交易记录信息
-    trades = '/api/v1/future_trades.do'
+    'trades': '/api/v1/future_trades.do',
     # 4 - 合约指数信息
-    index = '/api/v1/future_index.do'
+    'index': '/api/v1/future_index.do',
     # 5 - 美元人民币汇率
-    exchange_rate = '/api/v1/exchange_rate.do'
+    'exchange_rate': '/api/v1/exchange_rate.do',
     # 6 - 交割预估价
-    estimated_price = '/api/v1/future_estimated_price.do'
+    'estimated_price': '/api/v1/future_estimated_price.do',
     # 7 - 合约K线
-    kline = '/api/v1/future_kline.do'
+    'kline': '/api/v1/future_kline.do',
     # 8 - 当前可用合约总持仓量
-    hold_amount = '/api/v1/future_hold_amount.do'
+    'hold_amount': '/api/v1/future_hold_amount.do',
     # 9 - 合约最高限价和最低限价
-    price_limit = '/api/v1/future_price_limit.do'
+    'price_limit': '/api/v1/future_price_limit.do',
     # 交易
     # 1 - 合约账户信息(全仓)
-    userinfo = '/api/v1/future_userinfo.do'
+    'userinfo': '/api/v1/future_userinfo.do',
     # 2 - 合约仓位信息(全仓)
-    position = '/api/v1/future_position.do'
+    'position': '/api/v1/future_position.do',
     # 3 - 合约下单
-    trade = '/api/v1/future_trade.do'
+    'trade': '/api/v1/future_trade.do',
     # 4 - 合约交易历史（非个人）
-    trades_history = '/api/v1/future_trades_history.do'
+    'trades_history': '/api/v1/future_trades_history.do',
     # 5 - 批量下单
-    batch_trade = '/api/v1/future_batch_trade.do'
+    'batch_trade': '/api/v1/future_batch_trade.do',
     # 6 - 取消合约订单
-    cancel = '/api/v1/future_cancel.do'
+    'cancel': '/api/v1/future_cancel.do',
     # 7 - 合约订单信息
-    order_info = '/api/v1/future_order_info.do'
+    'order_info': '/api/v1/future_order_info.do',
     # 8 - 批量获取合约订单信息
-    orders_info = '/api/v1/future_orders_info.do'
+    'orders_info': '/api/v1/future_orders_info.do',
     # 9 - 逐仓合约账户信息
-    userinfo_4fix = '/api/v1/future_userinfo_4fix.do'
+    'userinfo_4fix': '/api/v1/future_userinfo_4fix.do',
     # 10 - 逐仓用户持仓查询
-    position_4fix = '/api/v1/future_position_4fix.do'
+    'position_4fix': '/api/v1/future_position_4fix.do',
     # 11 - 获取合约爆仓单
-    explosive = '/api/v1/future_explosive.do'
+    'explosive': '/api/v1/future_explosive.do',
     # 12 - 个人账户资金划转
-    devolve = '/api/v1/future_devolve.do'
+    'devolve': '/api/v1/future_devolve.do',
+})
+
+
+@lru_cache(maxsize=1024)
+def endpoint_of(resource):
+    """
+    :return: url中的路径, 如/api/v1/future_ticker.do
+    """
+    return urlsplit(resource).path or resource
+
+
+def _by_path(paths, conf):
+    """
+    按接口名的配置转为按路径, 与域名无关
+    """
+    if isinstance(conf, dict):
+        return MappingProxyType({paths[k]: v for k, v in conf.items()})
+    return frozenset(paths[k] for k in conf)
+
+
+class Endpoints:
+    """
+    一组接口的完整url, 如rest_api.future.ticker;
+    下面的配置按路径索引, 切换域名后依然有效:
+    limits 访问频率 {路径: (次数, 秒)}
+    ttls 行情缓存时间 {路径: 秒}
+    mutating 会改变账户状态的接口, 不能盲目重发
+    """
+
+    def __init__(self, paths, domain, limits=None, ttls=None, mutating=()):
+        self.paths = paths
+        self.limits = _by_path(paths, limits or {})
+        self.ttls = _by_path(paths, ttls or {})
+        self.mutating = _by_path(paths, mutating)
+        self.urls = None
+        self.set_domain(domain)
+
+    def set_domain(self, domain):
+        domain = domain.rstrip('/')
+        urls = {k: domain + v for k, v in self.paths.items()}
+        # url作为实例属性, 调用时只是一次属性查找
+        self.__dict__.update(urls)
+        self.urls = MappingProxyType(urls)
 
 
 class RestApi:
-    spot = Spot()
-    future = Future()
+    def __init__(self, domain=DEFAULT_DOMAIN):
+        """
+        :param domain: 如https://www.okex.com, 或本地的回放服务
+        """
+        self.domain = domain.rstrip('/')
+        self.spot = Endpoints(SPOT_PATHS, domain, limits={
+            'trade': (20, 2),
+            'batch_trade': (20, 2),
+            'cancel_order': (20, 2),
+            'order_info': (20, 2),
+            'orders_info': (20, 2),
+        }, mutating=('trade', 'batch_trade', 'cancel_order', 'withdraw',
+                     'cancel_withdraw'))
+        self.future = Endpoints(FUTURE_PATHS, domain, limits={
+            'cancel': (20, 2),
+        }, ttls={
+            'index': 1,
+            'exchange_rate': 60,
+            'estimated_price': 5,
+            'hold_amount': 5,
+            'price_limit': 5,
+        }, mutating=('trade', 'batch_trade', 'cancel', 'devolve'))
+
+    def set_domain(self, domain):
+        """
+        运行时切换域名, 已创建的FutureApi/SpotApi随之生效
+        """
+        self.domain = domain.rstrip('/')
+        self.spot.set_domain(domain)
+        self.future.set_domain(domain)
 
 
 rest_api = RestApi()
+
+
+def domain():
+    return rest_api.domain
+
+
+def set_domain(domain):
+    rest_api.set_domain(domain)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :async_http_utils
+"""
+import logging
+
+from urllib.parse import urlencode
+
+from . import json_codec
+from .api_base import endpoint_of
+from .retry import default_retrier, remaining
+
+log = logging.getLogger(__name__)
+
+
+class AsyncHttpSession:
+    """
+    基于aiohttp的异步keep-alive会话, 需要安装aiohttp
+    """
+    __slots__ = ['limit', 'limit_per_host', 'keepalive_timeout', 'timeout',
+                 '__session']
+
+    def __init__(self, limit=100, limit_per_host=0, keepalive_timeout=15,
+                 timeout=None):
+        """
+        :param limit: 连接池总连接数上限, 0为不限制
+        :param limit_per_host: 每个host的连接数上限, 0为不限制
+        :param keepalive_timeout: 空闲连接保持时间(秒)
+        :param timeout: 请求超时(秒), None为不超时
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.__session = None
+
+    async def get(self, url, headers=None, timeout=None):
+        """
+        :param timeout: 本次请求的超时(秒), 与self.timeout取较小值
+        """
+        async with self.__client().get(
+                _encoded(url), headers=headers,
+                **self.__timeout(timeout)) as resp:
+            return await resp.read()
+
+    async def post(self, url, params=None, headers=None, timeout=None):
+        """
+        :param params: 与HttpSession(requests)一致, 编码后放在query string中
+        """
+        if params:
+            url = '%s?%s' % (url, urlencode(params))
+        async with self.__client().post(
+                _encoded(url), headers=headers,
+                **self.__timeout(timeout)) as resp:
+            return await resp.read()
+
+    async def close(self):
+        if self.__session is not None:
+            await self.__session.close()
+            self.__session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def __timeout(self, timeout):
+        if timeout is None:
+            return {}
+        import aiohttp
+        if self.timeout is not None:
+            timeout = min(timeout, self.timeout)
+        return dict(timeout=aiohttp.ClientTimeout(total=timeout))
+
+    def __client(self):
+        # ClientSession必须在事件循环内创建, 所以推迟到第一次请求
+        if self.__session is None:
+            import aiohttp
+            connector = aiohttp.TCPConnector(
+                limit=self.limit, limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout)
+            self.__session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self.__session
+
+
+def _encoded(url):
+    """
+    url已由urlencode编码, 不让aiohttp再规范化(如把%3F还原为?),
+    保证与requests发出的请求完全相同
+    """
+    import yarl
+    return yarl.URL(url, encoded=True)
+
+
+async def async_http_get(resource, *, session, instrument=None,
+                         retrier=None, throttle=None, **params):
+    """
+    :param throttle: 同http_get
+    """
+    headers = {
+        "Content-type": "application/x-www-form-urlencoded",
+    }
+    source = urlencode(params)
+    f_url = '%s?%s' % (resource, source)
+
+    async def send(deadline):
+        timeout = remaining(deadline)
+        start = instrument.before('GET', resource, params) if instrument \
+            else 0
+        try:
+            body = await session.get(f_url, headers=headers,
+                                     timeout=timeout)
+            result = json_codec.loads(body)
+        except Exception as e:
+            if instrument:
+                instrument.after('GET', resource, params, start, error=e)
+            raise
+        if instrument:
+            instrument.after('GET', resource, params, start, result,
+                             nbytes=len(body))
+        return result
+
+    retrier = retrier or default_retrier()
+    return await retrier.call_async('GET', resource, send,
+                                    instrument, throttle)
+
+
+async def async_http_post(resource, params: dict, session, instrument=None,
+                          retrier=None, throttle=None):
+    headers = {
+        "Content-type": "application/x-www-form-urlencoded",
+    }
+    async def send(deadline):
+        timeout = remaining(deadline)
+        start = instrument.before('POST', resource, params) if instrument \
+            else 0
+        try:
+            body = await session.post(resource, params=params,
+                                      headers=headers, timeout=timeout)
+            result = json_codec.loads(body)
+        except Exception as e:
+            if instrument:
+                instrument.after('POST', resource, params, start, error=e)
+            raise
+        if instrument:
+            instrument.after('POST', resource, params, start, result,
+                             nbytes=len(body))
+        return result
+
+    retrier = retrier or default_retrier()
+    try:
+        return await retrier.call_async('POST', resource, send,
+                                        instrument, throttle)
+    except Exception as e:
+        log.error('POST %s failed: %s: %s', endpoint_of(resource),
+                  type(e).__name__, e)
+        return None
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :cache
+"""
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from .api_base import rest_api, endpoint_of
+from .fanout import is_error
+
+
+def default_ttls():
+    """
+    Spot/Future中配置的缓存时间, {路径: 秒}
+    """
+    ttls = dict(rest_api.spot.ttls)
+    ttls.update(rest_api.future.ttls)
+    return ttls
+
+
+class ResponseCache:
+    """
+    公共行情GET接口的TTL缓存, LRU淘汰, 相同的并发请求只发送一次.
+    只用于http_get, 签名的http_post接口不会经过缓存.
+    缓存的结果在调用方之间共享, 不要修改返回的dict/list.
+    """
+
+    def __init__(self, ttls=None, maxsize=1024):
+        """
+        :param ttls: dict, {url或路径: 秒}, 覆盖或补充默认配置
+        :param maxsize: 最多缓存的条数
+        """
+        self.ttls = default_ttls()
+        self.ttls.update({endpoint_of(k): v for k, v in
+                          (ttls or {}).items()})
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.__entries = OrderedDict()
+        self.__inflight = dict()
+        self.__async_inflight = dict()
+        self.__lock = threading.Lock()
+
+    def cacheable(self, resource):
+        return endpoint_of(resource) in self.ttls
+
+    def get(self, resource, params: dict, fetch):
+        """
+        :param fetch: 无参callable, 未命中时调用
+        """
+        key = (resource, tuple(sorted(params.items())))
+        with self.__lock:
+            found, value = self.__lookup(key)
+            if found:
+                return value
+            inflight = self.__inflight.get(key)
+            owner = inflight is None
+            if owner:
+                self.misses += 1
+                inflight = self.__inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            return inflight.result()
+        try:
+            value = fetch()
+        except BaseException as e:
+            with self.__lock:
+                del self.__inflight[key]
+            inflight.set_exception(e)
+            raise
+        with self.__lock:
+            self.__store(key, resource, value)
+            del self.__inflight[key]
+        inflight.set_result(value)
+        return value
+
+    async def get_async(self, resource, params: dict, fetch):
+        """
+        :param fetch: 无参callable, 返回awaitable, 未命中时调用
+        """
+        # 只有异步调用才加载asyncio, 缩短import时间
+        import asyncio
+        key = (resource, tuple(sorted(params.items())))
+        loop = asyncio.get_running_loop()
+        # asyncio.Future只能在创建它的事件循环中await, 按循环分别合并请求
+        loop_key = (loop, key)
+        with self.__lock:
+            found, value = self.__lookup(key)
+            if found:
+                return value
+            inflight = self.__async_inflight.get(loop_key)
+            owner = inflight is None
+            if owner:
+                self.misses += 1
+                inflight = loop.create_future()
+                self.__async_inflight[loop_key] = inflight
+            else:
+                self.coalesced += 1
+        if not owner:
+            return await asyncio.shield(inflight)
+        try:
+            value = await fetch()
+        except BaseException as e:
+            with self.__lock:
+                del self.__async_inflight[loop_key]
+            if isinstance(e, asyncio.CancelledError):
+                inflight.cancel()
+            else:
+                inflight.set_exception(e)
+                # 没有其他等待者时避免"exception was never retrieved"
+                inflight.exception()
+            raise
+        with self.__lock:
+            self.__store(key, resource, value)
+            del self.__async_inflight[loop_key]
+        inflight.set_result(value)
+        return value
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self):
+        return dict(hits=self.hits, misses=self.misses,
+                    coalesced=self.coalesced, evictions=self.evictions,
+                    size=len(self.__entries))
+
+    def __lookup(self, key):
+        entry = self.__entries.get(key)
+        if entry is not None:
+            expire, value = entry
+            if expire > time.monotonic():
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                return True, value
+            del self.__entries[key]
+        return False, None
+
+    def __store(self, key, resource, value):
+        if is_error(value):
+            return
+        expire = time.monotonic() + self.ttls[endpoint_of(resource)]
+        self.__entries[key] = (expire, value)
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.maxsize:
+            self.__entries.popitem(last=False)
+            self.evictions += 1
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :fanout
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+
+class FanoutResult(dict):
+    """
+    并发请求的结果, {key: resp}, 失败的请求不在其中而记录在errors里
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.errors = dict()
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+def is_error(resp):
+    """
+    接口返回None, 或带error_code/result=false时视为失败
+    """
+    if resp is None:
+        return True
+    if isinstance(resp, dict):
+        return 'error_code' in resp or resp.get('result') is False
+    return False
+
+
+def run_concurrently(jobs: dict, max_workers=None):
+    """
+    在线程池中并发执行
+    :param jobs: dict, {key: 无参callable}
+    :param max_workers: 线程数, 默认为min(32, 任务数)
+    :return: FanoutResult
+    """
+    result = FanoutResult()
+    if not jobs:
+        return result
+    max_workers = max_workers or min(32, len(jobs))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {key: executor.submit(job) for key, job in jobs.items()}
+        for key, future in futures.items():
+            try:
+                _collect(result, key, future.result())
+            except Exception as e:
+                result.errors[key] = e
+    return result
+
+
+async def gather_concurrently(jobs: dict, limit=None):
+    """
+    在当前事件循环中并发执行
+    :param jobs: dict, {key: 返回awaitable的无参callable}
+    :param limit: 同时进行的请求数上限, None为不限制
+    :return: FanoutResult
+    """
+    # 只有异步调用才加载asyncio, 缩短import时间
+    import asyncio
+    semaphore = asyncio.Semaphore(limit) if limit else None
+
+    async def run(job):
+        if semaphore is None:
+            return await job()
+        async with semaphore:
+            return await job()
+
+    keys = list(jobs)
+    resps = await asyncio.gather(*(run(jobs[k]) for k in keys),
+                                 return_exceptions=True)
+    result = FanoutResult()
+    for key, resp in zip(keys, resps):
+        if isinstance(resp, Exception):
+            result.errors[key] = resp
+        else:
+            _collect(result, key, resp)
+    return result
+
+
+def _collect(result, key, resp):
+    if is_error(resp):
+        result.errors[key] = resp
+    else:
+        result[key] = resp
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :http_session
+"""
+import threading
+
+
+class HttpSession:
+    """
+    带连接池的keep-alive会话, 可在多个FutureApi/SpotApi之间共享
+    """
+    __slots__ = ['pool_connections', 'pool_maxsize', 'pool_block',
+                 'timeout', '__session']
+
+    def __init__(self, pool_connections=10, pool_maxsize=10,
+                 pool_block=False, timeout=None):
+        """
+        :param pool_connections: 缓存的host连接池个数
+        :param pool_maxsize: 每个host保持的最大空闲连接数
+        :param pool_block: True时每个host的并发连接数不超过pool_maxsize
+        :param timeout: 请求超时(秒), None为不超时
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.timeout = timeout
+        self.__session = self.__build_session()
+
+    def get(self, url, headers=None, timeout=None):
+        """
+        :param timeout: 本次请求的超时(秒), 与self.timeout取较小值
+        """
+        return self.__session.get(url, headers=headers,
+                                  timeout=self.__timeout(timeout))
+
+    def post(self, url, params=None, headers=None, timeout=None):
+        return self.__session.post(url, params=params, headers=headers,
+                                   timeout=self.__timeout(timeout))
+
+    def close(self):
+        self.__session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __timeout(self, timeout):
+        if timeout is None or self.timeout is None:
+            return self.timeout if timeout is None else timeout
+        return min(timeout, self.timeout)
+
+    def __build_session(self):
+        # 第一次创建会话时才加载requests, 缩短import时间
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                              pool_maxsize=self.pool_maxsize,
+                              pool_block=self.pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+
+_default_session = None
+_default_lock = threading.Lock()
+
+
+def default_session():
+    """
+    进程内共享的默认会话, 第一次调用时创建
+    """
+    global _default_session
+    if _default_session is None:
+        with _default_lock:
+            if _default_session is None:
+                _default_session = HttpSession()
+    return _default_session
@@ -4,16 +4,19 @@
 @Date     :2018-03-16-10:29
 @Author   : Xin Zhang
 """
-import json
 import hashlib
-import traceback
-import time
-import requests
-from requests.adapters import SSLError
+import logging
 
 from urllib.parse import urlencode
 from collections import OrderedDict
 
+from . import json_codec
+from .api_base import endpoint_of
+from .http_session import default_session
+from .retry import default_retrier, remaining
+
+log = logging.getLogger(__name__)
+
 
 def build_my_sign(params: dict, secret_key):
     order_dict = OrderedDict()
@@ -30,30 +33,73 @@ def build_my_sign_with_api(params: dict, api_key, secret_key):
     return build_my_sign(d, secret_key)
 
 
-def http_get(resource, **params):
+def http_get(resource, *, session=None, instrument=None, retrier=None,
+             throttle=None, **params):
+    """
+    :param throttle: 无参callable, 每次发送前调用, 返回需要等待的秒数,
+                     重试和hedge请求同样受限流
+    """
     headers = {
         "Content-type": "application/x-www-form-urlencoded",
     }
+    session = session or default_session()
     source = urlencode(params)
     f_url = '%s?%s' % (resource, source)
-    try:
-        resp = requests.get(f_url, headers=headers)
-        return resp.json()
-    except SSLError:
-        time.sleep(0.5)
-        traceback.print_exc()
-        return http_get(resource, **params)
 
+    def send(deadline):
+        timeout = remaining(deadline)
+        start = instrument.before('GET', resource, params) if instrument \
+            else 0
+        try:
+            resp = session.get(f_url, headers=headers,
+                               timeout=timeout)
+            result = json_codec.loads(resp.content)
+        except Exception as e:
+            if instrument:
+                instrument.after('GET', resource, params, start, error=e)
+            raise
+        if instrument:
+            instrument.after('GET', resource, params, start, result,
+                             nbytes=len(resp.content))
+        return result
+
+    retrier = retrier or default_retrier()
+    return retrier.call('GET', resource, send, instrument, throttle)
 
-def http_post(resource, params: dict):
+
+def http_post(resource, params: dict, session=None, instrument=None,
+              retrier=None, throttle=None):
+    """
+    :return: 接口返回, 重试用尽后为None, 异常记录在instrument和logging中
+    """
     headers = {
         "Content-type": "application/x-www-form-urlencoded",
     }
+    session = session or default_session()
+
+    def send(deadline):
+        timeout = remaining(deadline)
+        start = instrument.before('POST', resource, params) if instrument \
+            else 0
+        try:
+            resp = session.post(resource, params=params, headers=headers,
+                                timeout=timeout)
+            result = json_codec.loads(resp.content)
+        except Exception as e:
+            if instrument:
+                instrument.after('POST', resource, params, start, error=e)
+            raise
+        if instrument:
+            instrument.after('POST', resource, params, start, result,
+                             nbytes=len(resp.content))
+        return result
+
+    retrier = retrier or default_retrier()
     try:
-        resp = requests.post(resource, params=params, headers=headers)
-        return json.loads(resp.text)
-    except BaseException:
-        traceback.print_exc()
+        return retrier.call('POST', resource, send, instrument, throttle)
+    except Exception as e:
+        log.error('POST %s failed: %s: %s', endpoint_of(resource),
+                  type(e).__name__, e)
         return None
 
 
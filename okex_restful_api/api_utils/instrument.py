@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :instrument
+"""
+import os
+import time
+import bisect
+import logging
+import threading
+
+from .api_base import endpoint_of
+
+log = logging.getLogger(__name__)
+
+# 延迟分桶上界(秒), 0.1ms起每档x1.25, 最后一档为+inf
+BUCKETS = tuple(0.0001 * 1.25 ** i for i in range(60)) + (float('inf'),)
+
+
+class LatencyHistogram:
+    __slots__ = ['counts', 'count', 'total', 'max']
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        """
+        :param p: 0-100
+        :return: 所在分桶的上界(秒), 不超过max
+        """
+        if not self.count:
+            return 0.0
+        rank = p / 100.0 * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(bound, self.max)
+        return self.max
+
+
+class EndpointStats:
+    __slots__ = ['requests', 'retries', 'bytes', 'errors', 'latency']
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.bytes = 0
+        self.errors = dict()
+        self.latency = LatencyHistogram()
+
+    def to_dict(self):
+        return dict(requests=self.requests, retries=self.retries,
+                    bytes=self.bytes, errors=dict(self.errors),
+                    p50=self.latency.percentile(50),
+                    p99=self.latency.percentile(99),
+                    max=self.latency.max)
+
+
+def error_class(error, result=None):
+    """
+    :return: 异常的类名, 或接口返回的error_code, 成功时为None
+    """
+    if error is not None:
+        return type(error).__name__
+    if isinstance(result, dict) and 'error_code' in result:
+        return 'error_code_%s' % result['error_code']
+    return None
+
+
+class Instrumentation:
+    """
+    请求前后的钩子, 内置按接口统计的延迟分布/字节数/重试/错误类型
+    """
+
+    def __init__(self):
+        self.pre_hooks = []
+        self.post_hooks = []
+        self.__stats = dict()
+        self.__lock = threading.Lock()
+
+    def add_pre_hook(self, hook):
+        """
+        :param hook: hook(method, resource, params)
+        """
+        self.pre_hooks.append(hook)
+
+    def add_post_hook(self, hook):
+        """
+        :param hook: hook(method, resource, params, result, error, elapsed)
+        """
+        self.post_hooks.append(hook)
+
+    def before(self, method, resource, params):
+        """
+        :return: 开始时间, 传给after
+        """
+        for hook in self.pre_hooks:
+            _call(hook, method, resource, params)
+        return time.perf_counter()
+
+    def after(self, method, resource, params, start, result=None,
+              error=None, nbytes=0):
+        elapsed = time.perf_counter() - start
+        cls = error_class(error, result)
+        with self.__lock:
+            stats = self.__endpoint(resource)
+            stats.requests += 1
+            stats.bytes += nbytes
+            stats.latency.add(elapsed)
+            if cls is not None:
+                stats.errors[cls] = stats.errors.get(cls, 0) + 1
+        for hook in self.post_hooks:
+            _call(hook, method, resource, params, result, error, elapsed)
+
+    def retry(self, resource, error):
+        """
+        失败的请求已由after计入errors, 这里只计重试次数
+        """
+        with self.__lock:
+            self.__endpoint(resource).retries += 1
+
+    def stats(self):
+        """
+        :return: dict, {接口路径: {requests, retries, bytes, errors,
+                                   p50, p99, max}}, 延迟单位为秒
+        """
+        with self.__lock:
+            return {k: v.to_dict() for k, v in self.__stats.items()}
+
+    def to_prometheus(self):
+        """
+        :return: str, Prometheus text格式
+        """
+        with self.__lock:
+            items = sorted(self.__stats.items())
+            lines = ['# TYPE okex_request_latency_seconds summary']
+            for k, v in items:
+                for q in (0.5, 0.99):
+                    lines.append('okex_request_latency_seconds{endpoint="%s",'
+                                 'quantile="%s"} %.6f'
+                                 % (k, q, v.latency.percentile(q * 100)))
+                lines.append('okex_request_latency_seconds_sum{endpoint="%s"}'
+                             ' %.6f' % (k, v.latency.total))
+                lines.append('okex_request_latency_seconds_count'
+                             '{endpoint="%s"} %d' % (k, v.latency.count))
+            lines.append('# TYPE okex_request_latency_max_seconds gauge')
+            lines += ['okex_request_latency_max_seconds{endpoint="%s"} %.6f'
+                      % (k, v.latency.max) for k, v in items]
+            for name, attr in (('requests', 'requests'),
+                               ('retries', 'retries'),
+                               ('response_bytes', 'bytes')):
+                lines.append('# TYPE okex_%s_total counter' % name)
+                lines += ['okex_%s_total{endpoint="%s"} %d'
+                          % (name, k, getattr(v, attr)) for k, v in items]
+            lines.append('# TYPE okex_errors_total counter')
+            lines += ['okex_errors_total{endpoint="%s",error="%s"} %d'
+                      % (k, cls, n) for k, v in items
+                      for cls, n in sorted(v.errors.items())]
+        return '\n'.join(lines) + '\n'
+
+    def __endpoint(self, resource):
+        key = endpoint_of(resource)
+        stats = self.__stats.get(key)
+        if stats is None:
+            stats = self.__stats[key] = EndpointStats()
+        return stats
+
+
+def _call(hook, *args):
+    try:
+        hook(*args)
+    except Exception:
+        log.exception('Instrumentation hook %r failed', hook)
+
+
+class PrometheusExporter:
+    """
+    定期把统计写到文件(供node_exporter textfile采集), 或在本地端口提供/metrics
+    """
+
+    def __init__(self, instrument, path=None, port=None, host='127.0.0.1',
+                 interval=15):
+        """
+        :param instrument: Instrumentation
+        :param path: 输出文件路径
+        :param port: http端口
+        :param interval: 写文件的间隔(秒)
+        """
+        assert path or port is not None, 'path or port is needed!'
+        self.instrument = instrument
+        self.path = path
+        self.interval = interval
+        self.__stop = threading.Event()
+        self.__threads = []
+        self.__server = None
+        if port is not None:
+            from http.server import ThreadingHTTPServer
+            self.__server = ThreadingHTTPServer((host, port),
+                                                self.__handler())
+            self.__server.daemon_threads = True
+            self.__spawn(self.__server.serve_forever)
+        if path:
+            self.__spawn(self.__write_loop)
+
+    @property
+    def port(self):
+        return self.__server.server_address[1] if self.__server else None
+
+    def write(self):
+        tmp = '%s.tmp' % self.path
+        with open(tmp, 'w') as f:
+            f.write(self.instrument.to_prometheus())
+        os.replace(tmp, self.path)
+
+    def close(self):
+        self.__stop.set()
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+        for thread in self.__threads:
+            thread.join()
+
+    def __spawn(self, target):
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        self.__threads.append(thread)
+
+    def __write_loop(self):
+        while True:
+            try:
+                self.write()
+            except OSError:
+                log.exception('Failed to write metrics to %s', self.path)
+            if self.__stop.wait(self.interval):
+                return
+
+    def __handler(self):
+        from http.server import BaseHTTPRequestHandler
+        instrument = self.instrument
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = instrument.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type',
+                                 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :json_codec
+"""
+import os
+import json
+import warnings
+import importlib
+
+# 按顺序选择第一个已安装的解码器, 可用环境变量OKEX_JSON_DECODER指定
+PREFERENCE = ('orjson', 'ujson', 'json')
+
+
+def load_decoder(name):
+    """
+    :param name: orjson ujson json
+    :return: 可直接解码bytes的loads函数
+    :raise ValueError: 不支持的解码器
+    """
+    if name not in PREFERENCE:
+        raise ValueError('Unsupported json decoder: %s' % name)
+    if name == 'json':
+        # json.loads可直接接受utf-8 bytes, 无需先解码成str
+        return json.loads
+    return importlib.import_module(name).loads
+
+
+def pick_decoder(preferred=None):
+    """
+    :param preferred: 优先使用的解码器, 未安装或不支持时按PREFERENCE回退
+    :return: (name, loads)
+    """
+    if preferred is not None and preferred not in PREFERENCE:
+        # 来自环境变量的拼写错误不能让每次解码都失败
+        warnings.warn('Unsupported json decoder %r, expected one of %s'
+                      % (preferred, ', '.join(PREFERENCE)), RuntimeWarning)
+        preferred = None
+    names = PREFERENCE if preferred is None else \
+        (preferred,) + tuple(n for n in PREFERENCE if n != preferred)
+    for name in names:
+        try:
+            return name, load_decoder(name)
+        except ImportError:
+            continue
+    return 'json', json.loads
+
+
+def _select():
+    global name, loads
+    name, loads = pick_decoder(os.environ.get('OKEX_JSON_DECODER'))
+
+
+def _first_loads(data):
+    # 第一次解码时才选择并加载解码器, 缩短import时间
+    _select()
+    return loads(data)
+
+
+loads = _first_loads
+
+
+def __getattr__(attr):
+    if attr == 'name':
+        _select()
+        return name
+    raise AttributeError('module %r has no attribute %r' % (__name__, attr))
+
+
+def set_decoder(decoder):
+    """
+    运行时切换解码器
+    :param decoder: orjson ujson json
+    """
+    global name, loads
+    loads = load_decoder(decoder)
+    name = decoder
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :rate_limit
+"""
+import time
+import threading
+
+from .api_base import rest_api, endpoint_of
+
+
+class TokenBucket:
+    """
+    令牌桶, 线程安全; 令牌不足时先预约, 调用方按返回的等待时间休眠
+    """
+    __slots__ = ['rate', 'capacity', 'acquired', 'waited', 'wait_time',
+                 'max_wait', '__tokens', '__last', '__lock']
+
+    def __init__(self, rate, capacity):
+        """
+        :param rate: 每秒补充的令牌数
+        :param capacity: 桶容量, 即允许的突发次数
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.acquired = 0
+        self.waited = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.__tokens = float(capacity)
+        self.__last = time.monotonic()
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def from_limit(cls, count, period):
+        """
+        :param count: period秒内允许的次数, 如 20次/2秒 为(20, 2)
+        :param period: 秒
+        """
+        return cls(count / period, count)
+
+    def reserve(self, tokens=1):
+        """
+        预约令牌
+        :return: float, 需要等待的秒数, 0为无需等待
+        """
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.capacity, self.__tokens +
+                                (now - self.__last) * self.rate)
+            self.__last = now
+            self.__tokens -= tokens
+            wait = -self.__tokens / self.rate if self.__tokens < 0 else 0.0
+            self.acquired += 1
+            if wait:
+                self.waited += 1
+                self.wait_time += wait
+                self.max_wait = max(self.max_wait, wait)
+            return wait
+
+    def acquire(self, tokens=1):
+        wait = self.reserve(tokens)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens=1):
+        # 只有异步调用才加载asyncio, 缩短import时间
+        import asyncio
+        wait = self.reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self):
+        return dict(acquired=self.acquired, waited=self.waited,
+                    wait_time=self.wait_time, max_wait=self.max_wait)
+
+
+def default_limits():
+    """
+    Spot/Future中配置的访问频率, {路径: (次数, 秒)}
+    """
+    limits = dict(rest_api.spot.limits)
+    limits.update(rest_api.future.limits)
+    return limits
+
+
+class RateLimiter:
+    """
+    按 (api_key, 接口路径) 分别限流, 未配置频率的接口不限流
+    """
+
+    def __init__(self, limits=None):
+        """
+        :param limits: dict, {url或路径: (次数, 秒)}, 覆盖或补充默认配置
+        """
+        self.limits = default_limits()
+        self.limits.update({endpoint_of(k): v for k, v in
+                            (limits or {}).items()})
+        self.__buckets = dict()
+        self.__lock = threading.Lock()
+
+    def bucket(self, api_key, resource):
+        path = endpoint_of(resource)
+        key = (api_key, path)
+        bucket = self.__buckets.get(key)
+        if bucket is None and path in self.limits:
+            with self.__lock:
+                bucket = self.__buckets.get(key)
+                if bucket is None:
+                    bucket = TokenBucket.from_limit(*self.limits[path])
+                    self.__buckets[key] = bucket
+        return bucket
+
+    def reserve(self, api_key, resource):
+        bucket = self.bucket(api_key, resource)
+        return bucket.reserve() if bucket else 0.0
+
+    def acquire(self, api_key, resource):
+        bucket = self.bucket(api_key, resource)
+        return bucket.acquire() if bucket else 0.0
+
+    async def acquire_async(self, api_key, resource):
+        bucket = self.bucket(api_key, resource)
+        return await bucket.acquire_async() if bucket else 0.0
+
+    def stats(self):
+        """
+        :return: dict, {(api_key, 路径): {acquired, waited, wait_time, max_wait}}
+        """
+        return {k: b.stats() for k, b in list(self.__buckets.items())}
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :rest_client
+"""
+from functools import partial
+
+from .api_base import endpoint_of
+from .http_utils import http_get, http_post
+from .async_http_utils import async_http_get, async_http_post
+
+
+class RestClient:
+    """
+    FutureApi/SpotApi共用的请求流程: 缓存 -> 限流 -> 重试 -> 结果转换
+    """
+
+    def _init_client(self, api_key, session=None, rate_limiter=None,
+                     cache=None, instrument=None, retrier=None,
+                     decoders=None):
+        """
+        :param api_key: 限流按api_key计数
+        :param decoders: dict, {路径: 转换函数}, 空时返回原始json
+        """
+        self.__api_key = api_key
+        self.__session = session
+        self.__rate_limiter = rate_limiter
+        self.__cache = cache
+        self.__instrument = instrument
+        self.__retrier = retrier
+        self.__decoders = decoders or {}
+
+    def _http_get(self, resource, **params):
+        cache = self.__cache
+        if cache is not None and cache.cacheable(resource):
+            resp = cache.get(resource, params,
+                             partial(self._send_get, resource, params))
+        else:
+            resp = self._send_get(resource, params)
+        return self._decode(resource, resp)
+
+    def _http_post(self, resource, params):
+        return self._decode(resource, self._send_post(resource, params))
+
+    def _send_get(self, resource, params):
+        return http_get(resource, throttle=partial(self._reserve, resource),
+                        **self._transport(), **params)
+
+    def _send_post(self, resource, params):
+        return http_post(resource, params,
+                         throttle=partial(self._reserve, resource),
+                         **self._transport())
+
+    def _transport(self):
+        return dict(session=self.__session, instrument=self.__instrument,
+                    retrier=self.__retrier)
+
+    def _cache(self):
+        return self.__cache
+
+    def _decode(self, resource, resp):
+        if not self.__decoders:
+            return resp
+        decoder = self.__decoders.get(endpoint_of(resource))
+        return resp if decoder is None else decoder(resp)
+
+    def _reserve(self, resource):
+        """
+        :return: 限流需要等待的秒数
+        """
+        if self.__rate_limiter is None:
+            return 0
+        return self.__rate_limiter.reserve(self.__api_key, resource)
+
+
+class AsyncRestClient(RestClient):
+    """
+    RestClient的异步版本, session为AsyncHttpSession, 结果需要await
+    """
+
+    async def _http_get(self, resource, **params):
+        cache = self._cache()
+        if cache is not None and cache.cacheable(resource):
+            resp = await cache.get_async(
+                resource, params, partial(self._send_get, resource, params))
+        else:
+            resp = await self._send_get(resource, params)
+        return self._decode(resource, resp)
+
+    async def _http_post(self, resource, params):
+        return self._decode(resource,
+                            await self._send_post(resource, params))
+
+    def _send_get(self, resource, params):
+        return async_http_get(resource,
+                              throttle=partial(self._reserve, resource),
+                              **self._transport(), **params)
+
+    def _send_post(self, resource, params):
+        return async_http_post(resource, params,
+                               throttle=partial(self._reserve, resource),
+                               **self._transport())
@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :retry
+"""
+import time
+import random
+import sys
+import logging
+import threading
+from concurrent.futures import (ThreadPoolExecutor, wait,
+                                FIRST_COMPLETED)
+
+from .api_base import rest_api, endpoint_of
+from .instrument import LatencyHistogram
+
+log = logging.getLogger(__name__)
+
+# 公共行情GET, 签名的查询POST, 下单/撤单/提币等会改变状态的POST
+CATEGORIES = ('public', 'signed', 'mutating')
+
+
+def default_mutating():
+    """
+    Spot/Future中mutating声明的接口路径
+    """
+    return rest_api.spot.mutating | rest_api.future.mutating
+
+
+def transient_errors():
+    """
+    :return: tuple, 可以重发的网络错误(超时/断线/响应不完整)
+    """
+    # 出错时requests已经加载, 这里的import不会增加开销
+    import requests
+    errors = (requests.exceptions.ConnectionError,
+              requests.exceptions.Timeout,
+              requests.exceptions.ChunkedEncodingError,
+              requests.exceptions.ContentDecodingError,
+              # 502等返回的html无法解析为json
+              ValueError)
+    if 'asyncio' in sys.modules:
+        errors += (sys.modules['asyncio'].TimeoutError,)
+    try:
+        import aiohttp
+    except ImportError:
+        return errors
+    return errors + (aiohttp.ClientError,)
+
+
+def is_unsent(error):
+    """
+    :return: 请求是否确定没有发出(连接未建立), 只有这种错误可以重发下单请求
+    """
+    import requests
+    from urllib3.exceptions import NewConnectionError
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and \
+            not isinstance(error, requests.exceptions.SSLError):
+        reason = getattr(error.args[0] if error.args else None, 'reason',
+                         None)
+        return isinstance(reason, NewConnectionError)
+    try:
+        import aiohttp
+    except ImportError:
+        return False
+    return isinstance(error, aiohttp.ClientConnectorError) and \
+        not isinstance(error, aiohttp.ClientSSLError)
+
+
+class RetryPolicy:
+    """
+    一类接口的重试参数
+    """
+    __slots__ = ['attempts', 'base_delay', 'max_delay', 'jitter', 'deadline',
+                 'idempotent', 'hedge', 'hedge_quantile', 'hedge_min_samples']
+
+    def __init__(self, attempts=3, base_delay=0.1, max_delay=2.0, jitter=0.5,
+                 deadline=10.0, idempotent=True, hedge=False,
+                 hedge_quantile=95, hedge_min_samples=20):
+        """
+        :param attempts: 最多请求次数(含第一次)
+        :param base_delay: 第一次重试前等待的秒数, 之后每次翻倍
+        :param max_delay: 单次等待的上限(秒)
+        :param jitter: 0-1, 等待时间中随机部分的比例
+        :param deadline: 一次调用(含所有重试)的总时限(秒), None为不限制
+        :param idempotent: False时只在请求确定没有发出时重试, 见is_unsent
+        :param hedge: 只用于GET, 请求慢于历史hedge_quantile分位时
+                      再发一个相同的请求, 先返回的为准
+        :param hedge_min_samples: 样本数达到后才开始hedge
+        """
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.deadline = deadline
+        self.idempotent = idempotent
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+
+    def backoff(self, attempt):
+        """
+        :param attempt: 已失败的次数, 从1开始
+        :return: 下次重试前等待的秒数
+        """
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * (1 - self.jitter) + random.uniform(0,
+                                                          delay * self.jitter)
+
+    def retryable(self, error):
+        if self.idempotent:
+            return isinstance(error, transient_errors())
+        return is_unsent(error)
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    发送前已经超过deadline, 请求没有发出
+    """
+
+
+def remaining(deadline):
+    """
+    :param deadline: time.monotonic()的截止时间, None为不限制
+    :return: 单次请求可用的超时秒数, None为不限制;
+             已经超时则抛出DeadlineExceeded, 不再发出请求
+    """
+    if deadline is None:
+        return None
+    timeout = deadline - time.monotonic()
+    if timeout <= 0:
+        # 下单请求以极短的超时发出后可能已被交易所接受, 调用方却只看到超时
+        raise DeadlineExceeded('deadline exceeded before sending')
+    return timeout
+
+
+def pause(throttle):
+    """
+    :param throttle: 无参callable, 返回限流需要等待的秒数, 可以为None
+    :return: 实际等待的秒数
+    """
+    seconds = throttle() if throttle is not None else 0
+    if seconds > 0:
+        time.sleep(seconds)
+        return seconds
+    return 0
+
+
+async def pause_async(throttle):
+    """
+    pause的异步版本
+    """
+    seconds = throttle() if throttle is not None else 0
+    if seconds > 0:
+        import asyncio
+        await asyncio.sleep(seconds)
+        return seconds
+    return 0
+
+
+def default_policies():
+    return dict(public=RetryPolicy(attempts=5),
+                signed=RetryPolicy(attempts=3),
+                mutating=RetryPolicy(attempts=3, deadline=5.0,
+                                     idempotent=False))
+
+
+class Retrier:
+    """
+    按接口类别重试: 指数退避+随机抖动, 总时限, 下单类接口不盲目重发;
+    公共GET接口可选hedge请求
+    """
+
+    def __init__(self, policies=None, mutating=None, max_workers=8):
+        """
+        :param policies: dict, {public|signed|mutating: RetryPolicy},
+                         覆盖默认配置
+        :param mutating: 会改变状态的url或路径, 默认为Spot/Future的mutating
+        :param max_workers: hedge请求使用的线程数
+        """
+        self.policies = default_policies()
+        self.policies.update(policies or {})
+        self.mutating = default_mutating() if mutating is None \
+            else frozenset(endpoint_of(i) for i in mutating)
+        self.max_workers = max_workers
+        self.retries = 0
+        self.hedges = 0
+        self.__latency = dict()
+        self.__executor = None
+        self.__lock = threading.Lock()
+
+    def category(self, method, resource):
+        if endpoint_of(resource) in self.mutating:
+            return 'mutating'
+        return 'signed' if method == 'POST' else 'public'
+
+    def policy(self, method, resource):
+        return self.policies[self.category(method, resource)]
+
+    def call(self, method, resource, send, instrument=None, throttle=None):
+        """
+        :param send: send(deadline), 发送一次请求; deadline为time.monotonic()
+                     的截止时间, None为不限制, 用于设置单次请求的超时
+        :param throttle: 无参callable, 每次发送前(含重试和hedge)调用,
+                         返回限流需要等待的秒数; 等待的时间不计入deadline
+        :return: send的返回, 重试用尽时抛出最后一次的异常
+        """
+        policy = self.policy(method, resource)
+        hedge = method == 'GET' and policy.hedge
+        deadline = None
+        attempt = 0
+        while True:
+            deadline = self.__deadline(policy, deadline, pause(throttle))
+            try:
+                if not hedge:
+                    return send(deadline)
+                return self.__hedged(resource, send, deadline,
+                                     self.__hedge_delay(policy, resource),
+                                     throttle)
+            except Exception as e:
+                attempt += 1
+                delay = self.__next_delay(policy, attempt, deadline, e)
+                if delay is None:
+                    raise
+                self.__retried(resource, e, instrument)
+            time.sleep(delay)
+
+    async def call_async(self, method, resource, send, instrument=None,
+                         throttle=None):
+        """
+        call的异步版本
+        :param send: send(deadline), 返回awaitable
+        """
+        # 只有异步调用才加载asyncio, 缩短import时间
+        import asyncio
+        policy = self.policy(method, resource)
+        hedge = method == 'GET' and policy.hedge
+        deadline = None
+        attempt = 0
+        while True:
+            deadline = self.__deadline(policy, deadline,
+                                       await pause_async(throttle))
+            try:
+                if not hedge:
+                    return await send(deadline)
+                return await self.__hedged_async(
+                    resource, send, deadline,
+                    self.__hedge_delay(policy, resource), throttle)
+            except Exception as e:
+                attempt += 1
+                delay = self.__next_delay(policy, attempt, deadline, e)
+                if delay is None:
+                    raise
+                self.__retried(resource, e, instrument)
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        """
+        :return: dict, {retries, hedges}
+        """
+        return dict(retries=self.retries, hedges=self.hedges)
+
+    def close(self):
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False)
+            self.__executor = None
+
+    @staticmethod
+    def __deadline(policy, deadline, waited):
+        """
+        第一次发送前从限流等待结束时开始计时, 之后的限流等待顺延deadline
+        """
+        if policy.deadline is None:
+            return None
+        if deadline is None:
+            return time.monotonic() + policy.deadline
+        return deadline + waited
+
+    @staticmethod
+    def __next_delay(policy, attempt, deadline, error):
+        """
+        :return: 重试前等待的秒数, 不再重试时为None
+        """
+        if attempt >= policy.attempts or not policy.retryable(error):
+            return None
+        delay = policy.backoff(attempt)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return None
+        return delay
+
+    def __retried(self, resource, error, instrument):
+        with self.__lock:
+            self.retries += 1
+        if instrument is not None:
+            instrument.retry(resource, error)
+        # 次数已计入instrument, 这里只留调试日志
+        log.debug('retry %s: %s: %s', endpoint_of(resource),
+                  type(error).__name__, error)
+
+    def __hedge_delay(self, policy, resource):
+        """
+        :return: 发出hedge请求前等待的秒数, 样本不足时为None
+        """
+        with self.__lock:
+            latency = self.__latency.get(endpoint_of(resource))
+            if latency is None or latency.count < policy.hedge_min_samples:
+                return None
+            return latency.percentile(policy.hedge_quantile)
+
+    def __observe(self, resource, send, deadline, throttle=None):
+        waited = pause(throttle)
+        if deadline is not None:
+            deadline += waited
+        start = time.perf_counter()
+        result = send(deadline)
+        self.__record(resource, time.perf_counter() - start)
+        return result
+
+    async def __observe_async(self, resource, send, deadline,
+                              throttle=None):
+        waited = await pause_async(throttle)
+        if deadline is not None:
+            deadline += waited
+        start = time.perf_counter()
+        result = await send(deadline)
+        self.__record(resource, time.perf_counter() - start)
+        return result
+
+    def __record(self, resource, elapsed):
+        key = endpoint_of(resource)
+        with self.__lock:
+            latency = self.__latency.get(key)
+            if latency is None:
+                latency = self.__latency[key] = LatencyHistogram()
+            latency.add(elapsed)
+
+    def __hedged(self, resource, send, deadline, delay, throttle):
+        if delay is None:
+            return self.__observe(resource, send, deadline)
+        executor = self.__pool()
+        first = executor.submit(self.__observe, resource, send, deadline)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+        with self.__lock:
+            self.hedges += 1
+        pending = {first, executor.submit(self.__observe, resource, send,
+                                          deadline, throttle)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+        # 两个请求都失败
+        return first.result()
+
+    async def __hedged_async(self, resource, send, deadline, delay,
+                             throttle):
+        import asyncio
+        if delay is None:
+            return await self.__observe_async(resource, send, deadline)
+        first = asyncio.ensure_future(self.__observe_async(resource, send,
+                                                           deadline))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        with self.__lock:
+            self.hedges += 1
+        pending = {first, asyncio.ensure_future(
+            self.__observe_async(resource, send, deadline, throttle))}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            return first.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def __pool(self):
+        if self.__executor is None:
+            with self.__lock:
+                if self.__executor is None:
+                    self.__executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers)
+        return self.__executor
+
+
+_default_retrier = None
+_default_lock = threading.Lock()
+
+
+def default_retrier():
+    """
+    进程内共享的默认重试配置, 第一次调用时创建
+    """
+    global _default_retrier
+    if _default_retrier is None:
+        with _default_lock:
+            if _default_retrier is None:
+                _default_retrier = Retrier()
+    return _default_retrier
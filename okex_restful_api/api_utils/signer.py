@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :signer
+"""
+import hashlib
+from urllib.parse import quote_plus
+
+
+def _quote(v):
+    # 与urlencode对单个值的处理一致
+    if isinstance(v, bytes):
+        return quote_plus(v)
+    return quote_plus(v if isinstance(v, str) else str(v))
+
+
+class Signer:
+    """
+    绑定api_key/secret_key的签名器, 结果与build_my_sign逐字节一致.
+    缓存{api_key}的签名, 并按参数名集合缓存排序后的参数布局.
+    """
+    __slots__ = ['api_key', '__suffix', '__api_sign', '__layouts']
+
+    def __init__(self, api_key, secret_key):
+        self.api_key = api_key
+        self.__suffix = 'secret_key=' + _quote(secret_key)
+        self.__layouts = dict()
+        self.__api_sign = None
+
+    def sign(self, params: dict):
+        """
+        :return: str, 大写的md5签名
+        """
+        keys = tuple(params)
+        layout = self.__layouts.get(keys)
+        if layout is None:
+            layout = tuple((k, _quote(k) + '=') for k in sorted(keys))
+            self.__layouts[keys] = layout
+        parts = [prefix + _quote(params[k]) for k, prefix in layout]
+        parts.append(self.__suffix)
+        data = '&'.join(parts).encode('utf-8')
+        return hashlib.md5(data).hexdigest().upper()
+
+    def sign_params(self, params: dict):
+        """
+        在params上直接加入sign, 不复制
+        :return: params
+        """
+        params['sign'] = self.sign(params)
+        return params
+
+    def api_sign(self):
+        """
+        :return: dict, {api_key, sign}, 缓存的同一个dict, 不要修改
+        """
+        if self.__api_sign is None:
+            self.__api_sign = dict(api_key=self.api_key,
+                                   sign=self.sign(dict(api_key=self.api_key)))
+        return self.__api_sign
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :transport
+"""
+import gzip
+import json
+import threading
+from urllib.parse import urlsplit, parse_qsl
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# http_get/http_post的session参数即transport, 需要提供:
+#   get(url, headers, timeout) -> 响应
+#   post(url, params, headers, timeout) -> 响应
+#   timeout为本次请求的超时秒数(重试的剩余时限), None为不限制
+# 响应只需要content(bytes)和status_code两个属性, 见HttpSession/Response.
+# AsyncHttpSession为异步版本, 参数相同, get/post直接返回bytes.
+
+# 不参与匹配也不写入记录的参数: 签名, api_key, 提币的交易密码
+REDACTED = ('sign', 'api_key', 'trade_pwd')
+
+
+class Response:
+    __slots__ = ['status_code', 'content']
+
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+
+
+class ReplayMiss(LookupError):
+    """
+    回放记录中没有对应的请求
+    """
+
+
+def request_key(method, url, params=None):
+    """
+    :return: (method, path, 排序后的参数), 与域名和签名无关
+    """
+    parts = urlsplit(url)
+    items = parse_qsl(parts.query, keep_blank_values=True)
+    items += [(k, str(v)) for k, v in (params or {}).items()]
+    return method, parts.path, tuple(sorted((k, v) for k, v in items
+                                            if k not in REDACTED))
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def load_records(path):
+    """
+    :return: list, [(request_key, status_code, content)]
+    """
+    records = []
+    with _open(path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            r = json.loads(line)
+            key = (r['m'], r['p'], tuple(tuple(i) for i in r['q']))
+            records.append((key, r['s'], r['b'].encode('utf-8')))
+    return records
+
+
+class RecordingTransport:
+    """
+    转发给实际的transport, 同时把请求/响应逐行写入jsonl文件,
+    路径以.gz结尾时gzip压缩; REDACTED中的sign, api_key和trade_pwd
+    不会写入, 其余参数以明文保存
+    """
+
+    def __init__(self, transport, path):
+        """
+        :param transport: HttpSession等
+        :param path: 记录文件, 追加写入
+        """
+        self.transport = transport
+        self.path = path
+        self.count = 0
+        self.__file = _open(path, 'a')
+        self.__lock = threading.Lock()
+
+    def get(self, url, headers=None, timeout=None):
+        resp = self.transport.get(url, headers=headers, timeout=timeout)
+        self.__record('GET', url, None, resp)
+        return resp
+
+    def post(self, url, params=None, headers=None, timeout=None):
+        resp = self.transport.post(url, params=params, headers=headers,
+                                   timeout=timeout)
+        self.__record('POST', url, params, resp)
+        return resp
+
+    def close(self):
+        with self.__lock:
+            self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __record(self, method, url, params, resp):
+        method, path, query = request_key(method, url, params)
+        line = json.dumps(dict(m=method, p=path, q=query,
+                               s=resp.status_code,
+                               b=resp.content.decode('utf-8')),
+                          separators=(',', ':'), ensure_ascii=False)
+        with self.__lock:
+            self.__file.write(line + '\n')
+            self.__file.flush()
+            self.count += 1
+
+
+class ReplayTransport:
+    """
+    进程内的假transport, 按(method, path, 参数)返回记录的响应;
+    同一请求有多条记录时按顺序返回, 用完后重复最后一条
+    """
+
+    def __init__(self, records=None, path=None):
+        """
+        :param records: list, [(request_key, status_code, content)],
+                        或{request_key: content}
+        :param path: RecordingTransport写的文件
+        """
+        self.misses = 0
+        self.__responses = dict()
+        self.__lock = threading.Lock()
+        if path:
+            self.extend(load_records(path))
+        if isinstance(records, dict):
+            records = [(k, 200, v) for k, v in records.items()]
+        self.extend(records or [])
+
+    def extend(self, records):
+        for key, status_code, content in records:
+            self.__responses.setdefault(key, []).append(
+                Response(content, status_code))
+
+    def add(self, method, url, content, params=None, status_code=200):
+        """
+        :param content: bytes, 或可以json序列化的对象
+        """
+        if not isinstance(content, bytes):
+            content = json.dumps(content, separators=(',', ':')).encode()
+        self.extend([(request_key(method, url, params), status_code,
+                      content)])
+
+    def get(self, url, headers=None, timeout=None):
+        return self.lookup(request_key('GET', url))
+
+    def post(self, url, params=None, headers=None, timeout=None):
+        return self.lookup(request_key('POST', url, params))
+
+    def lookup(self, key):
+        with self.__lock:
+            responses = self.__responses.get(key)
+            if not responses:
+                self.misses += 1
+                raise ReplayMiss(key)
+            return responses.pop(0) if len(responses) > 1 else responses[0]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class AsyncReplayTransport:
+    """
+    ReplayTransport的异步版本, 可替代AsyncHttpSession
+    """
+
+    def __init__(self, replay: ReplayTransport):
+        self.replay = replay
+
+    async def get(self, url, headers=None, timeout=None):
+        return self.replay.get(url).content
+
+    async def post(self, url, params=None, headers=None, timeout=None):
+        return self.replay.post(url, params=params).content
+
+    async def close(self):
+        pass
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """
+    本地http服务, 用ReplayTransport的记录响应任意域名下的同路径请求,
+    没有记录的请求返回404
+    """
+    daemon_threads = True
+
+    def __init__(self, replay: ReplayTransport, host='127.0.0.1', port=0):
+        super().__init__((host, port), _ReplayHandler)
+        self.replay = replay
+        self.__thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return 'http://%s:%d' % (host, port)
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.serve_forever,
+                                         daemon=True)
+        self.__thread.start()
+        return self
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.__reply('GET')
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else ''
+        self.__reply('POST', dict(parse_qsl(body, keep_blank_values=True)))
+
+    def log_message(self, *args):
+        pass
+
+    def __reply(self, method, params=None):
+        try:
+            resp = self.server.replay.lookup(request_key(method, self.path,
+                                                         params))
+        except ReplayMiss:
+            resp = Response(b'{"error_code":404}', 404)
+        self.send_response(resp.status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(resp.content)))
+        self.end_headers()
+        self.wfile.write(resp.content)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :arrays
+"""
+from itertools import chain
+from operator import itemgetter
+
+import numpy as np
+
+from .api_utils import is_error
+
+KLINE_DTYPE = np.dtype([('ts', '<i8'), ('open', '<f8'), ('high', '<f8'),
+                        ('low', '<f8'), ('close', '<f8'), ('volume', '<f8'),
+                        ('coin_volume', '<f8')])
+
+TRADE_DTYPE = np.dtype([('tid', '<i8'), ('date_ms', '<i8'),
+                        ('price', '<f8'), ('amount', '<f8'),
+                        ('side', 'i1')])
+
+SIDE = {'buy': 1, 'sell': -1}
+
+
+def depth_to_arrays(resp):
+    """
+    :param resp: depth接口返回, {asks:[[price, size]], bids:[[price, size]]}
+    :return: dict, {asks: (n, 2) float64 价格升序, bids: (n, 2) float64 价格降序}
+    """
+    if is_error(resp):
+        return resp
+    return dict(asks=_levels(resp.get('asks'), ascending=True),
+                bids=_levels(resp.get('bids'), ascending=False))
+
+
+def kline_to_records(resp):
+    """
+    :param resp: kline接口返回, [[ts, open, high, low, close, vol, (coin_vol)]]
+    :return: numpy record array, 字段见KLINE_DTYPE, 币币K线coin_volume为nan
+    """
+    if is_error(resp):
+        return resp
+    out = np.empty(len(resp), dtype=KLINE_DTYPE).view(np.recarray)
+    if not len(resp):
+        return out
+    width = len(resp[0])
+    data = np.fromiter(chain.from_iterable(resp), np.float64,
+                       width * len(resp)).reshape(-1, width)
+    out.ts = data[:, 0]
+    for i, name in enumerate(KLINE_DTYPE.names[1:], 1):
+        out[name] = data[:, i] if i < data.shape[1] else np.nan
+    return out
+
+
+def trades_to_records(resp):
+    """
+    :param resp: trades接口返回, [{tid, date_ms, price, amount, type}]
+    :return: numpy record array, 字段见TRADE_DTYPE, side买为1卖为-1
+    """
+    if is_error(resp):
+        return resp
+    n = len(resp)
+    out = np.empty(n, dtype=TRADE_DTYPE).view(np.recarray)
+    for name, dtype in (('tid', np.int64), ('date_ms', np.int64),
+                        ('price', np.float64), ('amount', np.float64)):
+        out[name] = np.fromiter(map(itemgetter(name), resp), dtype, n)
+    out.side = np.fromiter(map(SIDE.get, map(itemgetter('type'), resp)),
+                           np.int8, n)
+    return out
+
+
+def _levels(levels, ascending):
+    if not levels:
+        return np.empty((0, 2), dtype=np.float64)
+    # 展平后fromiter, 避免np.array逐行推断嵌套list的形状
+    data = np.fromiter(chain.from_iterable(levels), np.float64,
+                       2 * len(levels)).reshape(-1, 2)
+    if (data[0, 0] > data[-1, 0]) == ascending:
+        data = data[::-1]
+    return np.ascontiguousarray(data)
+
+
+DECODERS = dict(depth=depth_to_arrays,
+                kline=kline_to_records,
+                trades=trades_to_records)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :async_api
+"""
+from .api_utils import AsyncRestClient, gather_concurrently
+from .bulk_cancel import merge_cancel_results
+from .pagination import (aiter_pages, trades_history_pages,
+                         order_history_pages, account_records_pages)
+from .future_api import FutureApi
+from .spot_api import SpotApi
+
+
+class AsyncFutureApi(AsyncRestClient, FutureApi):
+    """
+    FutureApi的异步版本, 方法与FutureApi相同, 调用结果需要await
+    """
+
+    def __init__(self, api_key=None, secret_key=None, session=None,
+                 rate_limiter=None, cache=None, result_type=None,
+                 instrument=None, retrier=None):
+        """
+        :param api_key: api_key
+        :param secret_key: secret_key
+        :param session: AsyncHttpSession
+        :param rate_limiter: RateLimiter, 可与同步客户端共享
+        :param cache: ResponseCache, 可与同步客户端共享
+        :param result_type: 同同步客户端
+        :param instrument: Instrumentation, 可与同步客户端共享
+        :param retrier: Retrier, 可与同步客户端共享
+        """
+        super().__init__(api_key, secret_key, session, rate_limiter, cache,
+                         result_type, instrument, retrier)
+
+    async def snapshot(self, symbols, contract_types,
+                       endpoints=('ticker', 'depth'), limit=None, **params):
+        """
+        同FutureApi.snapshot, 所有请求在当前事件循环中并发
+        :param limit: 同时进行的请求数上限, None为不限制
+        """
+        jobs = self._snapshot_jobs(symbols, contract_types, endpoints, params)
+        return await gather_concurrently(jobs, limit)
+
+    async def cancel_many(self, order_ids, symbol, contract_type, limit=None):
+        """
+        同FutureApi.cancel_many, 所有批次在当前事件循环中并发
+        :param limit: 同时进行的请求数上限, None为不限制
+        """
+        jobs = self._cancel_jobs(order_ids, symbol, contract_type)
+        return merge_cancel_results(await gather_concurrently(jobs, limit))
+
+    def iter_trades_history(self, symbol, date, since=0, prefetch=False):
+        """
+        同FutureApi.iter_trades_history, 返回async generator
+        """
+        return aiter_pages(trades_history_pages(self, symbol, date, since),
+                           prefetch)
+
+
+class AsyncSpotApi(AsyncRestClient, SpotApi):
+    """
+    SpotApi的异步版本, 方法与SpotApi相同, 调用结果需要await
+    """
+
+    def __init__(self, api_key=None, secret_key=None, session=None,
+                 rate_limiter=None, cache=None, result_type=None,
+                 instrument=None, retrier=None):
+        """
+        :param api_key: api_key
+        :param secret_key: secret_key
+        :param session: AsyncHttpSession
+        :param rate_limiter: RateLimiter, 可与同步客户端共享
+        :param cache: ResponseCache, 可与同步客户端共享
+        :param result_type: 同同步客户端
+        :param instrument: Instrumentation, 可与同步客户端共享
+        :param retrier: Retrier, 可与同步客户端共享
+        """
+        super().__init__(api_key, secret_key, session, rate_limiter, cache,
+                         result_type, instrument, retrier)
+
+    async def cancel_many(self, symbol, order_ids, limit=None):
+        """
+        同SpotApi.cancel_many, 所有批次在当前事件循环中并发
+        :param limit: 同时进行的请求数上限, None为不限制
+        """
+        jobs = self._cancel_jobs(symbol, order_ids)
+        return merge_cancel_results(await gather_concurrently(jobs, limit))
+
+    def iter_order_history(self, symbol, status, page_length=200,
+                           prefetch=False):
+        """
+        同SpotApi.iter_order_history, 返回async generator
+        """
+        return aiter_pages(order_history_pages(self, symbol, status,
+                                               page_length), prefetch)
+
+    def iter_account_records(self, symbol, type, page_length=50,
+                             prefetch=False):
+        """
+        同SpotApi.iter_account_records, 返回async generator
+        """
+        return aiter_pages(account_records_pages(self, symbol, type,
+                                                 page_length), prefetch)
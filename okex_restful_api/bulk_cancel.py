@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :bulk_cancel
+"""
+from .api_utils import is_error
+
+# cancel/cancel_order一次最多撤销3个订单
+CANCEL_LIMIT = 3
+
+
+def cancel_chunks(order_ids, size=CANCEL_LIMIT):
+    """
+    :param order_ids: list 或 以","分隔的str
+    :return: list, 每个元素为以","分隔的不超过size个订单ID
+    """
+    if isinstance(order_ids, str):
+        order_ids = order_ids.split(',')
+    ids = [str(i).strip() for i in order_ids if str(i).strip()]
+    return [','.join(ids[i:i + size]) for i in range(0, len(ids), size)]
+
+
+def merge_cancel_results(result):
+    """
+    合并各批次的撤单结果
+    :param result: FanoutResult, {以","分隔的订单ID: resp}
+    :return: dict, {success: [order_id], error: {order_id: 错误码/异常/resp}}
+    """
+    report = dict(success=[], error=dict())
+    for chunk, resp in result.items():
+        _merge(report, chunk.split(','), resp)
+    for chunk, resp in result.errors.items():
+        _merge(report, chunk.split(','), resp)
+    return report
+
+
+def _merge(report, ids, resp):
+    if isinstance(resp, dict) and ('success' in resp or 'error' in resp):
+        # 多个订单: {success:"id1,id2", error:"id3:code,id4"}
+        for i in _split(resp.get('success')):
+            report['success'].append(i)
+        for item in _split(resp.get('error')):
+            order_id, _, code = item.partition(':')
+            report['error'][order_id] = code or None
+    elif not is_error(resp) and not isinstance(resp, Exception):
+        # 单个订单: {order_id:int, result:true}
+        report['success'].extend(ids)
+    else:
+        error = resp.get('error_code', resp) if isinstance(resp, dict) \
+            else resp
+        for i in ids:
+            report['error'][i] = error
+
+
+def _split(value):
+    if not value:
+        return []
+    return [i for i in str(value).split(',') if i]
@@ -4,15 +4,41 @@
 @Date     :2018-03-16-10:58
 @Author   : Xin Zhang
 """
-from .api_utils import (rest_api, http_post, http_get,
-                        build_api_sign, build_param_with_sign)
+from functools import partial
 
+from .api_utils import rest_api, Signer, RestClient, run_concurrently
+from .bulk_cancel import cancel_chunks, merge_cancel_results
+from .pagination import iter_pages, trades_history_pages
+from .results import result_decoders
 
-class FutureApi:
-    def __init__(self, api_key=None, secret_key=None):
+SNAPSHOT_ENDPOINTS = ('ticker', 'depth', 'trades', 'kline',
+                      'hold_amount', 'price_limit')
+
+
+class FutureApi(RestClient):
+    def __init__(self, api_key=None, secret_key=None, session=None,
+                 rate_limiter=None, cache=None, result_type=None,
+                 instrument=None, retrier=None):
+        """
+        :param api_key: api_key
+        :param secret_key: secret_key
+        :param session: HttpSession, 为None时使用进程内共享的默认会话
+        :param rate_limiter: RateLimiter, 可在多个实例间共享, None为不限流
+        :param cache: ResponseCache, 公共行情接口的缓存, None为不缓存
+        :param result_type: None返回原始json, numpy时depth/trades/kline
+                            返回numpy数组, 见arrays.py; object时返回
+                            __slots__结果对象, 见models.py
+        :param instrument: Instrumentation, 请求耗时/错误统计, None为不统计
+        :param retrier: Retrier, 按接口类别的重试配置, None为默认配置
+        """
         self.__api_key = api_key
         self.__secret_key = secret_key
+        self.__signer = Signer(api_key, secret_key)
         self.__api = rest_api.future
+        self._init_client(api_key, session, rate_limiter, cache, instrument,
+                          retrier, {self.__api.paths[k]: f for k, f in
+                                    result_decoders(result_type).items()
+                                    if k in self.__api.paths})
 
     def ticker(self, symbol, contract_type):
         """
@@ -22,7 +48,7 @@ class FutureApi:
         :return: dict, {date:int, ticker:{...}}
         """
         param = dict(symbol=symbol, contract_type=contract_type)
-        return http_get(self.__api.ticker, **param)
+        return self._http_get(self.__api.ticker, **param)
 
     def depth(self, symbol, contract_type, size, merge=0):
         """
@@ -37,7 +63,7 @@ class FutureApi:
                      contract_type=contract_type,
                      size=size,
                      merge=merge)
-        return http_get(self.__api.depth, **param)
+        return self._http_get(self.__api.depth, **param)
 
     def trades(self, symbol, contract_type):
         """
@@ -47,7 +73,7 @@ class FutureApi:
         :return: list, [{amount:int,..,tid:int,type:buy},{}]
         """
         param = dict(symbol=symbol, contract_type=contract_type)
-        return http_get(self.__api.trades, **param)
+        return self._http_get(self.__api.trades, **param)
 
     def index(self, symbol):
         """
@@ -56,14 +82,14 @@ class FutureApi:
         :return:dict, {future_index:int}
         """
         param = dict(symbol=symbol)
-        return http_get(self.__api.index, **param)
+        return self._http_get(self.__api.index, **param)
 
     def exchange_rate(self):
         """
         获取美元人民币汇率
         :return: dict, {rate:float}
         """
-        return http_get(self.__api.exchange_rate)
+        return self._http_get(self.__api.exchange_rate)
 
     def estimated_price(self, symbol):
         """
@@ -71,7 +97,7 @@ class FutureApi:
         :param symbol:btc_usd ltc_usd eth_usd etc_usd bch_usd
         :return: dict, {forecast_price:float}
         """
-        return http_get(self.__api.estimated_price, symbol=symbol)
+        return self._http_get(self.__api.estimated_price, symbol=symbol)
 
     def kline(self, symbol, type, contract_type, size=0, since=0):
         """
@@ -86,7 +112,7 @@ class FutureApi:
         param = dict(symbol=symbol, type=type,
                      contract_type=contract_type,
                      size=size, since=since)
-        return http_get(self.__api.kline, **param)
+        return self._http_get(self.__api.kline, **param)
 
     def hold_amount(self, symbol, contract_type):
         """
@@ -96,7 +122,7 @@ class FutureApi:
         :return: list, [{amount:int, contract_name:str}]
         """
         param = dict(symbol=symbol, contract_type=contract_type)
-        return http_get(self.__api.hold_amount, **param)
+        return self._http_get(self.__api.hold_amount, **param)
 
     def price_limit(self, symbol, contract_type):
         """
@@ -106,7 +132,7 @@ class FutureApi:
         :return: dict, {high:float, low:float}
         """
         param = dict(symbol=symbol, contract_type=contract_type)
-        return http_get(self.__api.price_limit, **param)
+        return self._http_get(self.__api.price_limit, **param)
 
     def userinfo(self):
         """
@@ -114,8 +140,8 @@ class FutureApi:
         :return: dict, {info:{}, result:true}
         """
         self.__assert_api_secret_key()
-        param = build_api_sign(self.__api_key, self.__secret_key)
-        return http_post(self.__api.userinfo, param)
+        param = self.__signer.api_sign()
+        return self._http_post(self.__api.userinfo, param)
 
     def position(self, symbol, contract_type):
         """
@@ -125,8 +151,8 @@ class FutureApi:
         self.__assert_api_secret_key()
         param = dict(symbol=symbol, contract_type=contract_type,
                      api_key=self.__api_key)
-        param = build_param_with_sign(param, self.__secret_key)
-        return http_post(self.__api.position, param)
+        param = self.__signer.sign_params(param)
+        return self._http_post(self.__api.position, param)
 
     def trade(self, symbol, contract_type, price, amount, type, **params):
         """
@@ -153,8 +179,8 @@ class FutureApi:
                      price=price, amount=amount, type=type,
                      api_key=self.__api_key)
         param.update(op_param)
-        param = build_param_with_sign(param, self.__secret_key)
-        return http_post(self.__api.trade, param)
+        param = self.__signer.sign_params(param)
+        return self._http_post(self.__api.trade, param)
 
     def trades_history(self, symbol, date, since):
         """
@@ -167,8 +193,20 @@ class FutureApi:
         self.__assert_api_secret_key()
         param = dict(symbol=symbol, date=date,
                      since=since, api_key=self.__api_key)
-        param = build_param_with_sign(param, self.__secret_key)
-        return http_post(self.__api.trades_history, param)
+        param = self.__signer.sign_params(param)
+        return self._http_post(self.__api.trades_history, param)
+
+    def iter_trades_history(self, symbol, date, since=0, prefetch=False):
+        """
+        按交易Id逐页获取合约交易历史的生成器, 消费到下一页时才请求
+        :param symbol: btc_usd ltc_usd eth_usd etc_usd bch_usd
+        :param date: 合约交割时间，格式yyyy-MM-dd
+        :param since: 交易Id起始位置
+        :param prefetch: True时提前请求下一页
+        :return: generator, 逐个返回成交dict, 请求失败时抛出PageError
+        """
+        return iter_pages(trades_history_pages(self, symbol, date, since),
+                          prefetch)
 
     def batch_trade(self, symbol, contract_type, order_data, **params):
         """
@@ -191,12 +229,12 @@ class FutureApi:
         param = dict(symbol=symbol, contract_type=contract_type,
                      order_data=order_data, api_key=self.__api_key)
         param.update(op_param)
-        param = build_param_with_sign(param, self.__secret_key)
-        return http_post(self.__api.batch_trade, param)
+        param = self.__signer.sign_params(param)
+        return self._http_post(self.__api.batch_trade, param)
 
     def cancel(self, order_id, symbol, contract_type):
         """
-        取消合约订单
+        取消合约订单, 访问频率 20次/2秒
         :param order_id: 订单ID(多个订单ID中间以","分隔,一次最多允许撤消3个订单)
         :param symbol: btc_usd ltc_usd eth_usd etc_usd bch_usd
         :param contract_type: this_week:当周 next_week:下周 quarter:季度
@@ -206,8 +244,24 @@ class FutureApi:
         param = dict(order_id=order_id, symbol=symbol,
                      contract_type=contract_type,
                      api_key=self.__api_key)
-        param = build_param_with_sign(param, self.__secret_key)
-        return http_post(self.__api.cancel, param)
+        param = self.__signer.sign_params(param)
+        return self._http_post(self.__api.cancel, param)
+
+    def cancel_many(self, order_ids, symbol, contract_type, max_workers=None):
+        """
+        批量撤销合约订单, 按每次3个拆分后并发调用cancel
+        :param order_ids: list 或 以","分隔的订单ID
+        :param symbol: btc_usd ltc_usd eth_usd etc_usd bch_usd
+        :param contract_type: this_week:当周 next_week:下周 quarter:季度
+        :param max_workers: 并发线程数, 默认为min(32, 批次数)
+        :return: dict, {success:[order_id], error:{order_id: 错误码/异常}}
+        """
+        jobs = self._cancel_jobs(order_ids, symbol, contract_type)
+        return merge_cancel_results(run_concurrently(jobs, max_workers))
+
+    def _cancel_jobs(self, order_ids, symbol, contract_type):
+        return {chunk: partial(self.cancel, chunk, symbol, contract_type)
+                for chunk in cancel_chunks(order_ids)}
 
     def order_info(self, symbol, contract_type, status, order_id=-1, **params):
         """
@@ -233,8 +287,8 @@ class FutureApi:
                      status=status, order_id=order_id,
                      api_key=self.__api_key)
         param.update(op_param)
-        param = build_param_with_sign(param, self.__secret_key)
-        return http_post(self.__api.order_info, param)
+        param = self.__signer.sign_params(param)
+        return self._http_post(self.__api.order_info, param)
 
     def orders_info(self, symbol, contract_type, order_id):
         """
@@ -247,8 +301,8 @@ class FutureApi:
         self.__assert_api_secret_key()
         param = dict(symbol=symbol, contract_type=contract_type,
                      order_id=order_id, api_key=self.__api_key)
-        param = build_param_with_sign(param, self.__secret_key)
-        return http_post(self.__api.orders_info, param)
+        param = self.__signer.sign_params(param)
+        return self._http_post(self.__api.orders_info, param)
 
     def userinfo_4fix(self):
         """
@@ -256,8 +310,8 @@ class FutureApi:
         :return: dict, {info:{btc:{},...}, result:true}
         """
         self.__assert_api_secret_key()
-        param = build_api_sign(self.__api_key, self.__secret_key)
-        return http_post(self.__api.userinfo_4fix, param)
+        param = self.__signer.api_sign()
+        return self._http_post(self.__api.userinfo_4fix, param)
 
     def position_4fix(self, symbol, contract_type, **params):
         """
@@ -275,8 +329,8 @@ class FutureApi:
         param = dict(symbol=symbol, contract_type=contract_type,
                      api_key=self.__api_key)
         param.update(op_param)
-        param = build_param_with_sign(param, self.__secret_key)
-        return http_post(self.__api.position_4fix, param)
+        param = self.__signer.sign_params(param)
+        return self._http_post(self.__api.position_4fix, param)
 
     def explosive(self, symbol, contract_type, **params):
         """
@@ -308,8 +362,8 @@ class FutureApi:
         param = dict(symbol=symbol, contract_type=contract_type,
                      api_key=self.__api_key)
         param.update(op_param)
-        param = build_param_with_sign(param, self.__secret_key)
-        return http_post(self.__api.explosive, param)
+        param = self.__signer.sign_params(param)
+        return self._http_post(self.__api.explosive, param)
 
     def devolve(self, symbol, type, amount):
         """
@@ -322,8 +376,38 @@ class FutureApi:
         self.__assert_api_secret_key()
         param = dict(symbol=symbol, type=type,
                      amount=amount, api_key=self.__api_key)
-        param = build_param_with_sign(param, self.__secret_key)
-        return http_post(self.__api.devolve, param)
+        param = self.__signer.sign_params(param)
+        return self._http_post(self.__api.devolve, param)
+
+    def snapshot(self, symbols, contract_types, endpoints=('ticker', 'depth'),
+                 max_workers=None, **params):
+        """
+        并发获取 合约×交割类型×接口 的行情快照
+        :param symbols: list, 如[btc_usd, ltc_usd]
+        :param contract_types: list, 如[this_week, next_week, quarter]
+        :param endpoints: ticker depth trades kline hold_amount price_limit
+        :param max_workers: 并发线程数, 默认为min(32, 请求个数)
+        :param params: 各接口的额外参数, 如depth=dict(size=20),
+                       kline=dict(type='1min'); depth默认size=20
+        :return: FanoutResult, {(symbol, contract_type, endpoint): resp},
+                 失败的请求记录在errors中
+        """
+        jobs = self._snapshot_jobs(symbols, contract_types, endpoints, params)
+        return run_concurrently(jobs, max_workers)
+
+    def _snapshot_jobs(self, symbols, contract_types, endpoints, params):
+        for endpoint in endpoints:
+            assert endpoint in SNAPSHOT_ENDPOINTS, \
+                'Unsupported snapshot endpoint: %s' % endpoint
+        endpoint_params = dict(depth=dict(size=20))
+        endpoint_params.update(params)
+        return {(symbol, contract_type, endpoint):
+                partial(getattr(self, endpoint), symbol,
+                        contract_type=contract_type,
+                        **endpoint_params.get(endpoint, {}))
+                for symbol in symbols
+                for contract_type in contract_types
+                for endpoint in endpoints}
 
     def __assert_api_secret_key(self):
         assert (
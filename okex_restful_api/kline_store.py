@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :kline_store
+"""
+import os
+import time
+
+import numpy as np
+
+from .api_utils import is_error
+from .pagination import PageError
+
+# 每列一个文件, 只追加; ts最后写入, 以ts的长度为准
+TS_COLUMN = 'ts'
+COLUMNS = ('open', 'high', 'low', 'close', 'volume', 'coin_volume')
+
+PERIOD_SECONDS = {
+    '1min': 60, '3min': 180, '5min': 300, '15min': 900, '30min': 1800,
+    '1hour': 3600, '2hour': 7200, '4hour': 14400, '6hour': 21600,
+    '12hour': 43200, '1day': 86400, '3day': 259200, '1week': 604800,
+}
+
+
+def kline_array(bars):
+    """
+    :param bars: kline接口返回, 原始json的list, result_type='numpy'时的
+                 record array, 或result_type='object'时的[Kline]
+    :return: (n, 6或7) float64数组, 列依次为ts, open, high, low, close,
+             volume, (coin_volume)
+    """
+    names = getattr(getattr(bars, 'dtype', None), 'names', None)
+    if names:
+        data = np.column_stack([bars[name].astype(np.float64)
+                                for name in (TS_COLUMN,) + COLUMNS])
+    elif len(bars) and hasattr(bars[0], 'to_dict'):
+        data = np.array([[getattr(bar, name) for name in
+                          (TS_COLUMN,) + COLUMNS] for bar in bars],
+                        dtype=np.float64)
+    else:
+        data = np.asarray(bars, dtype=np.float64)
+        # 空列表无法推断列数, 按币币的6列; 已是二维时(如__closed)保持不变
+        if data.ndim != 2:
+            data = data.reshape(len(data), -1 if len(data) else len(COLUMNS))
+        return data
+    # 币币K线没有coin_volume, 与原始json一样只保留6列
+    if len(data) and np.isnan(data[:, -1]).all():
+        data = data[:, :-1]
+    return data
+
+
+class KlineStore:
+    """
+    K线本地列式存储: root/symbol/contract_type(币币为spot)/period/列名.bin
+    每列为原始的little-endian数组文件, 读取时memmap
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, symbol, period, contract_type=None):
+        return os.path.join(self.root, symbol, contract_type or 'spot',
+                            period)
+
+    def last_timestamp(self, symbol, period, contract_type=None):
+        """
+        :return: int, 最后一根K线的时间戳(毫秒), 没有数据时为None
+        """
+        path = self.__repair(self.path(symbol, period, contract_type))
+        ts_file = self.__file(path, TS_COLUMN)
+        if not os.path.exists(ts_file) or not os.path.getsize(ts_file):
+            return None
+        with open(ts_file, 'rb') as f:
+            f.seek(-8, os.SEEK_END)
+            return int(np.frombuffer(f.read(8), dtype='<i8')[0])
+
+    def append(self, symbol, period, bars, contract_type=None):
+        """
+        追加K线, 丢弃不晚于已存最后时间戳的K线, 并按时间戳去重
+        :param bars: 接口返回的 [[ts, open, high, low, close, vol, ...]],
+                     也可以是record array或[Kline], 见kline_array
+        :return: int, 实际追加的条数
+        """
+        data = kline_array(bars)
+        if not len(data):
+            return 0
+        path = self.__repair(self.path(symbol, period, contract_type))
+        os.makedirs(path, exist_ok=True)
+        ts = data[:, 0].astype('<i8')
+        last = self.last_timestamp(symbol, period, contract_type)
+        ts, index = np.unique(ts, return_index=True)
+        if last is not None:
+            keep = ts > last
+            ts, index = ts[keep], index[keep]
+        if not len(ts):
+            return 0
+        data = data[index]
+        for i, name in enumerate(COLUMNS[:data.shape[1] - 1], 1):
+            with open(self.__file(path, name), 'ab') as f:
+                f.write(np.ascontiguousarray(data[:, i], dtype='<f8')
+                        .tobytes())
+        with open(self.__file(path, TS_COLUMN), 'ab') as f:
+            f.write(ts.tobytes())
+        return len(ts)
+
+    def read(self, symbol, period, contract_type=None):
+        """
+        :return: dict, {ts: int64数组, open: float64数组, ...}, 均为只读memmap
+        """
+        path = self.__repair(self.path(symbol, period, contract_type))
+        result = dict()
+        for name, dtype in self.__columns(path):
+            file = self.__file(path, name)
+            if os.path.getsize(file):
+                result[name] = np.memmap(file, dtype=dtype, mode='r')
+            else:
+                result[name] = np.empty(0, dtype=dtype)
+        return result
+
+    @staticmethod
+    def __file(path, name):
+        return os.path.join(path, '%s.bin' % name)
+
+    def __columns(self, path):
+        names = [(TS_COLUMN, '<i8')] + [(n, '<f8') for n in COLUMNS]
+        return [(n, d) for n, d in names
+                if os.path.exists(self.__file(path, n))]
+
+    def __repair(self, path):
+        # 写入中断时其他列可能比ts长, 截断到ts的长度
+        ts_file = self.__file(path, TS_COLUMN)
+        if not os.path.exists(ts_file):
+            return path
+        size = os.path.getsize(ts_file)
+        for name, _ in self.__columns(path):
+            file = self.__file(path, name)
+            if os.path.getsize(file) > size:
+                os.truncate(file, size)
+        return path
+
+
+class KlineSync:
+    """
+    从本地已存的最后时间戳向后分页下载K线, 重复运行只补齐缺失的部分
+    """
+
+    def __init__(self, store, spot_api=None, future_api=None, size=2000):
+        """
+        :param store: KlineStore
+        :param spot_api: SpotApi, 同步币币K线时需要
+        :param future_api: FutureApi, 同步合约K线时需要
+        :param size: 每次请求的条数
+        """
+        self.store = store
+        self.spot_api = spot_api
+        self.future_api = future_api
+        self.size = size
+
+    def sync(self, symbol, period, contract_type=None, since=0):
+        """
+        :param symbol: 币币如ltc_btc, 合约如btc_usd
+        :param period: 1min/3min/5min/15min/30min/1hour/.../1day/3day/1week
+        :param contract_type: 合约类型, None为币币
+        :param since: 本地没有数据时的起始时间戳(毫秒)
+        :return: int, 新增的K线条数
+        :raise PageError: 请求失败, cursor为这一页的since, 之前的页已落盘,
+                          再次调用会从断点继续
+        """
+        total = 0
+        while True:
+            last = self.store.last_timestamp(symbol, period, contract_type)
+            start = since if last is None else last + 1
+            bars = self.__fetch(symbol, period, contract_type, start)
+            if is_error(bars):
+                raise PageError(start, bars)
+            if not len(bars):
+                break
+            bars = self.__closed(kline_array(bars), period)
+            appended = self.store.append(symbol, period, bars, contract_type)
+            if not appended:
+                break
+            total += appended
+        return total
+
+    def __fetch(self, symbol, period, contract_type, since):
+        if contract_type is None:
+            return self.spot_api.kline(symbol, period, size=self.size,
+                                       since=since)
+        return self.future_api.kline(symbol, period, contract_type,
+                                     size=self.size, since=since)
+
+    @staticmethod
+    def __closed(bars, period):
+        # 最后一根K线可能还未走完, 不落盘
+        end = (time.time() - PERIOD_SECONDS[period]) * 1000
+        return bars[bars[:, 0] <= end]
@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :market_bus
+"""
+import json
+import time
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .api_utils import is_error
+from .arrays import depth_to_arrays
+
+TICKER_FIELDS = ('last', 'buy', 'sell', 'high', 'low', 'vol')
+TICKER_DTYPE = np.dtype([('ts', '<i8')] +
+                        [(name, '<f8') for name in TICKER_FIELDS])
+
+# 每个槽位以8字节的seq开头, 槽位按缓存行对齐
+_ALIGN = 64
+# 共享内存开头: 目录json的长度(8字节) + 目录
+_HEADER = 8
+
+_attach_lock = threading.Lock()
+
+
+def depth_dtype(levels):
+    """
+    :return: 深度槽位的dtype, asks价格升序, bids价格降序, 只有前*_len档有效
+    """
+    return np.dtype([('ts', '<i8'), ('asks_len', '<i8'), ('bids_len', '<i8'),
+                     ('asks', '<f8', (levels, 2)),
+                     ('bids', '<f8', (levels, 2))])
+
+
+def _float(value):
+    # 0和0.0是有效值(如成交量), 只有缺少的字段记为nan
+    return float('nan') if value is None else float(value)
+
+
+def _align(n):
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _attach(name):
+    """
+    只读取不负责删除: 3.13之前附加时也会登记到resource_tracker,
+    读取进程退出时会删除发布者的共享内存. 事后unregister不可行,
+    fork出的子进程与发布者共用tracker, 会把发布者的登记一并移除
+    """
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        pass
+    from multiprocessing import resource_tracker
+    with _attach_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name)
+        finally:
+            resource_tracker.register = register
+
+
+class _Slot:
+    __slots__ = ['seq', 'record']
+
+    def __init__(self, buf, offset, dtype):
+        self.seq = np.ndarray((1,), '<i8', buf, offset)
+        self.record = np.ndarray((), dtype, buf, offset + 8)
+
+
+class MarketBus:
+    """
+    共享内存中的行情槽位: 每个(ticker|depth, symbol, contract_type)一个
+    seqlock保护的固定大小槽位. 目录写在共享内存开头, 读取进程只需要name
+    """
+
+    def __init__(self, shm, directory):
+        self.shm = shm
+        self.levels = directory['levels']
+        dtypes = dict(ticker=TICKER_DTYPE, depth=depth_dtype(self.levels))
+        self.slots = {(kind, symbol, contract_type):
+                      _Slot(shm.buf, offset, dtypes[kind])
+                      for kind, symbol, contract_type, offset
+                      in directory['slots']}
+
+    @classmethod
+    def create(cls, name=None, tickers=(), depths=(), levels=20):
+        """
+        :param tickers: [(symbol, contract_type)], 币币contract_type为None
+        :param depths: [(symbol, contract_type)]
+        :param levels: 深度槽位保存的档数
+        """
+        entries = [('ticker', s, c, TICKER_DTYPE.itemsize) for s, c in tickers]
+        entries += [('depth', s, c, depth_dtype(levels).itemsize)
+                    for s, c in depths]
+        # 先按最长的偏移估计目录大小, 再排布槽位
+        head = _align(_HEADER + len(json.dumps(dict(
+            levels=levels, slots=[[k, s, c, 2 ** 62]
+                                  for k, s, c, _ in entries]))))
+        slots, offset = [], head
+        for kind, symbol, contract_type, size in entries:
+            slots.append([kind, symbol, contract_type, offset])
+            offset += _align(8 + size)
+        directory = dict(levels=levels, slots=slots)
+        data = json.dumps(directory).encode()
+        shm = shared_memory.SharedMemory(name, create=True, size=offset)
+        shm.buf[:offset] = bytes(offset)
+        shm.buf[_HEADER:_HEADER + len(data)] = data
+        # 长度最后写入, 读取方看到长度时目录已完整
+        np.ndarray((1,), '<i8', shm.buf, 0)[0] = len(data)
+        return cls(shm, directory)
+
+    @classmethod
+    def attach(cls, name):
+        shm = _attach(name)
+        length = int(np.ndarray((1,), '<i8', shm.buf, 0)[0])
+        directory = json.loads(bytes(shm.buf[_HEADER:_HEADER + length]))
+        return cls(shm, directory)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def keys(self):
+        return list(self.slots)
+
+    def write(self, kind, symbol, contract_type, fill):
+        """
+        seqlock写入: seq为奇数时表示正在写
+        :param fill: fill(record), 就地修改槽位
+        """
+        slot = self.slots[(kind, symbol, contract_type)]
+        slot.seq[0] += 1
+        fill(slot.record)
+        slot.seq[0] += 1
+
+    def read(self, kind, symbol, contract_type=None, spins=10000):
+        """
+        :return: (版本号, 槽位的一致拷贝), 从未写入时为(0, None)
+        """
+        slot = self.slots[(kind, symbol, contract_type)]
+        for _ in range(spins):
+            seq = int(slot.seq[0])
+            if seq & 1:
+                continue
+            record = slot.record.copy()
+            if int(slot.seq[0]) == seq:
+                return seq // 2, record if seq else None
+        raise TimeoutError('slot %s %s %s is always being written'
+                           % (kind, symbol, contract_type))
+
+    def version(self, kind, symbol, contract_type=None):
+        """
+        :return: int, 写入次数, 用于不拷贝地判断是否有更新
+        """
+        return int(self.slots[(kind, symbol, contract_type)].seq[0]) // 2
+
+    def view(self, kind, symbol, contract_type=None):
+        """
+        :return: 槽位的numpy视图(零拷贝), 读取期间可能被改写,
+                 需要一致性时先后比较version或使用read
+        """
+        return self.slots[(kind, symbol, contract_type)].record
+
+    def close(self):
+        # 释放视图后才能关闭共享内存
+        self.slots = {}
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+class MarketBusPublisher:
+    """
+    一个进程通过FutureApi/SpotApi请求行情, 写入共享内存,
+    同一台机器上的其他进程用MarketBusReader读取, 不再各自请求
+    """
+
+    def __init__(self, future_api=None, spot_api=None, tickers=(),
+                 depths=(), levels=20, name=None):
+        """
+        :param tickers: [(symbol, contract_type)], 币币contract_type为None
+        :param depths: [(symbol, contract_type)]
+        :param levels: 深度保存的档数
+        :param name: 共享内存名, None时自动生成, 见self.name
+        """
+        self.future_api = future_api
+        self.spot_api = spot_api
+        self.tickers = list(tickers)
+        self.depths = list(depths)
+        self.bus = MarketBus.create(name, self.tickers, self.depths, levels)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def name(self):
+        return self.bus.name
+
+    def publish_ticker(self, symbol, contract_type, resp):
+        """
+        :param resp: ticker接口返回, 或result_type='object'时的Ticker
+        :return: bool, 是否写入
+        """
+        if is_error(resp):
+            return False
+        # Ticker对象同样支持get, 缺少的字段为None
+        ticker = resp['ticker'] if isinstance(resp, dict) else resp
+        values = (int(time.time() * 1000),) + tuple(
+            _float(ticker.get(name)) for name in TICKER_FIELDS)
+
+        def fill(record):
+            record[...] = values
+
+        self.bus.write('ticker', symbol, contract_type, fill)
+        return True
+
+    def publish_depth(self, symbol, contract_type, resp):
+        """
+        :param resp: depth接口返回, result_type='numpy'时的数组,
+                     或result_type='object'时的DepthBook
+        :return: bool, 是否写入
+        """
+        if is_error(resp):
+            return False
+        if not isinstance(resp.get('asks'), np.ndarray):
+            resp = depth_to_arrays(resp)
+        levels = self.bus.levels
+        asks, bids = resp['asks'][:levels], resp['bids'][:levels]
+        ts = int(time.time() * 1000)
+
+        def fill(record):
+            record['ts'] = ts
+            record['asks_len'] = len(asks)
+            record['bids_len'] = len(bids)
+            record['asks'][:len(asks)] = asks
+            record['bids'][:len(bids)] = bids
+
+        self.bus.write('depth', symbol, contract_type, fill)
+        return True
+
+    def poll_once(self):
+        """
+        请求并发布所有ticker和depth
+        :return: int, 写入的槽位数
+        """
+        count = 0
+        for symbol, contract_type in self.tickers:
+            count += self.publish_ticker(symbol, contract_type,
+                                         self.__fetch('ticker', symbol,
+                                                      contract_type))
+        for symbol, contract_type in self.depths:
+            count += self.publish_depth(symbol, contract_type,
+                                        self.__fetch('depth', symbol,
+                                                     contract_type))
+        return count
+
+    def subscribe(self, scheduler, ticker_interval=1.0, depth_interval=0.5):
+        """
+        交给PollingScheduler轮询, 响应变化时写入
+        """
+        for symbol, contract_type in self.tickers:
+            scheduler.subscribe(*self.__call('ticker', symbol, contract_type),
+                                interval=ticker_interval,
+                                callback=self.__callback(
+                                    self.publish_ticker, symbol,
+                                    contract_type))
+        for symbol, contract_type in self.depths:
+            scheduler.subscribe(*self.__call('depth', symbol, contract_type),
+                                interval=depth_interval,
+                                callback=self.__callback(
+                                    self.publish_depth, symbol,
+                                    contract_type))
+
+    def close(self):
+        self.bus.close()
+        self.bus.unlink()
+
+    def __call(self, method, symbol, contract_type):
+        if contract_type is None:
+            args = (symbol, self.bus.levels) if method == 'depth' \
+                else (symbol,)
+            return (getattr(self.spot_api, method),) + args
+        args = (symbol, contract_type, self.bus.levels) \
+            if method == 'depth' else (symbol, contract_type)
+        return (getattr(self.future_api, method),) + args
+
+    def __fetch(self, method, symbol, contract_type):
+        func, *args = self.__call(method, symbol, contract_type)
+        return func(*args)
+
+    @staticmethod
+    def __callback(publish, symbol, contract_type):
+        return lambda key, resp: publish(symbol, contract_type, resp)
+
+
+class MarketBusReader:
+    """
+    读取MarketBusPublisher发布的行情, 不经过socket也不序列化
+    """
+
+    def __init__(self, name):
+        """
+        :param name: MarketBusPublisher.name
+        """
+        self.bus = MarketBus.attach(name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def keys(self):
+        return self.bus.keys()
+
+    def ticker(self, symbol, contract_type=None):
+        """
+        :return: TICKER_DTYPE的记录拷贝(ts, last, buy, sell, high, low, vol),
+                 尚未发布时为None
+        """
+        return self.bus.read('ticker', symbol, contract_type)[1]
+
+    def depth(self, symbol, contract_type=None):
+        """
+        :return: dict, {ts, asks: (n, 2) 价格升序, bids: (n, 2) 价格降序},
+                 尚未发布时为None
+        """
+        record = self.bus.read('depth', symbol, contract_type)[1]
+        if record is None:
+            return None
+        return dict(ts=int(record['ts']),
+                    asks=record['asks'][:record['asks_len']],
+                    bids=record['bids'][:record['bids_len']])
+
+    def version(self, kind, symbol, contract_type=None):
+        """
+        :param kind: ticker 或 depth
+        :return: int, 发布次数, 不变时无需重新读取
+        """
+        return self.bus.version(kind, symbol, contract_type)
+
+    def view(self, kind, symbol, contract_type=None):
+        """
+        :return: 共享内存中槽位的零拷贝视图, 见MarketBus.view
+        """
+        return self.bus.view(kind, symbol, contract_type)
+
+    def close(self):
+        self.bus.close()
@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :models
+"""
+from itertools import zip_longest
+
+from .api_utils import is_error
+
+
+class Model:
+    """
+    __slots__结果对象的基类
+    创建时只保存原始值的tuple, 第一次访问任一字段时一次性转换所有字段,
+    之后的访问是普通的slot读取; 同时支持obj['field']/obj.get('field')/
+    keys()/dict(obj), 可以直接交给按dict读取的工具(OrderTracker, 分页等)
+    """
+    __slots__ = ('_raw',)
+    # ((字段名, json key, 转换函数或None), ...)
+    FIELDS = ()
+    NAMES = ()
+    KEYS = ()
+    CASTS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.NAMES = tuple(f[0] for f in cls.FIELDS)
+        cls.KEYS = tuple(f[1] for f in cls.FIELDS)
+        cls.CASTS = tuple(f[2] for f in cls.FIELDS)
+
+    def __init__(self, raw):
+        """
+        :param raw: 与FIELDS顺序一致的原始值, 缺少的字段为None
+        """
+        self._raw = raw
+
+    @classmethod
+    def from_json(cls, obj):
+        """
+        :param obj: 接口返回的dict
+        """
+        return cls(tuple(map(obj.get, cls.KEYS)))
+
+    def __getattr__(self, name):
+        # 只有未赋值的slot会走到这里
+        if self._raw is None or name[0] == '_':
+            raise AttributeError(name)
+        self._parse()
+        return object.__getattribute__(self, name)
+
+    def _parse(self):
+        raw = self._raw
+        if raw is None:
+            # 其他线程已经完成转换
+            return
+        values = [value if cast is None or value is None else cast(value)
+                  for _, cast, value in zip_longest(self.NAMES, self.CASTS,
+                                                    raw)]
+        for name, value in zip(self.NAMES, values):
+            setattr(self, name, value)
+        # 所有字段赋值后才清除, 并发访问的线程不会看到缺少的字段
+        self._raw = None
+
+    def __getitem__(self, name):
+        if name not in self.NAMES:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def get(self, name, default=None):
+        if name not in self.NAMES:
+            return default
+        value = getattr(self, name)
+        return default if value is None else value
+
+    def __contains__(self, name):
+        return name in self.NAMES and self.get(name) is not None
+
+    def keys(self):
+        """
+        :return: list, 有值的字段名, 与原始json中出现的key对应;
+                 dict(obj)/**obj可以直接使用
+        """
+        return [name for name in self.NAMES
+                if getattr(self, name) is not None]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def to_dict(self):
+        """
+        :return: dict, {字段名: 转换后的值}
+        """
+        return {name: getattr(self, name) for name in self.NAMES}
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, ', '.join(
+            '%s=%r' % item for item in self.to_dict().items()))
+
+
+def _slots(fields):
+    return tuple(f[0] for f in fields)
+
+
+def _asks(levels):
+    return _levels(levels, True)
+
+
+def _bids(levels):
+    return _levels(levels, False)
+
+
+def _levels(levels, ascending):
+    out = [(float(price), float(size)) for price, size in levels]
+    if len(out) > 1 and (out[0][0] > out[-1][0]) == ascending:
+        out.reverse()
+    return tuple(out)
+
+
+class Ticker(Model):
+    """
+    ticker接口, 币币行情的数值是字符串, 转换为float
+    """
+    FIELDS = (('date', 'date', int), ('last', 'last', float),
+              ('buy', 'buy', float), ('sell', 'sell', float),
+              ('high', 'high', float), ('low', 'low', float),
+              ('vol', 'vol', float), ('contract_id', 'contract_id', None),
+              ('unit_amount', 'unit_amount', float))
+    __slots__ = _slots(FIELDS)
+
+    @classmethod
+    def from_json(cls, resp):
+        """
+        :param resp: {date, ticker: {last, buy, sell, ...}}
+        """
+        ticker = resp.get('ticker') or {}
+        return cls((resp.get('date'),) +
+                   tuple(map(ticker.get, cls.KEYS[1:])))
+
+
+class DepthBook(Model):
+    """
+    depth接口, asks价格升序, bids价格降序, 每档为(price, size)
+    """
+    FIELDS = (('asks', 'asks', _asks), ('bids', 'bids', _bids))
+    __slots__ = _slots(FIELDS)
+
+    @property
+    def best_ask(self):
+        return self.asks[0][0] if self.asks else None
+
+    @property
+    def best_bid(self):
+        return self.bids[0][0] if self.bids else None
+
+    @property
+    def mid(self):
+        if not (self.asks and self.bids):
+            return None
+        return (self.asks[0][0] + self.bids[0][0]) / 2
+
+    @property
+    def spread(self):
+        if not (self.asks and self.bids):
+            return None
+        return self.asks[0][0] - self.bids[0][0]
+
+
+class Trade(Model):
+    """
+    trades/trades_history接口的一笔成交
+    """
+    FIELDS = (('tid', 'tid', int), ('date', 'date', int),
+              ('date_ms', 'date_ms', int), ('price', 'price', float),
+              ('amount', 'amount', float), ('type', 'type', None))
+    __slots__ = _slots(FIELDS)
+
+
+class Kline(Model):
+    """
+    kline接口的一根K线, 币币K线没有coin_volume
+    """
+    FIELDS = (('ts', 0, int), ('open', 1, float), ('high', 2, float),
+              ('low', 3, float), ('close', 4, float),
+              ('volume', 5, float), ('coin_volume', 6, float))
+    __slots__ = _slots(FIELDS)
+
+    @classmethod
+    def from_json(cls, bar):
+        """
+        :param bar: [ts, open, high, low, close, vol, (coin_vol)]
+        """
+        return cls(bar)
+
+
+class Order(Model):
+    """
+    order_info/orders_info/order_history接口的一个订单
+    币币的type为buy/sell等字符串, 合约为1-4; 合约的price_avg统一为avg_price
+    """
+    FIELDS = (('order_id', 'order_id', None), ('symbol', 'symbol', None),
+              ('type', 'type', None), ('status', 'status', None),
+              ('price', 'price', float), ('amount', 'amount', float),
+              ('deal_amount', 'deal_amount', float),
+              ('avg_price', 'avg_price', float),
+              ('create_date', 'create_date', None),
+              ('contract_name', 'contract_name', None),
+              ('lever_rate', 'lever_rate', None), ('fee', 'fee', float),
+              ('unit_amount', 'unit_amount', float))
+    __slots__ = _slots(FIELDS)
+    FUTURE_KEYS = tuple('price_avg' if f[1] == 'avg_price' else f[1]
+                        for f in FIELDS)
+
+    @classmethod
+    def from_json(cls, order):
+        keys = cls.FUTURE_KEYS if 'price_avg' in order else cls.KEYS
+        return cls(tuple(map(order.get, keys)))
+
+
+class Position(Model):
+    """
+    position/position_4fix接口holding中的一行, 逐仓才有bond/flatprice等字段
+    """
+    FIELDS = (('symbol', 'symbol', None),
+              ('contract_type', 'contract_type', None),
+              ('contract_id', 'contract_id', None),
+              ('lever_rate', 'lever_rate', None),
+              ('create_date', 'create_date', None)) + tuple(
+        (side + name, side + name, float) for side in ('buy_', 'sell_')
+        for name in ('amount', 'available', 'price_avg', 'price_cost',
+                     'profit_real', 'bond', 'flatprice', 'profit_lossratio'))
+    __slots__ = _slots(FIELDS)
+
+
+def ticker_object(resp):
+    """
+    :return: Ticker
+    """
+    if is_error(resp):
+        return resp
+    return Ticker.from_json(resp)
+
+
+def depth_object(resp):
+    """
+    :return: DepthBook
+    """
+    if is_error(resp):
+        return resp
+    return DepthBook.from_json(resp)
+
+
+def trades_objects(resp):
+    """
+    :return: [Trade]
+    """
+    if is_error(resp):
+        return resp
+    return list(map(Trade.from_json, resp))
+
+
+def kline_objects(resp):
+    """
+    :return: [Kline]
+    """
+    if is_error(resp):
+        return resp
+    return list(map(Kline.from_json, resp))
+
+
+def orders_objects(resp):
+    """
+    保留原响应的其它字段(result, total, current_page等), 只替换orders
+    :return: {orders: [Order], ...}
+    """
+    if is_error(resp) or 'orders' not in resp:
+        return resp
+    return dict(resp, orders=list(map(Order.from_json, resp['orders'])))
+
+
+def position_objects(resp):
+    """
+    保留原响应的其它字段(result, force_liqu_price等), 只替换holding
+    :return: {holding: [Position], ...}
+    """
+    if is_error(resp) or 'holding' not in resp:
+        return resp
+    return dict(resp, holding=list(map(Position.from_json, resp['holding'])))
+
+
+# 接口名: 转换函数, 只存在于一个市场的接口(如position)由客户端忽略
+DECODERS = dict(ticker=ticker_object,
+                depth=depth_object,
+                trades=trades_objects,
+                trades_history=trades_objects,
+                kline=kline_objects,
+                order_info=orders_objects,
+                orders_info=orders_objects,
+                order_history=orders_objects,
+                position=position_objects,
+                position_4fix=position_objects)
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :order_batcher
+"""
+import json
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# batch_trade一次最多5个订单
+MAX_BATCH = 5
+
+
+class _OrderBatcher:
+    def __init__(self, api, window=0.05, max_batch=MAX_BATCH, max_workers=4):
+        """
+        :param api: FutureApi 或 SpotApi
+        :param window: 第一个订单入队后最多等待的秒数
+        :param max_batch: 攒满多少个订单立即发送, 不超过5
+        :param max_workers: 同时发送的批次数
+        """
+        assert 0 < max_batch <= MAX_BATCH, 'max_batch should be in [1, 5]'
+        self.api = api
+        self.window = window
+        self.max_batch = max_batch
+        self.__queues = dict()
+        self.__deadlines = dict()
+        self.__closed = False
+        self.__cond = threading.Condition()
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def close(self):
+        """
+        发送所有排队中的订单后停止
+        """
+        with self.__cond:
+            self.__closed = True
+            self.__cond.notify()
+        self.__thread.join()
+        self.__executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _enqueue(self, key, order):
+        future = Future()
+        with self.__cond:
+            assert not self.__closed, 'OrderBatcher is closed'
+            queue = self.__queues.setdefault(key, [])
+            if not queue:
+                self.__deadlines[key] = time.monotonic() + self.window
+            queue.append((order, future))
+            self.__cond.notify()
+        return future
+
+    def _submit(self, fn, *args, **kwargs):
+        return self.__executor.submit(fn, *args, **kwargs)
+
+    def _send(self, key, orders):
+        """
+        :return: list, 与orders一一对应的结果
+        """
+        raise NotImplementedError
+
+    def __run(self):
+        while True:
+            with self.__cond:
+                batches = self.__due_batches()
+                while not batches:
+                    if self.__closed and not self.__queues:
+                        return
+                    self.__cond.wait(self.__timeout())
+                    batches = self.__due_batches()
+            for key, batch in batches:
+                self.__executor.submit(self.__dispatch, key, batch)
+
+    def __due_batches(self):
+        now = time.monotonic()
+        batches = []
+        for key in list(self.__queues):
+            queue = self.__queues[key]
+            if (len(queue) >= self.max_batch or self.__closed or
+                    self.__deadlines[key] <= now):
+                batches.append((key, queue[:self.max_batch]))
+                del queue[:self.max_batch]
+                if not queue:
+                    del self.__queues[key]
+                    del self.__deadlines[key]
+        return batches
+
+    def __timeout(self):
+        if not self.__deadlines:
+            return None
+        return max(0.0, min(self.__deadlines.values()) - time.monotonic())
+
+    def __dispatch(self, key, batch):
+        orders = [order for order, _ in batch]
+        try:
+            results = self._send(key, orders)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+def _split(resp, n):
+    """
+    batch_trade返回的order_info按顺序拆分到各个订单, 整体失败时每个订单都返回resp
+    """
+    order_info = resp.get('order_info') if isinstance(resp, dict) else None
+    if not order_info or len(order_info) != n:
+        return [resp] * n
+    return order_info
+
+
+class FutureOrderBatcher(_OrderBatcher):
+    """
+    把FutureApi.trade按 (symbol, contract_type, lever_rate) 分组,
+    在window内或攒满5个时合并为batch_trade发送
+    """
+
+    def trade(self, symbol, contract_type, price, amount, type,
+              match_price=None, lever_rate=None):
+        """
+        参数同FutureApi.trade
+        :return: concurrent.futures.Future, 结果为 {order_id:int, ...},
+                 失败时含error_code
+        """
+        order = dict(price=price, amount=amount, type=type)
+        if match_price:
+            order['match_price'] = match_price
+        return self._enqueue((symbol, contract_type, lever_rate), order)
+
+    def _send(self, key, orders):
+        symbol, contract_type, lever_rate = key
+        params = dict(lever_rate=lever_rate) if lever_rate else dict()
+        if len(orders) == 1:
+            params.update(orders[0])
+            return [self.api.trade(symbol, contract_type, **params)]
+        order_data = json.dumps(orders, separators=(',', ':'))
+        resp = self.api.batch_trade(symbol, contract_type, order_data,
+                                    **params)
+        return _split(resp, len(orders))
+
+
+class SpotOrderBatcher(_OrderBatcher):
+    """
+    把SpotApi.trade的限价单按symbol分组合并为batch_trade发送,
+    batch_trade不支持市价单, 市价单直接调用trade
+    """
+
+    def trade(self, symbol, type, price=None, amount=None):
+        """
+        参数同SpotApi.trade
+        :return: concurrent.futures.Future, 结果为 {order_id:int, ...},
+                 失败时含error_code
+        """
+        if type not in ('buy', 'sell'):
+            return self._submit(self.api.trade, symbol, type, price=price,
+                                amount=amount)
+        return self._enqueue((symbol,), dict(price=price, amount=amount,
+                                             type=type))
+
+    def _send(self, key, orders):
+        symbol, = key
+        if len(orders) == 1:
+            return [self.api.trade(symbol, **orders[0])]
+        orders_data = json.dumps(orders, separators=(',', ':'))
+        resp = self.api.batch_trade(symbol, orders_data)
+        return _split(resp, len(orders))
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :order_book
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+from .api_utils import is_error
+
+# kind: added 新增档位(old_size为0) removed 移除档位(new_size为0) resized 数量变化
+LevelChange = namedtuple('LevelChange',
+                         ['side', 'price', 'old_size', 'new_size', 'kind'])
+
+
+class BookSide:
+    """
+    一侧的价格档位, 按从优到劣排序存放在array中;
+    bids以负价格作为排序键, 使两侧都可以用bisect查找
+    """
+    __slots__ = ['side', 'sign', 'keys', 'prices', 'sizes', 'cum']
+
+    def __init__(self, side):
+        """
+        :param side: bids 或 asks
+        """
+        self.side = side
+        self.sign = -1.0 if side == 'bids' else 1.0
+        self.keys = array('d')
+        self.prices = array('d')
+        self.sizes = array('d')
+        # cum[i]为从最优价到第i档的累计数量
+        self.cum = array('d')
+
+    def __len__(self):
+        return len(self.prices)
+
+    def update(self, levels):
+        """
+        用新的深度快照替换本侧档位
+        :param levels: [[price, size], ...], 顺序不限
+        :return: list, LevelChange
+        """
+        sign = self.sign
+        new = sorted((sign * float(p), float(s)) for p, s in levels)
+        changes = self.__diff(new)
+        if len(new) == len(self.keys) and \
+                all(k == nk for k, (nk, _) in zip(self.keys, new)):
+            # 价格档位不变时只更新数量
+            for i, (_, size) in enumerate(new):
+                self.sizes[i] = size
+        else:
+            self.keys = array('d', (k for k, _ in new))
+            self.prices = array('d', (sign * k for k, _ in new))
+            self.sizes = array('d', (s for _, s in new))
+            self.cum = array('d', self.sizes)
+        total = 0.0
+        for i, size in enumerate(self.sizes):
+            total += size
+            self.cum[i] = total
+        return changes
+
+    def best(self):
+        """
+        :return: (price, size), 没有档位时为None
+        """
+        if not self.prices:
+            return None
+        return self.prices[0], self.sizes[0]
+
+    def size_at(self, price):
+        i = bisect_left(self.keys, self.sign * price)
+        if i < len(self.keys) and self.keys[i] == self.sign * price:
+            return self.sizes[i]
+        return 0.0
+
+    def cumulative_size(self, price):
+        """
+        :return: 从最优价到price(含)的累计数量
+        """
+        i = bisect_right(self.keys, self.sign * price)
+        return self.cum[i - 1] if i else 0.0
+
+    def price_for_size(self, size):
+        """
+        :return: 累计数量达到size时的最劣价格, 深度不足时为None
+        """
+        i = bisect_left(self.cum, size)
+        return self.prices[i] if i < len(self.prices) else None
+
+    def __diff(self, new):
+        changes = []
+        old_keys, old_sizes, sign = self.keys, self.sizes, self.sign
+        n_old, n_new = len(old_keys), len(new)
+        i = j = 0
+        while i < n_old or j < n_new:
+            if j == n_new or (i < n_old and old_keys[i] < new[j][0]):
+                changes.append(LevelChange(self.side, sign * old_keys[i],
+                                           old_sizes[i], 0.0, 'removed'))
+                i += 1
+            elif i == n_old or new[j][0] < old_keys[i]:
+                changes.append(LevelChange(self.side, sign * new[j][0], 0.0,
+                                           new[j][1], 'added'))
+                j += 1
+            else:
+                if old_sizes[i] != new[j][1]:
+                    changes.append(LevelChange(self.side, sign * new[j][0],
+                                               old_sizes[i], new[j][1],
+                                               'resized'))
+                i += 1
+                j += 1
+        return changes
+
+
+class OrderBook:
+    """
+    由depth轮询结果维护的本地订单簿
+    """
+    __slots__ = ['bids', 'asks', 'date']
+
+    def __init__(self):
+        self.bids = BookSide('bids')
+        self.asks = BookSide('asks')
+        self.date = None
+
+    def update(self, depth, date=None):
+        """
+        :param depth: depth接口返回, {asks:[[price, size]], bids:[...]},
+                      也接受result_type='numpy'时的数组
+        :param date: 快照时间, 可选
+        :return: list, 相对上一个快照变化的档位 LevelChange;
+                 错误返回不修改盘口, 返回[]
+        """
+        if is_error(depth):
+            return []
+        self.date = date
+        return (self.bids.update(depth.get('bids', ())) +
+                self.asks.update(depth.get('asks', ())))
+
+    @property
+    def best_bid(self):
+        return self.bids.best()
+
+    @property
+    def best_ask(self):
+        return self.asks.best()
+
+    @property
+    def mid(self):
+        if not self.bids or not self.asks:
+            return None
+        return (self.bids.prices[0] + self.asks.prices[0]) / 2
+
+    @property
+    def spread(self):
+        if not self.bids or not self.asks:
+            return None
+        return self.asks.prices[0] - self.bids.prices[0]
+
+    def side(self, name):
+        """
+        :param name: bids 或 asks
+        """
+        return self.bids if name == 'bids' else self.asks
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :order_tracker
+"""
+import logging
+import threading
+
+from .api_utils import run_concurrently, is_error
+
+log = logging.getLogger(__name__)
+
+# orders_info一次最多查询50个订单
+CHUNK = 50
+# 2:完全成交 -1:已撤单
+TERMINAL_STATUS = (2, -1)
+
+
+def _chunks(ids, size):
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+def _orders(resp):
+    if is_error(resp):
+        return []
+    return resp.get('orders') or []
+
+
+def _state(order):
+    return order.get('status'), order.get('deal_amount')
+
+
+class _OrderTracker:
+    def __init__(self, api, min_interval=0.5, max_interval=5.0,
+                 max_workers=4):
+        """
+        :param api: FutureApi 或 SpotApi
+        :param min_interval: 有订单状态变化时缩短到的最小轮询间隔(秒)
+        :param max_interval: 连续无变化时放宽到的最大轮询间隔(秒)
+        :param max_workers: 并发查询的线程数
+        """
+        self.api = api
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_workers = max_workers
+        self.interval = min_interval
+        self.__orders = dict()
+        self.__callbacks = []
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    def subscribe(self, callback):
+        """
+        :param callback: callback(order_id, old_order, new_order),
+                         old_order第一次查询到时为None
+        """
+        self.__callbacks.append(callback)
+
+    def _register(self, group, order_id):
+        with self.__lock:
+            self.__orders.setdefault(group, dict())[str(order_id)] = None
+
+    def _unregister(self, group, order_id):
+        with self.__lock:
+            orders = self.__orders.get(group, {})
+            orders.pop(str(order_id), None)
+            if not orders:
+                self.__orders.pop(group, None)
+
+    def __len__(self):
+        with self.__lock:
+            return sum(len(orders) for orders in self.__orders.values())
+
+    def poll_once(self):
+        """
+        查询所有已登记的订单, 发布状态变化, 移除已结束的订单
+        :return: int, 状态发生变化的订单数
+        """
+        with self.__lock:
+            jobs = {(group, i): (group, chunk)
+                    for group, orders in self.__orders.items()
+                    for i, chunk in enumerate(_chunks(list(orders), CHUNK))}
+        result = run_concurrently(
+            {key: (lambda g=group, c=chunk: self._fetch(g, c))
+             for key, (group, chunk) in jobs.items()}, self.max_workers)
+        changes = []
+        with self.__lock:
+            for (group, _), orders in result.items():
+                known = self.__orders.get(group, {})
+                for order in orders:
+                    order_id = str(order.get('order_id'))
+                    if order_id not in known:
+                        continue
+                    old = known[order_id]
+                    if old is None or _state(old) != _state(order):
+                        changes.append((order_id, old, order))
+                    if int(order.get('status', 0)) in TERMINAL_STATUS:
+                        del known[order_id]
+                    else:
+                        known[order_id] = order
+                if not known:
+                    self.__orders.pop(group, None)
+        for change in changes:
+            self.__publish(*change)
+        return len(changes)
+
+    def start(self):
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def _fetch(self, group, order_ids):
+        """
+        :return: list, 订单信息
+        """
+        raise NotImplementedError
+
+    def __run(self):
+        while not self.__stop.wait(self.interval):
+            try:
+                changed = self.poll_once()
+            except Exception:
+                log.exception('Polling order status failed')
+                changed = 0
+            self.interval = self._next_interval(changed)
+
+    def _next_interval(self, changed):
+        """
+        :param changed: 本轮状态发生变化的订单数
+        :return: 有变化时减半, 无变化时放宽1.5倍, 限制在min/max之间
+        """
+        if changed:
+            return max(self.min_interval, self.interval / 2)
+        return min(self.max_interval, self.interval * 1.5)
+
+    def __publish(self, order_id, old, new):
+        for callback in self.__callbacks:
+            try:
+                callback(order_id, old, new)
+            except Exception:
+                log.exception('Order callback %r failed', callback)
+
+
+class FutureOrderTracker(_OrderTracker):
+    """
+    按 (symbol, contract_type) 分组, 每50个订单一次orders_info
+    """
+
+    def register(self, symbol, contract_type, order_id):
+        self._register((symbol, contract_type), order_id)
+
+    def unregister(self, symbol, contract_type, order_id):
+        self._unregister((symbol, contract_type), order_id)
+
+    def _fetch(self, group, order_ids):
+        symbol, contract_type = group
+        return _orders(self.api.orders_info(symbol, contract_type,
+                                            ','.join(order_ids)))
+
+
+class SpotOrderTracker(_OrderTracker):
+    """
+    按symbol分组, 每50个订单一次orders_info(未完成),
+    不在未完成结果中的订单再查一次已完成的
+    """
+
+    def register(self, symbol, order_id):
+        self._register((symbol,), order_id)
+
+    def unregister(self, symbol, order_id):
+        self._unregister((symbol,), order_id)
+
+    def _fetch(self, group, order_ids):
+        symbol, = group
+        orders = _orders(self.api.orders_info(symbol, ','.join(order_ids), 0))
+        found = {str(order.get('order_id')) for order in orders}
+        missing = [i for i in order_ids if i not in found]
+        if missing:
+            orders += _orders(self.api.orders_info(symbol, ','.join(missing),
+                                                   1))
+        return orders
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :pagination
+"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .api_utils import is_error
+
+# fetch(cursor): 请求一页; extract(cursor, resp): 本页的条目;
+# advance(cursor, resp, items): 下一页的cursor, None为最后一页
+Pages = namedtuple('Pages', ['fetch', 'extract', 'advance', 'first'])
+
+
+class PageError(Exception):
+    """
+    某一页请求失败, resp为接口返回
+    """
+
+    def __init__(self, cursor, resp):
+        super().__init__('Page %s failed: %r' % (cursor, resp))
+        self.cursor = cursor
+        self.resp = resp
+
+
+def iter_pages(pages: Pages, prefetch=False):
+    """
+    逐页请求, 消费到下一页时才请求下一页
+    :param prefetch: True时在消费当前页的同时请求下一页
+    """
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        cursor = pages.first
+        pending = executor.submit(pages.fetch, cursor) if prefetch else None
+        while cursor is not None:
+            resp = pending.result() if prefetch else pages.fetch(cursor)
+            items = _extract(pages, cursor, resp)
+            cursor = pages.advance(cursor, resp, items)
+            if prefetch and cursor is not None:
+                pending = executor.submit(pages.fetch, cursor)
+            yield from items
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+async def aiter_pages(pages: Pages, prefetch=False):
+    """
+    iter_pages的异步版本, pages.fetch返回awaitable
+    """
+    import asyncio
+    cursor = pages.first
+    pending = asyncio.ensure_future(pages.fetch(cursor)) if prefetch \
+        else None
+    try:
+        while cursor is not None:
+            resp = await (pending if prefetch else pages.fetch(cursor))
+            pending = None
+            items = _extract(pages, cursor, resp)
+            cursor = pages.advance(cursor, resp, items)
+            if prefetch and cursor is not None:
+                pending = asyncio.ensure_future(pages.fetch(cursor))
+            for item in items:
+                yield item
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+def _extract(pages, cursor, resp):
+    if is_error(resp):
+        raise PageError(cursor, resp)
+    return pages.extract(cursor, resp)
+
+
+def order_history_pages(spot_api, symbol, status, page_length):
+    def advance(page, resp, items):
+        total = resp.get('total')
+        if len(items) < page_length or \
+                (total is not None and page * page_length >= int(total)):
+            return None
+        return page + 1
+
+    return Pages(lambda page: spot_api.order_history(symbol, status, page,
+                                                     page_length),
+                 lambda page, resp: resp.get('orders') or [], advance, 1)
+
+
+def account_records_pages(spot_api, symbol, type, page_length):
+    def advance(page, resp, items):
+        return None if len(items) < page_length else page + 1
+
+    return Pages(lambda page: spot_api.account_records(symbol, type, page,
+                                                       page_length),
+                 lambda page, resp: resp.get('records') or [], advance,
+                 1)
+
+
+def trades_history_pages(future_api, symbol, date, since):
+    def extract(since, resp):
+        # 去掉与上一页重叠的成交
+        return [t for t in resp if int(t['tid']) > since]
+
+    def advance(since, resp, items):
+        return max((int(t['tid']) for t in items), default=None)
+
+    return Pages(lambda since: future_api.trades_history(symbol, date, since),
+                 extract, advance, since)
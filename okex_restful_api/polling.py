@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :polling
+"""
+import time
+import heapq
+import inspect
+import logging
+import threading
+
+from .api_utils import TokenBucket, is_error
+
+log = logging.getLogger(__name__)
+
+# 黄金分割, 依次加入的订阅在各自的周期内均匀错开
+_GOLDEN = 0.6180339887498949
+
+
+def default_fingerprint(resp):
+    """
+    判断响应是否变化时忽略顶层的date(ticker每秒都会变);
+    result_type为numpy/object时的数组和结果对象也可以直接比较
+    """
+    if hasattr(resp, 'to_dict'):
+        resp = resp.to_dict()
+    if isinstance(resp, dict):
+        return {k: _comparable(v) for k, v in resp.items() if k != 'date'}
+    return _comparable(resp)
+
+
+def _comparable(value):
+    # numpy数组的==逐元素比较, 不能用于if, 转为bytes比较
+    if hasattr(value, 'dtype') and hasattr(value, 'tobytes'):
+        return str(value.dtype), value.shape, value.tobytes()
+    return value
+
+
+class _Poll:
+    __slots__ = ['key', 'method', 'args', 'kwargs', 'callbacks', 'target',
+                 'min_interval', 'max_interval', 'interval', 'due', 'seq',
+                 'last', 'polls', 'changes', 'errors']
+
+    def __init__(self, key, method, args, kwargs, interval, min_interval,
+                 max_interval):
+        self.key = key
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.callbacks = []
+        self.target = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = interval
+        self.due = 0.0
+        self.seq = 0
+        self.last = None
+        self.polls = 0
+        self.changes = 0
+        self.errors = 0
+
+    def to_dict(self):
+        return dict(interval=self.interval, target=self.target,
+                    polls=self.polls, changes=self.changes,
+                    errors=self.errors, subscribers=len(self.callbacks))
+
+
+class PollingScheduler:
+    """
+    集中轮询行情接口: 相同(method, 参数)的订阅合并为一个请求,
+    请求在时间上均匀错开并受总速率限制; 每个订阅的间隔按响应变化的频率
+    在[min_interval, max_interval]内收紧或放宽, 放宽后响应再变化时
+    直接回到订阅要求的interval.
+    run()/start()在一个线程中轮询, run_async()在当前事件循环中轮询
+    """
+
+    def __init__(self, rate=None, burst=1, tighten=0.8, relax=1.25,
+                 fingerprint=default_fingerprint, clock=time.monotonic):
+        """
+        :param rate: 所有订阅合计每秒最多的请求数, None为不限制
+        :param burst: 允许的突发请求数, 1为严格均匀
+        :param tighten: 响应变化时间隔乘以该系数
+        :param relax: 响应不变时间隔乘以该系数
+        :param fingerprint: fingerprint(resp), 比较前对响应的处理
+        :param clock: 返回单调递增的秒数, 用于排期
+        """
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.tighten = tighten
+        self.relax = relax
+        self.fingerprint = fingerprint
+        self.clock = clock
+        self.__polls = dict()
+        self.__heap = []
+        self.__phase = 0.0
+        self.__seq = 0
+        self.__lock = threading.Lock()
+        self.__wakeup = threading.Event()
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    def subscribe(self, method, *args, interval=1.0, callback=None,
+                  min_interval=None, max_interval=None, **kwargs):
+        """
+        :param method: 如future_api.ticker, 异步客户端的方法用于run_async
+        :param interval: 期望的轮询间隔(秒)
+        :param callback: callback(key, resp), 响应变化时调用
+        :param min_interval: 间隔下限, 默认interval/4
+        :param max_interval: 间隔上限, 默认interval*8
+        :return: 订阅的key, 用于unsubscribe
+        """
+        key = (method, args, tuple(sorted(kwargs.items())))
+        min_interval = min_interval or interval / 4
+        max_interval = max_interval or interval * 8
+        with self.__lock:
+            poll = self.__polls.get(key)
+            if poll is None:
+                poll = self.__polls[key] = _Poll(key, method, args, kwargs,
+                                                 interval, min_interval,
+                                                 max_interval)
+                self.__phase = (self.__phase + _GOLDEN) % 1
+                self.__schedule(poll, self.clock() +
+                                self.__phase * interval)
+            else:
+                # 合并: 取更严格的要求
+                poll.target = min(poll.target, interval)
+                poll.min_interval = min(poll.min_interval, min_interval)
+                poll.max_interval = min(poll.max_interval, max_interval)
+                poll.interval = min(poll.interval, interval)
+            if callback is not None:
+                poll.callbacks.append(callback)
+        self.__wakeup.set()
+        return key
+
+    def unsubscribe(self, key, callback=None):
+        """
+        :param callback: None时移除整个订阅, 否则只移除该回调,
+                         没有回调时移除订阅
+        """
+        with self.__lock:
+            poll = self.__polls.get(key)
+            if poll is None:
+                return
+            if callback is not None and callback in poll.callbacks:
+                poll.callbacks.remove(callback)
+            if callback is None or not poll.callbacks:
+                del self.__polls[key]
+
+    def __len__(self):
+        return len(self.__polls)
+
+    def stats(self):
+        """
+        :return: dict, {key: {interval, target, polls, changes, errors,
+                              subscribers}}
+        """
+        with self.__lock:
+            return {k: p.to_dict() for k, p in self.__polls.items()}
+
+    def run_once(self):
+        """
+        执行所有已到期的订阅, 不等待
+        :return: int, 执行的请求数
+        """
+        count = 0
+        while True:
+            poll, delay = self.__next()
+            if poll is None or delay > 0:
+                return count
+            self.__pace(time.sleep)
+            self.__complete(poll, self.__call(poll))
+            count += 1
+
+    def run(self):
+        """
+        在当前线程中轮询, 直到stop
+        """
+        self.__stop.clear()
+        while not self.__stop.is_set():
+            poll, delay = self.__next()
+            if poll is None or delay > 0:
+                self.__wakeup.wait(1.0 if poll is None else delay)
+                self.__wakeup.clear()
+                continue
+            self.__pace(self.__stop.wait)
+            if not self.__stop.is_set():
+                self.__complete(poll, self.__call(poll))
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.run, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop.set()
+        self.__wakeup.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    async def run_async(self, tick=0.1):
+        """
+        在当前事件循环中轮询, 订阅的method可以是协程函数
+        :param tick: 最长的休眠时间, 新订阅和stop最多延迟tick秒生效
+        """
+        import asyncio
+        self.__stop.clear()
+        while not self.__stop.is_set():
+            poll, delay = self.__next()
+            if poll is None or delay > 0:
+                await asyncio.sleep(tick if poll is None else
+                                    min(delay, tick))
+                continue
+            wait = self.bucket.reserve() if self.bucket else 0
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                resp = self.__call(poll)
+                if inspect.isawaitable(resp):
+                    resp = await resp
+            except Exception as e:
+                log.exception('Poll %s failed', poll.key)
+                resp = e
+            self.__complete(poll, resp)
+
+    def __next(self):
+        """
+        :return: (最早到期的订阅, 距到期的秒数), 已到期时从堆中取出
+        """
+        with self.__lock:
+            while self.__heap:
+                due, seq, key = self.__heap[0]
+                poll = self.__polls.get(key)
+                if poll is None or poll.seq != seq:
+                    # 已取消或已重新排期
+                    heapq.heappop(self.__heap)
+                    continue
+                delay = due - self.clock()
+                if delay <= 0:
+                    heapq.heappop(self.__heap)
+                return poll, delay
+            return None, 0
+
+    def __schedule(self, poll, due):
+        self.__seq += 1
+        poll.seq = self.__seq
+        poll.due = due
+        heapq.heappush(self.__heap, (due, poll.seq, poll.key))
+
+    def __pace(self, sleep):
+        wait = self.bucket.reserve() if self.bucket else 0
+        if wait:
+            sleep(wait)
+
+    @staticmethod
+    def __call(poll):
+        try:
+            return poll.method(*poll.args, **poll.kwargs)
+        except Exception as e:
+            log.exception('Poll %s failed', poll.key)
+            return e
+
+    def __complete(self, poll, resp):
+        failed = isinstance(resp, Exception) or is_error(resp)
+        changed = False
+        with self.__lock:
+            poll.polls += 1
+            if failed:
+                poll.errors += 1
+                poll.interval = min(poll.max_interval,
+                                    poll.interval * self.relax)
+            else:
+                try:
+                    fingerprint = self.fingerprint(resp)
+                    changed = bool(fingerprint != poll.last)
+                except Exception:
+                    # 无法比较时当作有变化, 不能让一个响应停掉轮询线程
+                    log.exception('Fingerprint of %s failed', poll.key)
+                    fingerprint, changed = None, True
+                poll.last = fingerprint
+                if changed:
+                    poll.changes += 1
+                    # 高于订阅要求时直接回到target, 之后再逐步收紧
+                    interval = min(poll.interval * self.tighten,
+                                   poll.target)
+                else:
+                    interval = poll.interval * self.relax
+                poll.interval = min(poll.max_interval,
+                                    max(poll.min_interval, interval))
+            callbacks = list(poll.callbacks) if changed else ()
+            if poll.key in self.__polls:
+                # 按原来的相位排期, 落后时立即执行
+                self.__schedule(poll, max(poll.due + poll.interval,
+                                          self.clock()))
+        for callback in callbacks:
+            try:
+                callback(poll.key, resp)
+            except Exception:
+                log.exception('Poll callback %r failed', callback)
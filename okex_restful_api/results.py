@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :results
+"""
+
+RESULT_TYPES = (None, 'numpy', 'object')
+
+
+def result_decoders(result_type):
+    """
+    :param result_type: None: 原始json; numpy: depth/trades/kline转为numpy数组;
+                        object: 行情/订单/持仓转为__slots__对象, 见models.py
+    :return: dict, {接口名: 转换函数}
+    """
+    assert result_type in RESULT_TYPES, \
+        'Unsupported result_type: %s' % result_type
+    if result_type == 'numpy':
+        from .arrays import DECODERS
+        return DECODERS
+    if result_type == 'object':
+        from .models import DECODERS
+        return DECODERS
+    return {}
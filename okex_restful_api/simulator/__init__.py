@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :__init__.py
+"""
+
+from .engine import Order, OrderBook
+from .exchange import Exchange, Account, Market
+from .server import (Faults, SimulatorServer, SimulatorTransport,
+                     AsyncSimulatorTransport)
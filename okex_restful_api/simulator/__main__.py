@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :__main__
+"""
+import argparse
+
+from .exchange import Exchange
+from .server import Faults, SimulatorServer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m okex_restful_api.simulator',
+        description='本地模拟交易所, 客户端用set_domain指向打印的url')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--account', action='append', default=[],
+                        metavar='API_KEY:SECRET_KEY', help='可重复')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='固定延迟(秒)')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='指数分布的额外延迟均值(秒)')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--http-error-rate', type=float, default=0.0)
+    parser.add_argument('--disconnect-rate', type=float, default=0.0)
+    parser.add_argument('--lost-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    exchange = Exchange()
+    for account in args.account:
+        api_key, _, secret_key = account.partition(':')
+        exchange.add_account(api_key, secret_key)
+    faults = Faults(args.latency, args.jitter, args.error_rate,
+                    args.http_error_rate, args.disconnect_rate,
+                    args.lost_rate, seed=args.seed)
+    server = SimulatorServer(exchange, faults, args.host, args.port)
+    print(server.url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
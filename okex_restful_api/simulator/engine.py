@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :engine
+"""
+import time
+from bisect import insort
+from collections import deque
+
+BUY, SELL = 1, -1
+# 0:未成交 1:部分成交 2:完全成交 -1:已撤单
+OPEN, PARTIAL, FILLED, CANCELLED = 0, 1, 2, -1
+# 数量/金额的比较误差
+EPS = 1e-9
+
+
+class Order:
+    __slots__ = ['order_id', 'account', 'side', 'price', 'amount',
+                 'deal_amount', 'cost', 'status', 'create_date', 'info']
+
+    def __init__(self, order_id, account, side, price, amount, info=None):
+        """
+        :param side: BUY 或 SELL
+        :param price: 限价, None为市价
+        :param amount: 委托数量
+        :param info: 市场相关的字段, 如合约的type/lever_rate
+        """
+        self.order_id = order_id
+        self.account = account
+        self.side = side
+        self.price = price
+        self.amount = amount
+        self.deal_amount = 0.0
+        # 已成交的金额, sum(价格*数量)
+        self.cost = 0.0
+        self.status = OPEN
+        self.create_date = int(time.time() * 1000)
+        self.info = info
+
+    @property
+    def remaining(self):
+        return self.amount - self.deal_amount
+
+    @property
+    def avg_price(self):
+        return self.cost / self.deal_amount if self.deal_amount else 0.0
+
+    @property
+    def done(self):
+        return self.status in (FILLED, CANCELLED)
+
+    def fill(self, price, qty):
+        self.deal_amount += qty
+        self.cost += price * qty
+        self.status = FILLED if self.remaining <= EPS else PARTIAL
+
+
+class OrderBook:
+    """
+    价格优先/时间优先的撮合: 每个价位一个FIFO队列, 价位保存在升序列表中
+    """
+
+    def __init__(self):
+        self.__levels = {BUY: dict(), SELL: dict()}
+        self.__prices = {BUY: [], SELL: []}
+
+    def best(self, side):
+        """
+        :return: 买一/卖一价, 没有挂单时为None
+        """
+        prices = self.__prices[side]
+        if not prices:
+            return None
+        return prices[-1] if side == BUY else prices[0]
+
+    def has_level(self, side, price):
+        return price in self.__levels[side]
+
+    def submit(self, order, max_cost=None):
+        """
+        与对手盘撮合, 限价单的剩余部分挂单
+        :param max_cost: 按金额的市价买单, 成交金额达到该值时停止
+        :return: list, [(maker订单, 成交价, 成交量)]
+        """
+        fills = []
+        side = -order.side
+        levels = self.__levels[side]
+        while order.remaining > EPS:
+            price = self.best(side)
+            if price is None or (order.price is not None and
+                                 (price - order.price) * order.side > 0):
+                break
+            queue = levels[price]
+            while queue and order.remaining > EPS:
+                maker = queue[0]
+                qty = min(order.remaining, maker.remaining)
+                if max_cost is not None:
+                    qty = min(qty, (max_cost - order.cost) / price)
+                    if qty <= EPS:
+                        return fills
+                maker.fill(price, qty)
+                order.fill(price, qty)
+                fills.append((maker, price, qty))
+                if maker.remaining <= EPS:
+                    queue.popleft()
+            if not queue:
+                self.__remove_level(side, price)
+        if order.price is not None and order.remaining > EPS:
+            self.__add(order)
+        return fills
+
+    def cancel(self, order):
+        """
+        :return: bool, 订单是否在簿中
+        """
+        queue = self.__levels[order.side].get(order.price)
+        if queue is None or order not in queue:
+            return False
+        queue.remove(order)
+        if not queue:
+            self.__remove_level(order.side, order.price)
+        order.status = CANCELLED
+        return True
+
+    def depth(self, size):
+        """
+        :return: (asks, bids), [[价格, 数量]], 与接口相同都按价格降序
+        """
+        asks = [[p, self.__volume(SELL, p)]
+                for p in self.__prices[SELL][:size]]
+        bids = [[p, self.__volume(BUY, p)]
+                for p in self.__prices[BUY][::-1][:size]]
+        return asks[::-1], bids
+
+    def levels(self, side):
+        return len(self.__prices[side])
+
+    def __volume(self, side, price):
+        return sum(o.remaining for o in self.__levels[side][price])
+
+    def __add(self, order):
+        levels = self.__levels[order.side]
+        queue = levels.get(order.price)
+        if queue is None:
+            queue = levels[order.price] = deque()
+            insort(self.__prices[order.side], order.price)
+        queue.append(order)
+
+    def __remove_level(self, side, price):
+        del self.__levels[side][price]
+        self.__prices[side].remove(price)
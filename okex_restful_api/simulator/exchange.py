@@ -0,0 +1,1064 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :exchange
+"""
+import json
+import math
+import time
+import itertools
+import threading
+import traceback
+from bisect import bisect_right
+from collections import deque, defaultdict
+from datetime import date, timedelta
+
+from ..api_utils import build_my_sign
+from ..api_utils.api_base import SPOT_PATHS, FUTURE_PATHS
+from .engine import Order, OrderBook, BUY, SELL, FILLED, CANCELLED, EPS
+
+SPOT_MIDS = {'btc_usdt': 8400.0, 'eth_usdt': 500.0, 'ltc_usdt': 150.0,
+             'etc_usdt': 15.0, 'bch_usdt': 1000.0, 'eth_btc': 0.06,
+             'ltc_btc': 0.018}
+FUTURE_MIDS = {'btc_usd': 8400.0, 'eth_usd': 500.0, 'ltc_usd': 150.0,
+               'etc_usd': 15.0, 'bch_usd': 1000.0}
+CONTRACT_TYPES = ('this_week', 'next_week', 'quarter')
+
+# 错误原因: (币币错误码, 合约错误码)
+ERRORS = {
+    'required': (10000, 20006),  # 必填参数为空
+    'system': (10002, 20014),  # 系统错误
+    'no_key': (10005, 20001),  # api_key不存在
+    'sign': (10007, 20024),  # 签名不匹配
+    'param': (10008, 20007),  # 非法参数
+    'no_order': (10009, 20015),  # 订单不存在
+    'funds': (10010, 20012),  # 余额/保证金不足
+    'close': (10008, 20016),  # 平仓数量大于可平数量
+    'counterparty': (10008, 20013),  # 暂无对手价
+    'price': (10014, 20018),  # 价格超出限价
+}
+
+KLINE_PERIODS = {
+    '1min': 60, '3min': 180, '5min': 300, '15min': 900, '30min': 1800,
+    '1hour': 3600, '2hour': 7200, '4hour': 14400, '6hour': 21600,
+    '12hour': 43200, '1day': 86400, '3day': 259200, '1week': 604800,
+}
+# 保留的成交数和1分钟K线数
+TRADES_KEPT = 10000
+BARS_KEPT = 10080
+# 币币trades一次返回600条, 合约100条
+SPOT_PAGE, FUTURE_PAGE = 600, 100
+# 合约下单价格不能偏离指数的比例
+PRICE_LIMIT = 0.03
+# 每笔合约订单的类型: 1:开多 2:开空 3:平多 4:平空 -> (方向, 仓位方向, 是否开仓)
+FUTURE_TYPES = {1: (BUY, BUY, True), 2: (SELL, SELL, True),
+                3: (SELL, BUY, False), 4: (BUY, SELL, False)}
+
+_MISSING = object()
+
+
+class Rejected(Exception):
+    """
+    请求被拒绝, reason为ERRORS中的键
+    """
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _param(params, name, cast=str, default=_MISSING):
+    value = params.get(name)
+    if value is None or value == '':
+        if default is _MISSING:
+            raise Rejected('required')
+        return default
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        raise Rejected('param')
+
+
+def _positive(value):
+    value = float(value)
+    if not value > 0 or math.isinf(value):
+        raise ValueError(value)
+    return value
+
+
+def _ids(value):
+    return [int(i) for i in str(value).split(',') if i]
+
+
+def _num(value):
+    return round(value, 8)
+
+
+def _delivery(contract_type, today=None):
+    """
+    :return: date, 当周/次周为周五交割, 季度为季末最后一个周五且晚于次周
+    """
+    today = today or date.today()
+    friday = today + timedelta((4 - today.weekday()) % 7)
+    if contract_type == 'this_week':
+        return friday
+    if contract_type == 'next_week':
+        return friday + timedelta(7)
+    month = (today.month - 1) // 3 * 3 + 3
+    year = today.year
+    while True:
+        last = date(year + month // 12, month % 12 + 1, 1) - timedelta(1)
+        day = last - timedelta((last.weekday() - 4) % 7)
+        if day > friday + timedelta(7):
+            return day
+        month += 3
+        if month > 12:
+            year, month = year + 1, month - 12
+
+
+class Market:
+    """
+    一个币对或合约: 订单簿, 最近的成交和1分钟K线
+    """
+
+    def __init__(self, symbol, contract_type, mid, unit_amount=None,
+                 index=0):
+        """
+        :param contract_type: 币币为None
+        :param unit_amount: 合约面值(美元), 币币为None
+        """
+        self.symbol = symbol
+        self.contract_type = contract_type
+        self.unit_amount = unit_amount
+        self.book = OrderBook()
+        self.trades = deque(maxlen=TRADES_KEPT)
+        self.bars = deque(maxlen=BARS_KEPT)
+        self.last = self.high = self.low = mid
+        self.vol = 0.0
+        # 价格精度: 约为价格的万分之一
+        self.digits = max(0, 4 - int(math.floor(math.log10(mid))))
+        self.tick = 10 ** -self.digits
+        if contract_type is not None:
+            day = _delivery(contract_type)
+            self.delivery = day.isoformat()
+            self.contract_name = symbol[:3].upper() + day.strftime('%m%d')
+            self.contract_id = int(day.strftime('%Y%m%d') + '%04d' % index)
+
+    @property
+    def coin(self):
+        return self.symbol.split('_')[0]
+
+    def round(self, price):
+        return round(price, self.digits)
+
+    def record(self, tid, price, qty, side):
+        now = time.time()
+        date_ms = int(now * 1000)
+        self.trades.append(dict(amount=_num(qty), date=int(now),
+                                date_ms=date_ms, price=price, tid=tid,
+                                type='buy' if side == BUY else 'sell'))
+        self.last = price
+        self.high = max(self.high, price)
+        self.low = min(self.low, price)
+        self.vol += qty
+        coin_volume = qty * self.unit_amount / price if self.unit_amount \
+            else qty * price
+        ts = date_ms - date_ms % 60000
+        bar = self.bars[-1] if self.bars else None
+        if bar is None or bar[0] != ts:
+            self.bars.append([ts, price, price, price, price, qty,
+                              coin_volume])
+            return
+        bar[2] = max(bar[2], price)
+        bar[3] = min(bar[3], price)
+        bar[4] = price
+        bar[5] += qty
+        bar[6] += coin_volume
+
+
+class Position:
+    """
+    一个合约在一个杠杆倍数下的多/空仓位, value为按开仓价折算的币数
+    """
+    __slots__ = ['lever_rate', 'amount', 'value', 'frozen', 'profit_real',
+                 'create_date']
+
+    def __init__(self, lever_rate):
+        self.lever_rate = lever_rate
+        self.amount = {BUY: 0.0, SELL: 0.0}
+        self.value = {BUY: 0.0, SELL: 0.0}
+        # 挂单中的平仓数量
+        self.frozen = {BUY: 0.0, SELL: 0.0}
+        self.profit_real = {BUY: 0.0, SELL: 0.0}
+        self.create_date = int(time.time() * 1000)
+
+    def avg_price(self, side, unit_amount):
+        value = self.value[side]
+        return self.amount[side] * unit_amount / value if value else 0.0
+
+    def unrealized(self, side, unit_amount, price):
+        return side * (self.value[side] -
+                       self.amount[side] * unit_amount / price)
+
+    def margin(self):
+        return (self.value[BUY] + self.value[SELL]) / self.lever_rate
+
+
+class Account:
+    def __init__(self, api_key, secret_key, spot=None, future=None):
+        """
+        :param spot: dict, {币种: 币币可用余额}
+        :param future: dict, {币种: 合约账户权益}
+        """
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.free = defaultdict(float, spot or {})
+        self.freezed = defaultdict(float)
+        self.rights = defaultdict(float, future or {})
+        self.profit_real = defaultdict(float)
+        # 开仓挂单冻结的保证金
+        self.frozen_margin = defaultdict(float)
+        # {(symbol, contract_type): {lever_rate: Position}}
+        self.positions = defaultdict(dict)
+        # {order_id: (market, order)}, 全部订单和未完成订单
+        self.orders = dict()
+        self.open = dict()
+        # {withdraw_id: (提币信息, 提现记录)}
+        self.withdraws = dict()
+        self.records = []
+
+    def position(self, market, lever_rate):
+        levers = self.positions[(market.symbol, market.contract_type)]
+        pos = levers.get(lever_rate)
+        if pos is None:
+            pos = levers[lever_rate] = Position(lever_rate)
+        return pos
+
+    def used_margin(self, coin):
+        return sum(pos.margin() for (symbol, _), levers
+                   in self.positions.items() if symbol.startswith(coin + '_')
+                   for pos in levers.values())
+
+    def available_margin(self, coin):
+        return self.rights[coin] - self.used_margin(coin) - \
+            self.frozen_margin[coin]
+
+
+class Exchange:
+    """
+    内存中的模拟交易所: 实现api_base中Spot/Future的全部接口, 按价格/时间
+    优先撮合, 签名与build_my_sign一致. 做市账户在最新价两侧保持levels档挂单
+    """
+
+    def __init__(self, spot=None, future=None, levels=20, maker_amount=None):
+        """
+        :param spot: dict, {币对: 初始价格}, 默认SPOT_MIDS
+        :param future: dict, {合约: 初始价格}, 每个合约有CONTRACT_TYPES三种
+        :param levels: 做市挂单的档数
+        :param maker_amount: (币币数量, 合约张数), 每档做市挂单的大小
+        """
+        self.levels = levels
+        self.maker_amount = maker_amount or (10.0, 100.0)
+        self.markets = dict()
+        for symbol, mid in (spot or SPOT_MIDS).items():
+            self.markets[(symbol, None)] = Market(symbol, None, mid)
+        for i, (symbol, mid) in enumerate(sorted((future or
+                                                  FUTURE_MIDS).items())):
+            unit = 100 if symbol.startswith('btc') else 10
+            for contract_type in CONTRACT_TYPES:
+                self.markets[(symbol, contract_type)] = Market(
+                    symbol, contract_type, mid, unit, i)
+        self.__accounts = dict()
+        self.__maker = Account(None, None)
+        self.__order_ids = itertools.count(1000000)
+        self.__tids = itertools.count(1)
+        self.__withdraw_ids = itertools.count(1)
+        self.__lock = threading.Lock()
+        self.__routes = {path: (getattr(self, '_spot_' + name), 0)
+                         for name, path in SPOT_PATHS.items()}
+        self.__routes.update({path: (getattr(self, '_future_' + name), 1)
+                              for name, path in FUTURE_PATHS.items()})
+        for market in self.markets.values():
+            self.__refill(market)
+
+    def add_account(self, api_key, secret_key, spot=None, future=None):
+        """
+        :param spot: dict, {币种: 余额}, 默认每个币种1000, usdt为1000万
+        :param future: dict, {币种: 权益}, 默认每个币种100
+        :return: Account
+        """
+        if spot is None:
+            currencies = {c for symbol, contract_type in self.markets
+                          if contract_type is None
+                          for c in symbol.split('_')}
+            spot = {c: 1e7 if c == 'usdt' else 1000.0 for c in currencies}
+        if future is None:
+            future = {m.coin: 100.0 for m in self.markets.values()
+                      if m.contract_type is not None}
+        account = Account(api_key, secret_key, spot, future)
+        for coin, amount in spot.items():
+            account.records.append(dict(
+                addr='', account='', amount=amount, bank='',
+                benificiary_address='', transaction_value=amount, fee=0,
+                date=int(time.time() * 1000), status=1, type=0,
+                symbol=coin))
+        with self.__lock:
+            self.__accounts[api_key] = account
+        return account
+
+    def handle(self, method, path, params):
+        """
+        :param path: 接口路径, 如/api/v1/future_trade.do
+        :param params: dict, 查询参数和表单参数
+        :return: (http状态码, 响应的json对象)
+        """
+        route = self.__routes.get(path)
+        if route is None:
+            return 404, dict(error_code=404)
+        handler, kind = route
+        try:
+            with self.__lock:
+                return 200, handler(params)
+        except Rejected as e:
+            return 200, dict(result=False, error_code=ERRORS[e.reason][kind])
+        except Exception:
+            traceback.print_exc()
+            return 500, dict(result=False, error_code=ERRORS['system'][kind])
+
+    def error(self, path, reason='system'):
+        """
+        :return: 该接口的错误响应, 用于注入错误
+        """
+        kind = 1 if path in FUTURE_PATHS.values() else 0
+        return dict(result=False, error_code=ERRORS[reason][kind])
+
+    # 币币行情
+
+    def _spot_ticker(self, params):
+        market = self.__market(params, None)
+        book = market.book
+        ticker = dict(buy=book.best(BUY) or market.last, high=market.high,
+                      last=market.last, low=market.low,
+                      sell=book.best(SELL) or market.last,
+                      vol=_num(market.vol))
+        return dict(date=str(int(time.time())),
+                    ticker={k: str(v) for k, v in ticker.items()})
+
+    def _spot_depth(self, params):
+        return self.__depth(self.__market(params, None), params)
+
+    def _spot_trades(self, params):
+        market = self.__market(params, None)
+        since = _param(params, 'since', int, None)
+        return self.__trades(market, since, SPOT_PAGE)
+
+    def _spot_kline(self, params):
+        return [bar[:6] for bar in self.__kline(self.__market(params, None),
+                                                params)]
+
+    # 币币交易
+
+    def _spot_userinfo(self, params):
+        account = self.__auth(params)
+        funds = dict(free={c: str(_num(v)) for c, v in account.free.items()},
+                     freezed={c: str(_num(v))
+                              for c, v in account.freezed.items()})
+        return dict(info=dict(funds=funds), result=True)
+
+    def _spot_trade(self, params):
+        account = self.__auth(params)
+        market = self.__market(params, None)
+        order = self.__spot_order(account, market, _param(params, 'type'),
+                                  params)
+        return dict(result=True, order_id=order.order_id)
+
+    def _spot_batch_trade(self, params):
+        account = self.__auth(params)
+        market = self.__market(params, None)
+        default_type = params.get('type')
+        info = []
+        for item in self.__batch(params, 'orders_data'):
+            try:
+                order = self.__spot_order(
+                    account, market, _param(item, 'type', str, default_type),
+                    item, limit_only=True)
+                info.append(dict(order_id=order.order_id))
+            except Rejected as e:
+                info.append(dict(order_id=-1,
+                                 error_code=ERRORS[e.reason][0]))
+        return dict(order_info=info, result=True)
+
+    def _spot_cancel_order(self, params):
+        account = self.__auth(params)
+        market = self.__market(params, None)
+        return self.__cancel(account, market, params, 0)
+
+    def _spot_order_info(self, params):
+        account = self.__auth(params)
+        market = self.__market(params, None)
+        order_id = _param(params, 'order_id', int)
+        if order_id == -1:
+            orders = self.__orders(account.open, market)
+        else:
+            orders = [self.__order(account, market, order_id)]
+        return dict(orders=[self.__spot_json(market, o) for o in orders],
+                    result=True)
+
+    def _spot_orders_info(self, params):
+        account = self.__auth(params)
+        market = self.__market(params, None)
+        done = _param(params, 'type', int) == 1
+        orders = [account.orders[i][1] for i in
+                  _param(params, 'order_id', _ids) if i in account.orders]
+        return dict(orders=[self.__spot_json(market, o) for o in orders
+                            if o.done == done], result=True)
+
+    def _spot_order_history(self, params):
+        account = self.__auth(params)
+        market = self.__market(params, None)
+        done = _param(params, 'status', int) == 1
+        page = _param(params, 'current_page', int, 1)
+        length = min(_param(params, 'page_length', int, 200), 200)
+        orders = [o for o in self.__orders(account.orders, market)
+                  if o.done == done]
+        start = (max(page, 1) - 1) * length
+        return dict(current_page=page, page_length=length,
+                    orders=[self.__spot_json(market, o)
+                            for o in orders[start:start + length]],
+                    result=True, total=len(orders))
+
+    def _spot_withdraw(self, params):
+        account = self.__auth(params)
+        coin = _param(params, 'symbol').split('_')[0]
+        amount = _param(params, 'withdraw_amount', _positive)
+        fee = _param(params, 'chargefee', float)
+        _param(params, 'trade_pwd')
+        if account.free[coin] < amount + fee - EPS:
+            raise Rejected('funds')
+        account.free[coin] -= amount + fee
+        withdraw_id = next(self.__withdraw_ids)
+        now = int(time.time() * 1000)
+        address = _param(params, 'withdraw_address')
+        record = dict(addr=address, account='', amount=amount, bank='',
+                      benificiary_address='', transaction_value=amount,
+                      fee=fee, date=now, status=0, type=1, symbol=coin)
+        account.records.append(record)
+        # 提币和对应的提现记录, 撤销时一起更新状态
+        account.withdraws[withdraw_id] = (dict(
+            address=address, amount=amount, chargefee=fee, created_date=now,
+            status=0, withdraw_id=withdraw_id), record)
+        return dict(withdraw_id=withdraw_id, result=True)
+
+    def _spot_cancel_withdraw(self, params):
+        account = self.__auth(params)
+        found = account.withdraws.get(_param(params, 'withdraw_id', int))
+        if found is None or found[0]['status'] != 0:
+            raise Rejected('param')
+        withdraw, record = found
+        # -2:已撤销
+        withdraw['status'] = record['status'] = -2
+        account.free[record['symbol']] += withdraw['amount'] + \
+            withdraw['chargefee']
+        return dict(result=True, withdraw_id=withdraw['withdraw_id'])
+
+    def _spot_withdraw_info(self, params):
+        account = self.__auth(params)
+        found = account.withdraws.get(_param(params, 'withdraw_id', int))
+        if found is None:
+            raise Rejected('param')
+        return dict(result=True, withdraw=[dict(found[0])])
+
+    def _spot_account_records(self, params):
+        account = self.__auth(params)
+        coin = _param(params, 'symbol')
+        kind = _param(params, 'type', int)
+        page = _param(params, 'current_page', int, 1)
+        length = min(_param(params, 'page_length', int, 50), 50)
+        records = [{k: v for k, v in r.items() if k not in ('type',
+                                                             'symbol')}
+                   for r in account.records
+                   if r['symbol'] == coin and r['type'] == kind]
+        start = (max(page, 1) - 1) * length
+        return dict(records=records[start:start + length], symbol=coin)
+
+    # 合约行情
+
+    def _future_ticker(self, params):
+        market = self.__market(params)
+        book = market.book
+        return dict(date=str(int(time.time())), ticker=dict(
+            last=market.last, buy=book.best(BUY) or market.last,
+            sell=book.best(SELL) or market.last, high=market.high,
+            low=market.low, vol=_num(market.vol),
+            contract_id=market.contract_id, unit_amount=market.unit_amount))
+
+    def _future_depth(self, params):
+        return self.__depth(self.__market(params), params)
+
+    def _future_trades(self, params):
+        return self.__trades(self.__market(params), None, FUTURE_PAGE)
+
+    def _future_index(self, params):
+        return dict(future_index=self.__index(_param(params, 'symbol')))
+
+    def _future_exchange_rate(self, params):
+        return dict(rate=6.3)
+
+    def _future_estimated_price(self, params):
+        return dict(forecast_price=self.__index(_param(params, 'symbol')))
+
+    def _future_kline(self, params):
+        return self.__kline(self.__market(params), params)
+
+    def _future_hold_amount(self, params):
+        market = self.__market(params)
+        key = (market.symbol, market.contract_type)
+        amount = sum(pos.amount[BUY] for account in
+                     self.__accounts.values()
+                     for pos in account.positions.get(key, {}).values())
+        return [dict(amount=_num(amount),
+                     contract_name=market.contract_name)]
+
+    def _future_price_limit(self, params):
+        market = self.__market(params)
+        high, low = self.__price_limit(market)
+        return dict(high=high, low=low)
+
+    # 合约交易
+
+    def _future_userinfo(self, params):
+        account = self.__auth(params)
+        info = dict()
+        for coin in self.__coins(account):
+            margin = account.used_margin(coin)
+            unreal = self.__unrealized(account, coin)
+            info[coin] = dict(
+                account_rights=_num(account.rights[coin] + unreal),
+                keep_deposit=_num(margin),
+                profit_real=_num(account.profit_real[coin]),
+                profit_unreal=_num(unreal),
+                risk_rate=_num((account.rights[coin] + unreal) / margin)
+                if margin else 10000)
+        return dict(info=info, result=True)
+
+    def _future_position(self, params):
+        account = self.__auth(params)
+        market = self.__market(params)
+        levers = account.positions.get((market.symbol,
+                                        market.contract_type), {})
+        holding = [self.__holding(market, pos) for pos in levers.values()
+                   if pos.amount[BUY] or pos.amount[SELL]]
+        return dict(force_liqu_price=str(self.__liquidation(
+            account, market, list(levers.values()))), holding=holding,
+            result=True)
+
+    def _future_trade(self, params):
+        account = self.__auth(params)
+        market = self.__market(params)
+        order = self.__future_order(account, market, params,
+                                    _param(params, 'lever_rate', int, 10))
+        return dict(order_id=order.order_id, result=True)
+
+    def _future_trades_history(self, params):
+        self.__auth(params)
+        symbol = _param(params, 'symbol')
+        day = _param(params, 'date')
+        since = _param(params, 'since', int)
+        for market in self.markets.values():
+            if market.symbol == symbol and \
+                    getattr(market, 'delivery', None) == day:
+                return self.__trades(market, since, FUTURE_PAGE)
+        return []
+
+    def _future_batch_trade(self, params):
+        account = self.__auth(params)
+        market = self.__market(params)
+        lever_rate = _param(params, 'lever_rate', int, 10)
+        info = []
+        for item in self.__batch(params, 'order_data'):
+            try:
+                order = self.__future_order(account, market, item,
+                                            lever_rate)
+                info.append(dict(order_id=order.order_id))
+            except Rejected as e:
+                info.append(dict(order_id=-1,
+                                 error_code=ERRORS[e.reason][1]))
+        return dict(order_info=info, result=True)
+
+    def _future_cancel(self, params):
+        account = self.__auth(params)
+        market = self.__market(params)
+        return self.__cancel(account, market, params, 1)
+
+    def _future_order_info(self, params):
+        account = self.__auth(params)
+        market = self.__market(params)
+        order_id = _param(params, 'order_id', int)
+        if order_id == -1:
+            done = _param(params, 'status', int) == 2
+            page = _param(params, 'current_page', int, 1)
+            length = min(_param(params, 'page_length', int, 50), 50)
+            orders = [o for o in self.__orders(
+                account.orders if done else account.open, market)
+                      if o.done == done]
+            start = (max(page, 1) - 1) * length
+            orders = orders[start:start + length]
+        else:
+            orders = [self.__order(account, market, order_id)]
+        return dict(orders=[self.__future_json(market, o) for o in orders],
+                    result=True)
+
+    def _future_orders_info(self, params):
+        account = self.__auth(params)
+        market = self.__market(params)
+        orders = [account.orders[i][1] for i in
+                  _param(params, 'order_id', _ids) if i in account.orders]
+        return dict(orders=[self.__future_json(market, o) for o in orders],
+                    result=True)
+
+    def _future_userinfo_4fix(self, params):
+        account = self.__auth(params)
+        info = dict()
+        for coin in self.__coins(account):
+            contracts = []
+            for market in self.markets.values():
+                if market.contract_type is None or market.coin != coin:
+                    continue
+                levers = account.positions.get((market.symbol,
+                                                market.contract_type), {})
+                if not levers:
+                    continue
+                bond = sum(pos.margin() for pos in levers.values())
+                contracts.append(dict(
+                    available=_num(account.available_margin(coin)),
+                    balance=_num(bond), bond=_num(bond),
+                    contract_id=market.contract_id,
+                    contract_type=market.contract_type,
+                    freeze=_num(account.frozen_margin[coin]),
+                    profit=_num(sum(sum(pos.profit_real.values())
+                                    for pos in levers.values())),
+                    unprofit=_num(sum(
+                        pos.unrealized(side, market.unit_amount, market.last)
+                        for pos in levers.values() for side in (BUY, SELL)))))
+            info[coin] = dict(balance=_num(account.available_margin(coin)),
+                              rights=_num(account.rights[coin]),
+                              contracts=contracts)
+        return dict(info=info, result=True)
+
+    def _future_position_4fix(self, params):
+        account = self.__auth(params)
+        market = self.__market(params)
+        everything = _param(params, 'type', int, 0) == 1
+        levers = account.positions.get((market.symbol,
+                                        market.contract_type), {})
+        holding = []
+        for pos in levers.values():
+            if not (pos.amount[BUY] or pos.amount[SELL]) or \
+                    (not everything and pos.lever_rate != 10):
+                continue
+            line = self.__holding(market, pos)
+            for side, name in ((BUY, 'buy'), (SELL, 'sell')):
+                bond = pos.value[side] / pos.lever_rate
+                unreal = pos.unrealized(side, market.unit_amount,
+                                        market.last)
+                line[name + '_bond'] = _num(bond)
+                line[name + '_flatprice'] = self.__liquidation(
+                    account, market, [pos], side, bond)
+                line[name + '_profit_lossratio'] = \
+                    _num(unreal / bond * 100) if bond else 0
+            holding.append(line)
+        return dict(holding=holding, result=True)
+
+    def _future_explosive(self, params):
+        # 不模拟强平, 没有爆仓单
+        self.__market(params)
+        return dict(data=[])
+
+    def _future_devolve(self, params):
+        account = self.__auth(params)
+        coin = _param(params, 'symbol').split('_')[0]
+        kind = _param(params, 'type', int)
+        amount = _param(params, 'amount', _positive)
+        if kind == 1:
+            if account.free[coin] < amount - EPS:
+                raise Rejected('funds')
+            account.free[coin] -= amount
+            account.rights[coin] += amount
+        elif kind == 2:
+            if account.available_margin(coin) < amount - EPS:
+                raise Rejected('funds')
+            account.rights[coin] -= amount
+            account.free[coin] += amount
+        else:
+            raise Rejected('param')
+        return dict(result=True)
+
+    # 内部实现
+
+    def __auth(self, params):
+        api_key = params.get('api_key')
+        sign = params.get('sign')
+        if not api_key or not sign:
+            raise Rejected('required')
+        account = self.__accounts.get(api_key)
+        if account is None:
+            raise Rejected('no_key')
+        unsigned = {k: v for k, v in params.items() if k != 'sign'}
+        if build_my_sign(unsigned, account.secret_key) != sign:
+            raise Rejected('sign')
+        return account
+
+    def __market(self, params, contract_type=_MISSING):
+        if contract_type is _MISSING:
+            contract_type = _param(params, 'contract_type')
+        market = self.markets.get((_param(params, 'symbol'), contract_type))
+        if market is None:
+            raise Rejected('param')
+        return market
+
+    @staticmethod
+    def __batch(params, name):
+        try:
+            items = json.loads(_param(params, name))
+        except ValueError:
+            raise Rejected('param')
+        if not isinstance(items, list) or not 0 < len(items) <= 5 or \
+                not all(isinstance(item, dict) for item in items):
+            raise Rejected('param')
+        return items
+
+    @staticmethod
+    def __depth(market, params):
+        size = min(max(_param(params, 'size', int, 200), 1), 200)
+        asks, bids = market.book.depth(size)
+        return dict(asks=[[p, _num(v)] for p, v in asks],
+                    bids=[[p, _num(v)] for p, v in bids])
+
+    @staticmethod
+    def __trades(market, since, page):
+        trades = market.trades
+        if since is None:
+            return list(itertools.islice(trades, max(len(trades) - page, 0),
+                                         None))
+        # tid递增, 二分找到since之后的位置
+        start = bisect_right([t['tid'] for t in trades], since)
+        return list(itertools.islice(trades, start, start + page))
+
+    @staticmethod
+    def __kline(market, params):
+        seconds = KLINE_PERIODS.get(_param(params, 'type'))
+        if seconds is None:
+            raise Rejected('param')
+        size = _param(params, 'size', int, 0)
+        since = _param(params, 'since', int, 0)
+        ms = seconds * 1000
+        bars = []
+        for bar in market.bars:
+            ts = bar[0] - bar[0] % ms
+            if ts < since:
+                continue
+            last = bars[-1] if bars else None
+            if last is None or last[0] != ts:
+                bars.append([ts] + bar[1:])
+                continue
+            last[2] = max(last[2], bar[2])
+            last[3] = min(last[3], bar[3])
+            last[4] = bar[4]
+            last[5] += bar[5]
+            last[6] += bar[6]
+        bars = bars[-size:] if size else bars[-2000:]
+        return [bar[:5] + [_num(bar[5]), _num(bar[6])] for bar in bars]
+
+    def __index(self, symbol):
+        lasts = [m.last for m in self.markets.values()
+                 if m.symbol == symbol and m.contract_type is not None]
+        if not lasts:
+            raise Rejected('param')
+        return round(sum(lasts) / len(lasts), 4)
+
+    def __price_limit(self, market):
+        index = self.__index(market.symbol)
+        return (market.round(index * (1 + PRICE_LIMIT)),
+                market.round(index * (1 - PRICE_LIMIT)))
+
+    def __coins(self, account):
+        coins = {m.coin for m in self.markets.values()
+                 if m.contract_type is not None}
+        return sorted(coins | set(account.rights))
+
+    def __unrealized(self, account, coin):
+        total = 0.0
+        for (symbol, contract_type), levers in account.positions.items():
+            market = self.markets[(symbol, contract_type)]
+            if market.coin != coin:
+                continue
+            total += sum(pos.unrealized(side, market.unit_amount,
+                                        market.last)
+                         for pos in levers.values() for side in (BUY, SELL))
+        return total
+
+    def __liquidation(self, account, market, positions, side=None,
+                      rights=None):
+        """
+        :return: 权益亏损到0时的价格, 只计入positions中side方向的持仓
+        """
+        rights = account.rights[market.coin] if rights is None else rights
+        unit = market.unit_amount
+        amount = value = 0.0
+        for pos in positions:
+            for s in ((BUY, SELL) if side is None else (side,)):
+                amount += s * pos.amount[s]
+                value += s * pos.value[s]
+        if abs(amount) < EPS:
+            return 0
+        # rights + value - amount*unit/P = 0 (空仓时amount/value为负)
+        inverse = (rights + value) / (amount * unit)
+        return market.round(1 / inverse) if inverse > 0 else 0
+
+    def __holding(self, market, pos):
+        line = dict(contract_id=market.contract_id,
+                    contract_type=market.contract_type,
+                    create_date=pos.create_date, lever_rate=pos.lever_rate,
+                    symbol=market.symbol)
+        for side, name in ((BUY, 'buy'), (SELL, 'sell')):
+            avg = market.round(pos.avg_price(side, market.unit_amount))
+            line[name + '_amount'] = _num(pos.amount[side])
+            line[name + '_available'] = _num(pos.amount[side] -
+                                             pos.frozen[side])
+            line[name + '_price_avg'] = avg
+            line[name + '_price_cost'] = avg
+            line[name + '_profit_real'] = _num(pos.profit_real[side])
+        return line
+
+    @staticmethod
+    def __orders(orders, market):
+        return [o for m, o in orders.values() if m is market]
+
+    @staticmethod
+    def __order(account, market, order_id):
+        found = account.orders.get(order_id)
+        if found is None or found[0] is not market:
+            raise Rejected('no_order')
+        return found[1]
+
+    def __spot_order(self, account, market, kind, params, limit_only=False):
+        base, quote = market.symbol.split('_')
+        max_cost = None
+        if kind in ('buy', 'sell'):
+            price = market.round(_param(params, 'price', _positive))
+            amount = _param(params, 'amount', _positive)
+        elif kind == 'buy_market' and not limit_only:
+            # 市价买单的price为买入金额
+            price, amount = None, float('inf')
+            max_cost = _param(params, 'price', _positive)
+        elif kind == 'sell_market' and not limit_only:
+            price, amount = None, _param(params, 'amount', _positive)
+        else:
+            raise Rejected('param')
+        side = BUY if kind.startswith('buy') else SELL
+        if side == BUY:
+            need, currency = (max_cost if price is None
+                              else price * amount), quote
+        else:
+            need, currency = amount, base
+        if account.free[currency] < need - EPS:
+            raise Rejected('funds')
+        account.free[currency] -= need
+        account.freezed[currency] += need
+        order = self.__new_order(account, market, side, price, amount,
+                                 dict(type=kind))
+        self.__match(market, order, max_cost)
+        if price is None:
+            # 市价单未成交的部分撤销
+            if side == BUY:
+                left = max_cost - order.cost
+                account.freezed[quote] -= left
+                account.free[quote] += left
+                order.amount = order.deal_amount
+            else:
+                account.freezed[base] -= order.remaining
+                account.free[base] += order.remaining
+            order.status = FILLED if order.deal_amount else CANCELLED
+            self.__finish(order)
+        return order
+
+    def __future_order(self, account, market, params, lever_rate):
+        kind = _param(params, 'type', int)
+        if kind not in FUTURE_TYPES or lever_rate not in (10, 20):
+            raise Rejected('param')
+        side, position_side, opening = FUTURE_TYPES[kind]
+        amount = _param(params, 'amount', _positive)
+        if amount != int(amount):
+            raise Rejected('param')
+        if _param(params, 'match_price', int, 0) == 1:
+            # 对手价: 以对手盘的最优价作为限价
+            price = market.book.best(-side)
+            if price is None:
+                raise Rejected('counterparty')
+        else:
+            price = market.round(_param(params, 'price', _positive))
+        high, low = self.__price_limit(market)
+        if not low <= price <= high:
+            raise Rejected('price')
+        info = dict(type=kind, lever_rate=lever_rate, margin=0.0)
+        if opening:
+            margin = amount * market.unit_amount / price / lever_rate
+            if account.available_margin(market.coin) < margin - EPS:
+                raise Rejected('funds')
+            account.frozen_margin[market.coin] += margin
+            info['margin'] = margin
+        else:
+            pos = account.position(market, lever_rate)
+            if pos.amount[position_side] - pos.frozen[position_side] < \
+                    amount - EPS:
+                raise Rejected('close')
+            pos.frozen[position_side] += amount
+        order = self.__new_order(account, market, side, price, amount, info)
+        self.__match(market, order)
+        return order
+
+    def __new_order(self, account, market, side, price, amount, info):
+        order = Order(next(self.__order_ids), account, side, price, amount,
+                      info)
+        account.orders[order.order_id] = (market, order)
+        account.open[order.order_id] = (market, order)
+        return order
+
+    def __match(self, market, order, max_cost=None):
+        fills = market.book.submit(order, max_cost)
+        for maker, price, qty in fills:
+            market.record(next(self.__tids), price, qty, order.side)
+            self.__settle(market, maker, price, qty)
+            self.__settle(market, order, price, qty)
+            if maker.done:
+                self.__finish(maker)
+        if order.done:
+            self.__finish(order)
+        if fills:
+            self.__refill(market)
+
+    @staticmethod
+    def __finish(order):
+        order.account.open.pop(order.order_id, None)
+
+    def __settle(self, market, order, price, qty):
+        account = order.account
+        if account is self.__maker:
+            return
+        if market.contract_type is None:
+            base, quote = market.symbol.split('_')
+            if order.side == BUY:
+                frozen_price = price if order.price is None else order.price
+                account.freezed[quote] -= frozen_price * qty
+                account.free[quote] += (frozen_price - price) * qty
+                account.free[base] += qty
+            else:
+                account.freezed[base] -= qty
+                account.free[quote] += price * qty
+            return
+        info = order.info
+        side, position_side, opening = FUTURE_TYPES[info['type']]
+        coin = market.coin
+        pos = account.position(market, info['lever_rate'])
+        value = qty * market.unit_amount / price
+        if opening:
+            account.frozen_margin[coin] -= info['margin'] * qty / order.amount
+            pos.amount[position_side] += qty
+            pos.value[position_side] += value
+            return
+        opened = pos.value[position_side] * qty / pos.amount[position_side]
+        pnl = position_side * (opened - value)
+        account.rights[coin] += pnl
+        account.profit_real[coin] += pnl
+        pos.profit_real[position_side] += pnl
+        pos.amount[position_side] -= qty
+        pos.value[position_side] -= opened
+        pos.frozen[position_side] -= qty
+
+    def __cancel(self, account, market, params, kind):
+        ids = _param(params, 'order_id', _ids)
+        if not 0 < len(ids) <= 3:
+            raise Rejected('param')
+        success, error = [], []
+        for order_id in ids:
+            found = account.open.get(order_id)
+            if found is None or found[0] is not market or \
+                    not market.book.cancel(found[1]):
+                error.append(order_id)
+                continue
+            self.__release(market, found[1])
+            self.__finish(found[1])
+            success.append(order_id)
+        if len(ids) > 1:
+            return dict(success=','.join(map(str, success)),
+                        error=','.join(map(str, error)))
+        if error:
+            raise Rejected('no_order')
+        return dict(order_id=ids[0], result=True)
+
+    @staticmethod
+    def __release(market, order):
+        """
+        撤单后解冻剩余部分
+        """
+        account = order.account
+        remaining = order.remaining
+        if market.contract_type is None:
+            base, quote = market.symbol.split('_')
+            if order.side == BUY:
+                account.freezed[quote] -= order.price * remaining
+                account.free[quote] += order.price * remaining
+            else:
+                account.freezed[base] -= remaining
+                account.free[base] += remaining
+            return
+        info = order.info
+        side, position_side, opening = FUTURE_TYPES[info['type']]
+        if opening:
+            account.frozen_margin[market.coin] -= \
+                info['margin'] * remaining / order.amount
+        else:
+            account.position(market, info['lever_rate']).frozen[
+                position_side] -= remaining
+
+    def __refill(self, market):
+        """
+        做市账户补齐最新价两侧的挂单
+        """
+        book = market.book
+        amount = self.maker_amount[market.contract_type is not None]
+        for side in (BUY, SELL):
+            if book.levels(side) >= self.levels // 2:
+                continue
+            opposite = book.best(-side)
+            for k in range(1, self.levels + 1):
+                price = market.round(market.last - side * k * market.tick)
+                if price <= 0:
+                    break
+                if opposite is not None and (price - opposite) * side >= 0:
+                    continue
+                if not book.has_level(side, price):
+                    book.submit(Order(next(self.__order_ids), self.__maker,
+                                      side, price, amount))
+
+    @staticmethod
+    def __spot_json(market, order):
+        return dict(amount=_num(order.amount),
+                    avg_price=market.round(order.avg_price),
+                    create_date=order.create_date,
+                    deal_amount=_num(order.deal_amount),
+                    order_id=order.order_id, orders_id=order.order_id,
+                    price=order.price or 0, status=order.status,
+                    symbol=market.symbol, type=order.info['type'])
+
+    @staticmethod
+    def __future_json(market, order):
+        info = order.info
+        return dict(amount=_num(order.amount),
+                    contract_name=market.contract_name,
+                    create_date=order.create_date,
+                    deal_amount=_num(order.deal_amount), fee=0,
+                    lever_rate=info['lever_rate'], order_id=order.order_id,
+                    price=order.price,
+                    price_avg=market.round(order.avg_price),
+                    status=order.status, symbol=market.symbol,
+                    type=info['type'], unit_amount=market.unit_amount)
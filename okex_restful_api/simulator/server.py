@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :server
+"""
+import json
+import time
+import random
+import threading
+from urllib.parse import urlsplit, parse_qsl
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from ..api_utils.transport import Response
+from .exchange import Exchange
+
+# 注入的故障
+ERROR, HTTP_ERROR, DISCONNECT, LOST = 'error', 'http_error', 'disconnect', \
+    'lost'
+
+
+class Faults:
+    """
+    延迟和错误注入: 每个请求延迟 latency + 指数分布(均值jitter) 秒,
+    再按概率返回错误码/502/断开连接
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0,
+                 http_error_rate=0.0, disconnect_rate=0.0, lost_rate=0.0,
+                 paths=None, seed=None):
+        """
+        :param latency: 固定延迟(秒)
+        :param jitter: 额外延迟的均值(秒), 指数分布, 形成长尾
+        :param error_rate: 返回系统错误码(10002/20014)的比例, 请求不执行
+        :param http_error_rate: 返回502的比例, 请求不执行
+        :param disconnect_rate: 不执行请求直接断开连接的比例
+        :param lost_rate: 执行请求后断开连接的比例, 如下单成功但响应丢失
+        :param paths: 只对这些接口路径注入, None为全部
+        :param seed: 随机数种子, 便于复现
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.rates = ((ERROR, error_rate), (HTTP_ERROR, http_error_rate),
+                      (DISCONNECT, disconnect_rate), (LOST, lost_rate))
+        self.paths = None if paths is None else frozenset(paths)
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+
+    def draw(self, path):
+        """
+        :return: (延迟秒数, 故障类型或None)
+        """
+        if self.paths is not None and path not in self.paths:
+            return 0.0, None
+        with self.__lock:
+            delay = self.latency
+            if self.jitter:
+                delay += self.__random.expovariate(1 / self.jitter)
+            r = self.__random.random()
+        for fault, rate in self.rates:
+            if r < rate:
+                return delay, fault
+            r -= rate
+        return delay, None
+
+
+class _Disconnect(Exception):
+    pass
+
+
+def serve(exchange, faults, method, path, params):
+    """
+    :return: (http状态码, 响应内容bytes), 需要断开连接时抛出_Disconnect
+    """
+    delay, fault = faults.draw(path) if faults is not None else (0.0, None)
+    if delay:
+        time.sleep(delay)
+    if fault == ERROR:
+        return 200, _encode(exchange.error(path))
+    if fault == HTTP_ERROR:
+        return 502, b'<html><body>502 Bad Gateway</body></html>'
+    if fault == DISCONNECT:
+        raise _Disconnect()
+    status, result = exchange.handle(method, path, params)
+    if fault == LOST:
+        raise _Disconnect()
+    return status, _encode(result)
+
+
+def _encode(result):
+    return json.dumps(result, separators=(',', ':')).encode('utf-8')
+
+
+def _split(url, params=None):
+    parts = urlsplit(url)
+    merged = dict(parse_qsl(parts.query, keep_blank_values=True))
+    merged.update((k, str(v)) for k, v in (params or {}).items())
+    return parts.path, merged
+
+
+class SimulatorTransport:
+    """
+    进程内调用Exchange, 可替代HttpSession, 用于不经过http的压测
+    """
+
+    def __init__(self, exchange: Exchange = None, faults: Faults = None):
+        self.exchange = exchange or Exchange()
+        self.faults = faults
+
+    def get(self, url, headers=None, timeout=None):
+        return self.__call('GET', url)
+
+    def post(self, url, params=None, headers=None, timeout=None):
+        return self.__call('POST', url, params)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def __call(self, method, url, params=None):
+        path, params = _split(url, params)
+        try:
+            return Response(*reversed(serve(self.exchange, self.faults,
+                                            method, path, params)))
+        except _Disconnect:
+            import requests
+            raise requests.exceptions.ConnectionError(
+                'simulated disconnect: %s' % path)
+
+
+class AsyncSimulatorTransport:
+    """
+    SimulatorTransport的异步版本, 可替代AsyncHttpSession
+    """
+
+    def __init__(self, exchange: Exchange = None, faults: Faults = None):
+        self.exchange = exchange or Exchange()
+        self.faults = faults
+
+    async def get(self, url, headers=None, timeout=None):
+        return await self.__call('GET', url)
+
+    async def post(self, url, params=None, headers=None, timeout=None):
+        return await self.__call('POST', url, params)
+
+    async def close(self):
+        pass
+
+    async def __call(self, method, url, params=None):
+        import asyncio
+        path, params = _split(url, params)
+        delay, fault = self.faults.draw(path) if self.faults is not None \
+            else (0.0, None)
+        if delay:
+            await asyncio.sleep(delay)
+        if fault == ERROR:
+            return _encode(self.exchange.error(path))
+        if fault == HTTP_ERROR:
+            return b'<html><body>502 Bad Gateway</body></html>'
+        if fault in (DISCONNECT, LOST):
+            if fault == LOST:
+                self.exchange.handle(method, path, params)
+            import aiohttp
+            raise aiohttp.ServerDisconnectedError()
+        return _encode(self.exchange.handle(method, path, params)[1])
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    """
+    本地http服务, 用Exchange响应/api/v1/*.do, 配合set_domain(server.url)
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, exchange: Exchange = None, faults: Faults = None,
+                 host='127.0.0.1', port=0):
+        super().__init__((host, port), _SimulatorHandler)
+        self.exchange = exchange or Exchange()
+        self.faults = faults
+        self.__thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return 'http://%s:%d' % (host, port)
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.serve_forever,
+                                         daemon=True)
+        self.__thread.start()
+        return self
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _SimulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.__reply('GET')
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else ''
+        self.__reply('POST', dict(parse_qsl(body, keep_blank_values=True)))
+
+    def log_message(self, *args):
+        pass
+
+    def __reply(self, method, params=None):
+        path, params = _split(self.path, params)
+        try:
+            status, content = serve(self.server.exchange, self.server.faults,
+                                    method, path, params)
+        except _Disconnect:
+            self.close_connection = True
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json' if status != 502
+                         else 'text/html')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
@@ -4,15 +4,39 @@
 @Date     :2018-03-16-15:17
 @Author   : Xin Zhang
 """
-from .api_utils import (rest_api, http_post, http_get,
-                        build_api_sign, build_param_with_sign)
+from functools import partial
 
+from .api_utils import rest_api, Signer, RestClient, run_concurrently
+from .bulk_cancel import cancel_chunks, merge_cancel_results
+from .pagination import (iter_pages, order_history_pages,
+                         account_records_pages)
+from .results import result_decoders
 
-class SpotApi:
-    def __init__(self, api_key=None, secret_key=None):
+
+class SpotApi(RestClient):
+    def __init__(self, api_key=None, secret_key=None, session=None,
+                 rate_limiter=None, cache=None, result_type=None,
+                 instrument=None, retrier=None):
+        """
+        :param api_key: api_key
+        :param secret_key: secret_key
+        :param session: HttpSession, 为None时使用进程内共享的默认会话
+        :param rate_limiter: RateLimiter, 可在多个实例间共享, None为不限流
+        :param cache: ResponseCache, 公共行情接口的缓存, None为不缓存
+        :param result_type: None返回原始json, numpy时depth/trades/kline
+                            返回numpy数组, 见arrays.py; object时返回
+                            __slots__结果对象, 见models.py
+        :param instrument: Instrumentation, 请求耗时/错误统计, None为不统计
+        :param retrier: Retrier, 按接口类别的重试配置, None为默认配置
+        """
         self.__api_key = api_key
         self.__secret_key = secret_key
+        self.__signer = Signer(api_key, secret_key)
         self.__api = rest_api.spot
+        self._init_client(api_key, session, rate_limiter, cache, instrument,
+                          retrier, {self.__api.paths[k]: f for k, f in
+                                    result_decoders(result_type).items()
+                                    if k in self.__api.paths})
 
     def ticker(self, symbol):
         """
@@ -20,7 +44,7 @@ class SpotApi:
         :param symbol: 币对如ltc_btc
         :return: {date:int, ticker:{}}
         """
-        return http_get(self.__api.ticker, symbol=symbol)
+        return self._http_get(self.__api.ticker, symbol=symbol)
 
     def depth(self, symbol, size):
         """
@@ -30,7 +54,7 @@ class SpotApi:
         :return: dict, {ask:[], bid:[]}
         """
         param = dict(symbol=symbol, size=size)
-        return http_get(self.__api.depth, **param)
+        return self._http_get(self.__api.depth, **param)
 
     def trades(self, symbol, **params):
         """
@@ -46,7 +70,7 @@ class SpotApi:
         if since:
             op_param['since'] = since
         param.update(op_param)
-        return http_get(self.__api.trades, **param)
+        return self._http_get(self.__api.trades, **param)
 
     def kline(self, symbol, type, **params):
         """
@@ -67,7 +91,7 @@ class SpotApi:
             op_param['since'] = since
         param = dict(symbol=symbol, type=type)
         param.update(op_param)
-        return http_get(self.__api.kline, **param)
+        return self._http_get(self.__api.kline, **param)
 
     def userinfo(self):
         """
@@ -75,8 +99,8 @@ class SpotApi:
         :return: {info:{}, result:true}
         """
         self.__assert_api_secret_key()
-        param = build_api_sign(self.__api_key, self.__secret_key)
-        return http_post(self.__api.userinfo, param)
+        param = self.__signer.api_sign()
+        return self._http_post(self.__api.userinfo, param)
 
     def trade(self, symbol, type, **params):
         """
@@ -99,8 +123,8 @@ class SpotApi:
         param = dict(symbol=symbol, type=type,
                      api_key=self.__api_key)
         param.update(op_param)
-        param = build_param_with_sign(param, self.__secret_key)
-        return http_post(self.__api.trade, param)
+        param = self.__signer.sign_params(param)
+        return self._http_post(self.__api.trade, param)
 
     def batch_trade(self, symbol, orders_data, **params):
         """
@@ -118,12 +142,12 @@ class SpotApi:
         param = dict(symbol=symbol, orders_data=orders_data,
                      api_key=self.__api_key)
         param.update(op_param)
-        param = build_param_with_sign(param, self.__secret_key)
-        return http_post(self.__api.batch_trade, param)
+        param = self.__signer.sign_params(param)
+        return self._http_post(self.__api.batch_trade, param)
 
     def cancel_order(self, symbol, order_id):
         """
-        撤销订单
+        撤销订单, 访问频率 20次/2秒
         :param symbol: 币对如ltc_btc
         :param order_id: 订单ID(多个订单ID中间以","分隔,一次最多允许撤消3个订单)
         :return: dict, {success:"id1,id2", error:"id_3,id_4"}
@@ -131,8 +155,23 @@ class SpotApi:
         self.__assert_api_secret_key()
         param = dict(symbol=symbol, order_id=order_id,
                      api_key=self.__api_key)
-        param = build_param_with_sign(param, self.__secret_key)
-        return http_post(self.__api.cancel_order, param)
+        param = self.__signer.sign_params(param)
+        return self._http_post(self.__api.cancel_order, param)
+
+    def cancel_many(self, symbol, order_ids, max_workers=None):
+        """
+        批量撤销订单, 按每次3个拆分后并发调用cancel_order
+        :param symbol: 币对如ltc_btc
+        :param order_ids: list 或 以","分隔的订单ID
+        :param max_workers: 并发线程数, 默认为min(32, 批次数)
+        :return: dict, {success:[order_id], error:{order_id: 错误码/异常}}
+        """
+        jobs = self._cancel_jobs(symbol, order_ids)
+        return merge_cancel_results(run_concurrently(jobs, max_workers))
+
+    def _cancel_jobs(self, symbol, order_ids):
+        return {chunk: partial(self.cancel_order, symbol, chunk)
+                for chunk in cancel_chunks(order_ids)}
 
     def order_info(self, symbol, order_id):
         """
@@ -144,8 +183,8 @@ class SpotApi:
         self.__assert_api_secret_key()
         param = dict(symbol=symbol, order_id=order_id,
                      api_key=self.__api_key)
-        param = build_param_with_sign(param, self.__secret_key)
-        return http_post(self.__api.order_info, param)
+        param = self.__signer.sign_params(param)
+        return self._http_post(self.__api.order_info, param)
 
     def orders_info(self, symbol, order_id, type):
         """
@@ -159,8 +198,8 @@ class SpotApi:
         param = dict(symbol=symbol, order_id=order_id,
                      type=type,
                      api_key=self.__api_key)
-        param = build_param_with_sign(param, self.__secret_key)
-        return http_post(self.__api.orders_info, param)
+        param = self.__signer.sign_params(param)
+        return self._http_post(self.__api.orders_info, param)
 
     def order_history(self, symbol, status, current_page, page_length):
         """
@@ -176,8 +215,21 @@ class SpotApi:
                      current_page=current_page,
                      page_length=page_length,
                      api_key=self.__api_key)
-        param = build_param_with_sign(param, self.__secret_key)
-        return http_post(self.__api.order_history, param)
+        param = self.__signer.sign_params(param)
+        return self._http_post(self.__api.order_history, param)
+
+    def iter_order_history(self, symbol, status, page_length=200,
+                           prefetch=False):
+        """
+        逐页获取历史订单的生成器, 消费到下一页时才请求
+        :param symbol: 币对如ltc_btc
+        :param status: 查询状态 0：未完成的订单 1：已经完成的订单(最近两天的数据)
+        :param page_length: 每页数据条数，最多不超过200
+        :param prefetch: True时提前请求下一页
+        :return: generator, 逐个返回订单dict, 请求失败时抛出PageError
+        """
+        return iter_pages(order_history_pages(self, symbol, status,
+                                              page_length), prefetch)
 
     def withdraw(self, symbol, chargefee, trade_pwd, withdraw_address,
                  withdraw_amount, target):
@@ -202,8 +254,8 @@ class SpotApi:
                      trade_pwd=trade_pwd, withdraw_address=withdraw_address,
                      withdraw_amount=withdraw_amount, target=target,
                      api_key=self.__api_key)
-        param = build_param_with_sign(param, self.__secret_key)
-        return http_post(self.__api.withdraw, param)
+        param = self.__signer.sign_params(param)
+        return self._http_post(self.__api.withdraw, param)
 
     def cancel_withdraw(self, symbol, withdraw_id):
         """
@@ -215,8 +267,8 @@ class SpotApi:
         self.__assert_api_secret_key()
         param = dict(symbol=symbol, withdraw_id=withdraw_id,
                      api_key=self.__api_key)
-        param = build_param_with_sign(param, self.__secret_key)
-        return http_post(self.__api.cancel_withdraw, param)
+        param = self.__signer.sign_params(param)
+        return self._http_post(self.__api.cancel_withdraw, param)
 
     def withdraw_info(self, symbol, withdraw_id):
         """
@@ -228,8 +280,8 @@ class SpotApi:
         self.__assert_api_secret_key()
         param = dict(symbol=symbol, withdraw_id=withdraw_id,
                      api_key=self.__api_key)
-        param = build_param_with_sign(param, self.__secret_key)
-        return http_post(self.__api.withdraw_info, param)
+        param = self.__signer.sign_params(param)
+        return self._http_post(self.__api.withdraw_info, param)
 
     def account_records(self, symbol, type, current_page, page_length):
         """
@@ -243,8 +295,21 @@ class SpotApi:
         self.__assert_api_secret_key()
         param = dict(symbol=symbol, type=type, current_page=current_page,
                      page_length=page_length, api_key=self.__api_key)
-        param = build_param_with_sign(param, self.__secret_key)
-        return http_post(self.__api.account_records, param)
+        param = self.__signer.sign_params(param)
+        return self._http_post(self.__api.account_records, param)
+
+    def iter_account_records(self, symbol, type, page_length=50,
+                             prefetch=False):
+        """
+        逐页获取提现/充值记录的生成器, 消费到下一页时才请求
+        :param symbol: 币种如btc, ltc, eth, etc, bch, usdt
+        :param type: 0：充值 1 ：提现
+        :param page_length: 每页数据条数，最多不超过50
+        :param prefetch: True时提前请求下一页
+        :return: generator, 逐个返回记录dict, 请求失败时抛出PageError
+        """
+        return iter_pages(account_records_pages(self, symbol, type,
+                                                page_length), prefetch)
 
     def __assert_api_secret_key(self):
         assert (
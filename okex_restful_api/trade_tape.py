@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :trade_tape
+"""
+import time
+import threading
+from array import array
+from collections import namedtuple, deque
+
+from .api_utils import is_error
+
+SIDE = {'buy': 1, 'sell': -1}
+# 币币trades一次最多返回600条
+SPOT_PAGE = 600
+
+Trade = namedtuple('Trade', ['tid', 'date_ms', 'price', 'amount', 'side'])
+# buy_volume/sell_volume 主动买入/卖出的数量
+Bar = namedtuple('Bar', ['ts', 'open', 'high', 'low', 'close', 'volume',
+                         'buy_volume', 'sell_volume', 'count'])
+
+
+def _rows(resp):
+    """
+    :param resp: trades接口返回的list, 或result_type='numpy'时的record array
+    :return: 按tid升序的 [(tid, date_ms, price, amount, side)]
+    """
+    if hasattr(resp, 'dtype'):
+        rows = zip(resp['tid'].tolist(), resp['date_ms'].tolist(),
+                   resp['price'].tolist(), resp['amount'].tolist(),
+                   resp['side'].tolist())
+    else:
+        rows = ((int(t['tid']), int(t.get('date_ms') or
+                                    int(t['date']) * 1000),
+                 float(t['price']), float(t['amount']), SIDE[t['type']])
+                for t in resp)
+    return sorted(rows)
+
+
+class TradeTape:
+    """
+    一个合约/币对的成交记录: 按tid去重后追加到固定容量的环形缓冲区,
+    增量维护最近window秒的VWAP/成交量/买卖不平衡和OHLCV K线.
+    滚动统计在追加和读取时都按当前时间移出过期成交, 停止成交后归零
+    """
+
+    def __init__(self, capacity=100000, window=60, bar_seconds=60,
+                 max_bars=1440, clock=time.time):
+        """
+        :param capacity: 缓冲区保存的最多成交数
+        :param window: 滚动统计的时间窗口(秒)
+        :param bar_seconds: K线周期(秒)
+        :param max_bars: 保留的已完成K线数
+        :param clock: 返回当前时间(秒), 与成交的date_ms比较
+        """
+        self.capacity = capacity
+        self.window_ms = int(window * 1000)
+        self.bar_ms = int(bar_seconds * 1000)
+        self.last_tid = 0
+        self.tids = array('q', bytes(8 * capacity))
+        self.dates = array('q', bytes(8 * capacity))
+        self.prices = array('d', bytes(8 * capacity))
+        self.amounts = array('d', bytes(8 * capacity))
+        self.sides = array('b', bytes(capacity))
+        self.bars = deque(maxlen=max_bars)
+        self.bar = None
+        self.clock = clock
+        # 写入的总条数, 第i条在i % capacity
+        self.__count = 0
+        # 滚动窗口中最早一条的序号
+        self.__start = 0
+        self.__volume = 0.0
+        self.__notional = 0.0
+        self.__buy = 0.0
+        self.__sell = 0.0
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.__count, self.capacity)
+
+    def extend(self, resp):
+        """
+        追加tid大于last_tid的成交
+        :param resp: trades接口返回
+        :return: int, 新增的成交数
+        """
+        if is_error(resp):
+            return 0
+        added = 0
+        with self.__lock:
+            for row in _rows(resp):
+                if row[0] <= self.last_tid:
+                    continue
+                self.__append(*row)
+                added += 1
+            if added:
+                self.__expire(self.dates[(self.__count - 1) % self.capacity])
+        return added
+
+    @property
+    def volume(self):
+        """
+        :return: 窗口内的成交量
+        """
+        with self.__lock:
+            self.__expire_now()
+            return self.__volume
+
+    @property
+    def vwap(self):
+        """
+        :return: 窗口内的成交均价, 没有成交时为None
+        """
+        with self.__lock:
+            self.__expire_now()
+            if not self.__volume:
+                return None
+            return self.__notional / self.__volume
+
+    @property
+    def imbalance(self):
+        """
+        :return: (买-卖)/(买+卖), -1到1, 没有成交时为0
+        """
+        with self.__lock:
+            self.__expire_now()
+            total = self.__buy + self.__sell
+            return (self.__buy - self.__sell) / total if total else 0.0
+
+    def stats(self):
+        """
+        :return: dict, 滚动窗口内的 {count, volume, buy_volume, sell_volume,
+                                       vwap, imbalance}
+        """
+        with self.__lock:
+            self.__expire_now()
+            total = self.__buy + self.__sell
+            return dict(count=self.__count - self.__start,
+                        volume=self.__volume, buy_volume=self.__buy,
+                        sell_volume=self.__sell,
+                        vwap=self.__notional / self.__volume
+                        if self.__volume else None,
+                        imbalance=(self.__buy - self.__sell) / total
+                        if total else 0.0)
+
+    def latest(self, n=None):
+        """
+        :return: list, 最近n条Trade, 按tid升序
+        """
+        with self.__lock:
+            size = min(self.__count, self.capacity)
+            n = size if n is None else min(n, size)
+            return [self.__trade(i) for i in
+                    range(self.__count - n, self.__count)]
+
+    def __trade(self, seq):
+        i = seq % self.capacity
+        return Trade(self.tids[i], self.dates[i], self.prices[i],
+                     self.amounts[i], self.sides[i])
+
+    def __append(self, tid, date_ms, price, amount, side):
+        if self.__count - self.__start >= self.capacity:
+            # 覆盖的成交仍在窗口内时先移出窗口
+            self.__drop()
+        i = self.__count % self.capacity
+        self.tids[i] = tid
+        self.dates[i] = date_ms
+        self.prices[i] = price
+        self.amounts[i] = amount
+        self.sides[i] = side
+        self.__count += 1
+        self.last_tid = tid
+        self.__volume += amount
+        self.__notional += price * amount
+        if side > 0:
+            self.__buy += amount
+        else:
+            self.__sell += amount
+        self.__update_bar(date_ms, price, amount, side)
+
+    def __expire_now(self):
+        self.__expire(int(self.clock() * 1000))
+
+    def __expire(self, now_ms):
+        cutoff = now_ms - self.window_ms
+        while self.__start < self.__count and \
+                self.dates[self.__start % self.capacity] < cutoff:
+            self.__drop()
+        if self.__start == self.__count:
+            # 避免浮点累计误差
+            self.__volume = self.__notional = self.__buy = self.__sell = 0.0
+
+    def __drop(self):
+        i = self.__start % self.capacity
+        amount = self.amounts[i]
+        self.__volume -= amount
+        self.__notional -= self.prices[i] * amount
+        if self.sides[i] > 0:
+            self.__buy -= amount
+        else:
+            self.__sell -= amount
+        self.__start += 1
+
+    def __update_bar(self, date_ms, price, amount, side):
+        ts = date_ms - date_ms % self.bar_ms
+        bar = self.bar
+        if bar is None or ts > bar.ts:
+            if bar is not None:
+                self.bars.append(bar)
+            self.bar = Bar(ts, price, price, price, price, amount,
+                           amount if side > 0 else 0.0,
+                           amount if side < 0 else 0.0, 1)
+            return
+        self.bar = Bar(bar.ts, bar.open, max(bar.high, price),
+                       min(bar.low, price), price, bar.volume + amount,
+                       bar.buy_volume + (amount if side > 0 else 0.0),
+                       bar.sell_volume + (amount if side < 0 else 0.0),
+                       bar.count + 1)
+
+
+class _TradeCollector:
+    def __init__(self, api, **tape_params):
+        """
+        :param api: FutureApi 或 SpotApi
+        :param tape_params: 新建TradeTape的参数
+        """
+        self.api = api
+        self.tape_params = tape_params
+        self.__tapes = dict()
+        self.__lock = threading.Lock()
+
+    def _tape(self, key):
+        tape = self.__tapes.get(key)
+        if tape is None:
+            with self.__lock:
+                tape = self.__tapes.setdefault(key,
+                                               TradeTape(**self.tape_params))
+        return tape
+
+    def tapes(self):
+        return dict(self.__tapes)
+
+
+class SpotTradeCollector(_TradeCollector):
+    """
+    币币成交: 用since=last_tid只请求更新的成交, 满页时继续请求下一页
+    """
+
+    def tape(self, symbol):
+        return self._tape(symbol)
+
+    def poll(self, symbol, max_pages=10):
+        """
+        :return: int, 新增的成交数
+        """
+        tape = self.tape(symbol)
+        added = 0
+        for _ in range(max_pages):
+            since = tape.last_tid
+            resp = self.api.trades(symbol, since=since) if since \
+                else self.api.trades(symbol)
+            if is_error(resp):
+                break
+            added += tape.extend(resp)
+            if not since or len(resp) < SPOT_PAGE:
+                break
+        return added
+
+
+class FutureTradeCollector(_TradeCollector):
+    """
+    合约成交: 接口只返回最新一页, 按tid去掉已处理的部分
+    """
+
+    def tape(self, symbol, contract_type):
+        return self._tape((symbol, contract_type))
+
+    def poll(self, symbol, contract_type):
+        """
+        :return: int, 新增的成交数
+        """
+        return self.tape(symbol, contract_type).extend(
+            self.api.trades(symbol, contract_type))
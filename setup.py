@@ -10,8 +10,14 @@ from setuptools import setup
 setup(
     name='okex_restful_api',
     version='0.1',
-    packages=['okex_restful_api'],
+    packages=['okex_restful_api', 'okex_restful_api.api_utils',
+              'okex_restful_api.simulator'],
     include_package_data=True,
+    extras_require={
+        'async': ['aiohttp'],
+        'numpy': ['numpy'],
+        'fast_json': ['orjson'],
+    },
     author='Xin Zhang',
     author_email='1131463@gmail.com',
     description='A okex restful api tool...',
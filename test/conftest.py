@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :conftest
+"""
+
+# test_okex_api.py在import时请求真实的交易所, 需要api_key, 手动运行;
+# 其余测试都不访问网络
+collect_ignore = ['test_okex_api.py']
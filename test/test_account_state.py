@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :test_account_state
+"""
+import time
+import threading
+import unittest
+
+from okex_restful_api.account_state import AccountState, flatten, diff
+from okex_restful_api.api_utils import (Instrumentation, rest_api,
+                                        endpoint_of)
+from okex_restful_api.future_api import FutureApi
+from okex_restful_api.spot_api import SpotApi
+from okex_restful_api.simulator import Exchange, SimulatorTransport
+from okex_restful_api.simulator.server import Faults
+
+SYMBOL, CONTRACT = 'btc_usd', 'quarter'
+POSITION = ('future_position', SYMBOL, CONTRACT)
+SPOT_USERINFO = rest_api.spot.userinfo
+
+
+class FlattenTest(unittest.TestCase):
+
+    def test_paths(self):
+        fields = flatten(dict(result=True, info=dict(
+            btc=dict(account_rights=1.5, keep_deposit=0))))
+        self.assertEqual(fields, {('info', 'btc', 'account_rights'): 1.5,
+                                  ('info', 'btc', 'keep_deposit'): 0})
+
+    def test_holding_is_keyed_by_contract_and_lever(self):
+        a = dict(contract_id=1, lever_rate=10, buy_amount=2)
+        b = dict(contract_id=1, lever_rate=20, buy_amount=3)
+        fields = flatten(dict(holding=[a, b]))
+        self.assertEqual(fields, flatten(dict(holding=[b, a])))
+        self.assertEqual(fields[('holding', (1, 20), 'buy_amount')], 3)
+
+    def test_plain_list_is_keyed_by_index(self):
+        self.assertEqual(flatten(dict(x=[5, 6])),
+                         {('x', 0): 5, ('x', 1): 6})
+
+    def test_diff(self):
+        old = {('a',): 1, ('b',): 2, ('c',): 3}
+        new = {('a',): 1, ('b',): 4, ('d',): 5}
+        self.assertEqual(diff(old, new), {('b',): (2, 4),
+                                          ('c',): (3, None),
+                                          ('d',): (None, 5)})
+        self.assertEqual(diff(new, dict(new)), {})
+
+
+class AccountStateTest(unittest.TestCase):
+
+    def setUp(self):
+        exchange = Exchange()
+        exchange.add_account('key', 'secret')
+        self.transport = SimulatorTransport(exchange)
+        self.instrument = Instrumentation()
+        self.future = FutureApi('key', 'secret', session=self.transport,
+                                instrument=self.instrument)
+        self.spot = SpotApi('key', 'secret', session=self.transport,
+                            instrument=self.instrument)
+        self.changes = []
+        self.published = threading.Event()
+
+    def state(self, **kwargs):
+        state = AccountState(self.future, self.spot,
+                             positions=[(SYMBOL, CONTRACT)], **kwargs)
+        state.subscribe(self.on_change)
+        self.addCleanup(state.stop)
+        return state
+
+    def on_change(self, name, changes):
+        self.changes.append((name, changes))
+        self.published.set()
+
+    def requests(self, resource=SPOT_USERINFO):
+        stats = self.instrument.stats().get(endpoint_of(resource), {})
+        return stats.get('requests', 0)
+
+    def buy(self):
+        price = self.future.ticker(SYMBOL, CONTRACT)['ticker']['sell']
+        self.future.trade(SYMBOL, CONTRACT, price, 1, 1)
+
+    def test_names(self):
+        self.assertEqual(self.state().names(),
+                         ['future_userinfo', POSITION, 'spot_userinfo'])
+        fixed = AccountState(self.future, positions=[(SYMBOL, CONTRACT)],
+                             fixed=True)
+        self.assertIn(('future_position_4fix', SYMBOL, CONTRACT),
+                      fixed.names())
+
+    def test_refresh_publishes_only_changes(self):
+        state = self.state()
+        changes = state.refresh('future_userinfo')
+        self.assertIn(('info', 'btc', 'account_rights'), changes)
+        self.assertEqual(self.changes, [('future_userinfo', changes)])
+        self.assertEqual(state.refresh('future_userinfo'), {})
+        self.assertEqual(len(self.changes), 1)
+
+        self.assertEqual(state.get(POSITION)['holding'], [])
+        self.buy()
+        changes = state.refresh(POSITION)
+        self.assertTrue(any(path[0] == 'holding' for path in changes))
+        self.assertEqual(len(state.get(POSITION)['holding']), 1)
+
+    def test_failing_subscriber_is_logged(self):
+        state = self.state()
+
+        def broken(name, changes):
+            raise KeyError(name)
+
+        state.subscribe(broken)
+        state.subscribe(self.on_change)
+        with self.assertLogs('okex_restful_api.account_state', 'ERROR'):
+            state.refresh('spot_userinfo')
+        self.assertEqual([n for n, _ in self.changes], ['spot_userinfo'] * 2)
+
+    def test_get_refreshes_stale_data(self):
+        state = self.state(max_age=60)
+        state.get('spot_userinfo')
+        state.get('spot_userinfo')
+        self.assertEqual(self.requests(), 1)
+        self.assertLess(state.age('spot_userinfo'), 60)
+        state.get('spot_userinfo', max_age=0)
+        self.assertEqual(self.requests(), 2)
+
+    def test_invalidate_refreshes_in_background(self):
+        state = self.state(interval=60)
+        for name in state.names():
+            state.refresh(name)
+        self.changes.clear()
+        self.published.clear()
+        state.start()
+        self.buy()
+        state.invalidate([POSITION], delay=0.01)
+        self.assertTrue(self.published.wait(2))
+        self.assertEqual(self.changes[0][0], POSITION)
+
+    def test_own_orders_invalidate_through_post_hook(self):
+        state = self.state(interval=60, debounce=0.01)
+        state.attach(self.instrument)
+        for name in state.names():
+            state.refresh(name)
+        self.changes.clear()
+        self.published.clear()
+        state.start()
+        spot_requests = self.requests()
+        self.buy()
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline:
+            if {'future_userinfo', POSITION} <= {n for n, _ in self.changes}:
+                break
+            time.sleep(0.01)
+        self.assertEqual({n for n, _ in self.changes},
+                         {'future_userinfo', POSITION})
+        # 合约下单不影响币币账户
+        self.assertEqual(self.requests(), spot_requests)
+
+    def test_on_response_ignores_queries(self):
+        state = self.state(interval=60, debounce=0)
+        state.attach(self.instrument)
+        for name in state.names():
+            state.refresh(name)
+        state.start()
+        before = self.requests(rest_api.future.userinfo)
+        self.future.ticker(SYMBOL, CONTRACT)
+        self.future.position(SYMBOL, CONTRACT)
+        time.sleep(0.1)
+        self.assertEqual(self.requests(rest_api.future.userinfo), before)
+
+    def test_failed_refresh_keeps_last_result(self):
+        state = self.state(retry_delay=60, interval=60)
+        resp = state.get('spot_userinfo')
+        self.transport.faults = Faults(error_rate=1.0)
+        self.assertEqual(state.refresh('spot_userinfo'), {})
+        self.assertIs(state.get('spot_userinfo', max_age=0), resp)
+        # 退避期间读取不再请求
+        self.assertEqual(self.requests(), 2)
+
+    def test_backoff_after_failures(self):
+        self.transport.faults = Faults(error_rate=1.0)
+        state = self.state(retry_delay=0.05, interval=0.2)
+        state.start()
+        time.sleep(0.5)
+        # 0, 0.05, 0.15, 0.35: 没有退避时后台线程会连续请求
+        self.assertLessEqual(self.requests(), 6)
+
+        self.transport.faults = None
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline:
+            if 'spot_userinfo' in {n for n, _ in self.changes}:
+                break
+            time.sleep(0.01)
+        self.assertIn('spot_userinfo', {n for n, _ in self.changes})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :test_async_http
+"""
+import asyncio
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import aiohttp
+
+from okex_restful_api.api_utils import (HttpSession, AsyncHttpSession,
+                                        Instrumentation, Retrier,
+                                        RetryPolicy, ReplayTransport,
+                                        AsyncReplayTransport, http_get,
+                                        http_post, async_http_get,
+                                        async_http_post,
+                                        rest_api, endpoint_of)
+from okex_restful_api.async_api import AsyncFutureApi, AsyncSpotApi
+from okex_restful_api.simulator import Exchange
+from okex_restful_api.simulator.server import (AsyncSimulatorTransport,
+                                               Faults)
+
+SYMBOL, CONTRACT = 'btc_usd', 'quarter'
+PARAMS = dict(api_key='key', symbol='btc_usd', price=8400.5, amount=1,
+              trade_pwd='中文 &=?', sign='ABCDEF')
+
+
+class CaptureServer(ThreadingHTTPServer):
+    """
+    记录收到的请求行和请求体, 返回{"result":true}
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _CaptureHandler)
+        self.requests = []
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d/api/v1/future_trade.do' \
+            % self.server_address[1]
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _CaptureHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self.do_POST()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.server.requests.append((self.command, self.path,
+                                     self.rfile.read(length)))
+        body = b'{"result":true}'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class WireFormatTest(unittest.TestCase):
+
+    def test_async_post_matches_sync(self):
+        server = CaptureServer()
+        self.addCleanup(server.close)
+        with HttpSession() as session:
+            self.assertEqual(http_post(server.url, dict(PARAMS), session),
+                             dict(result=True))
+
+        async def post():
+            async with AsyncHttpSession() as session:
+                return await async_http_post(server.url, dict(PARAMS),
+                                             session)
+
+        self.assertEqual(asyncio.run(post()), dict(result=True))
+        sync, async_ = server.requests
+        self.assertEqual(sync, async_)
+        self.assertIn('price=8400.5', sync[1])
+
+    def test_async_get_matches_sync(self):
+        server = CaptureServer()
+        self.addCleanup(server.close)
+        with HttpSession() as session:
+            http_get(server.url, session=session, **PARAMS)
+
+        async def get():
+            async with AsyncHttpSession() as session:
+                return await async_http_get(server.url, session=session,
+                                            **PARAMS)
+
+        self.assertEqual(asyncio.run(get()), dict(result=True))
+        sync, async_ = server.requests
+        self.assertEqual(sync, async_)
+
+
+class AsyncHttpTest(unittest.TestCase):
+
+    def setUp(self):
+        self.exchange = Exchange()
+        self.exchange.add_account('key', 'secret')
+
+    def run_api(self, coro_fn, **kwargs):
+        async def main():
+            transport = AsyncSimulatorTransport(self.exchange,
+                                                kwargs.pop('faults', None))
+            api = AsyncFutureApi('key', 'secret', session=transport,
+                                 **kwargs)
+            return await coro_fn(api)
+
+        return asyncio.run(main())
+
+    def test_get_and_signed_post(self):
+        instrument = Instrumentation()
+
+        async def calls(api):
+            return (await api.ticker(SYMBOL, CONTRACT),
+                    await api.userinfo())
+
+        ticker, userinfo = self.run_api(calls, instrument=instrument)
+        self.assertIn('last', ticker['ticker'])
+        self.assertTrue(userinfo['result'])
+        stats = instrument.stats()
+        self.assertEqual(stats[endpoint_of(rest_api.future.ticker)]
+                         ['requests'], 1)
+        self.assertEqual(stats[endpoint_of(rest_api.future.userinfo)]
+                         ['requests'], 1)
+
+    def test_orders_reach_the_exchange(self):
+        async def trade(api):
+            price = (await api.ticker(SYMBOL, CONTRACT))['ticker']['sell']
+            resp = await api.trade(SYMBOL, CONTRACT, price, 1, 1)
+            return resp, await api.position(SYMBOL, CONTRACT)
+
+        resp, position = self.run_api(trade)
+        self.assertGreater(resp['order_id'], 0)
+        self.assertEqual(position['holding'][0]['buy_amount'], 1)
+
+    def test_failed_post_returns_none(self):
+        retrier = Retrier(policies=dict(signed=RetryPolicy(
+            attempts=2, base_delay=0, jitter=0)))
+
+        async def userinfo(api):
+            return await api.userinfo()
+
+        with self.assertLogs('okex_restful_api.api_utils.async_http_utils',
+                             'ERROR'):
+            self.assertIsNone(self.run_api(
+                userinfo, retrier=retrier,
+                faults=Faults(disconnect_rate=1.0)))
+
+    def test_get_raises_after_retries(self):
+        retrier = Retrier(policies=dict(public=RetryPolicy(
+            attempts=2, base_delay=0, jitter=0)))
+        transport = AsyncSimulatorTransport(self.exchange,
+                                            Faults(disconnect_rate=1.0))
+        with self.assertRaises(aiohttp.ServerDisconnectedError):
+            asyncio.run(async_http_get(rest_api.future.ticker,
+                                       session=transport, retrier=retrier,
+                                       symbol=SYMBOL,
+                                       contract_type=CONTRACT))
+
+    def test_replay(self):
+        replay = ReplayTransport()
+        replay.add('POST', rest_api.spot.userinfo,
+                   b'{"result":true,"info":{}}', params=dict(api_key='x'))
+
+        async def userinfo():
+            api = AsyncSpotApi('key', 'secret',
+                               session=AsyncReplayTransport(replay))
+            return await api.userinfo()
+
+        self.assertEqual(asyncio.run(userinfo()),
+                         dict(result=True, info={}))
+
+
+if __name__ == '__main__':
+    unittest.main()
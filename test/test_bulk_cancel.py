@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :test_bulk_cancel
+"""
+import unittest
+
+from okex_restful_api.api_utils import (FanoutResult, RateLimiter,
+                                        endpoint_of, rest_api)
+from okex_restful_api.bulk_cancel import cancel_chunks, merge_cancel_results
+from okex_restful_api.future_api import FutureApi
+from okex_restful_api.spot_api import SpotApi
+from okex_restful_api.simulator import Exchange, SimulatorTransport
+
+
+class CancelChunksTest(unittest.TestCase):
+
+    def test_split_by_three(self):
+        self.assertEqual(cancel_chunks([1, 2, 3, 4, 5, 6, 7]),
+                         ['1,2,3', '4,5,6', '7'])
+
+    def test_string_ids_are_stripped(self):
+        self.assertEqual(cancel_chunks(' 1, 2,,3 ,4'), ['1,2,3', '4'])
+        self.assertEqual(cancel_chunks(''), [])
+
+
+class MergeCancelResultsTest(unittest.TestCase):
+
+    def test_merge(self):
+        result = FanoutResult()
+        result['1,2,3'] = dict(success='1,2', error='3:20015')
+        result['4'] = dict(order_id=4, result=True)
+        result.errors['5,6'] = dict(result=False, error_code=20014)
+        timeout = TimeoutError('timed out')
+        result.errors['7'] = timeout
+        report = merge_cancel_results(result)
+        self.assertEqual(sorted(report['success']), ['1', '2', '4'])
+        self.assertEqual(report['error'], {'3': '20015', '5': 20014,
+                                           '6': 20014, '7': timeout})
+
+
+class CancelManyTest(unittest.TestCase):
+
+    def test_cancel_many_on_simulator(self):
+        exchange = Exchange()
+        exchange.add_account('key', 'secret')
+        api = FutureApi('key', 'secret', session=SimulatorTransport(exchange))
+        buy = api.ticker('btc_usd', 'quarter')['ticker']['buy']
+        ids = [api.trade('btc_usd', 'quarter', round(buy * 0.98, 2), 1,
+                         1)['order_id'] for _ in range(7)]
+        report = api.cancel_many(ids + ['42'], 'btc_usd', 'quarter')
+        self.assertEqual(sorted(report['success']),
+                         sorted(str(i) for i in ids))
+        self.assertEqual(list(report['error']), ['42'])
+        for order_id in ids:
+            order = api.order_info('btc_usd', 'quarter', 1,
+                                   order_id)['orders'][0]
+            self.assertEqual(order['status'], -1)
+
+    def test_cancel_many_is_rate_limited(self):
+        exchange = Exchange()
+        exchange.add_account('key', 'secret')
+        transport = SimulatorTransport(exchange)
+        limiter = RateLimiter()
+        future = FutureApi('key', 'secret', session=transport,
+                           rate_limiter=limiter)
+        spot = SpotApi('key', 'secret', session=transport,
+                       rate_limiter=limiter)
+        future.cancel_many(list(range(1, 8)), 'btc_usd', 'quarter')
+        spot.cancel_many('ltc_btc', list(range(1, 5)))
+        stats = limiter.stats()
+        self.assertEqual(stats[('key', endpoint_of(
+            rest_api.future.cancel))]['acquired'], 3)
+        self.assertEqual(stats[('key', endpoint_of(
+            rest_api.spot.cancel_order))]['acquired'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :test_cache
+"""
+import time
+import asyncio
+import threading
+import unittest
+
+from okex_restful_api.api_utils import ResponseCache, rest_api
+
+INDEX = rest_api.future.index
+PARAMS = dict(symbol='btc_usd')
+
+
+class SlowFetch:
+
+    def __init__(self, value, delay=0.1):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.value
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def test_concurrent_requests_are_coalesced(self):
+        cache = ResponseCache()
+        fetch = SlowFetch(dict(future_index=8400.0))
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            cache.get(INDEX, PARAMS, fetch))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(fetch.calls, 1)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(r is results[0] for r in results))
+        stats = cache.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['coalesced'], 7)
+
+        cache.get(INDEX, PARAMS, fetch)
+        self.assertEqual(fetch.calls, 1)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_params_are_part_of_key(self):
+        cache = ResponseCache()
+        fetch = SlowFetch(dict(future_index=1.0), delay=0)
+        cache.get(INDEX, dict(symbol='btc_usd'), fetch)
+        cache.get(INDEX, dict(symbol='ltc_usd'), fetch)
+        self.assertEqual(fetch.calls, 2)
+
+    def test_expired_entry_is_fetched_again(self):
+        cache = ResponseCache(ttls={INDEX: 0.05})
+        fetch = SlowFetch(dict(future_index=1.0), delay=0)
+        cache.get(INDEX, PARAMS, fetch)
+        time.sleep(0.1)
+        cache.get(INDEX, PARAMS, fetch)
+        self.assertEqual(fetch.calls, 2)
+
+    def test_error_response_is_not_cached(self):
+        cache = ResponseCache()
+        fetch = SlowFetch(dict(result=False, error_code=20014), delay=0)
+        cache.get(INDEX, PARAMS, fetch)
+        cache.get(INDEX, PARAMS, fetch)
+        self.assertEqual(fetch.calls, 2)
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_exception_reaches_every_waiter(self):
+        cache = ResponseCache()
+        started = threading.Event()
+        errors = []
+
+        def fetch():
+            started.set()
+            time.sleep(0.1)
+            raise ConnectionError('down')
+
+        def call():
+            try:
+                cache.get(INDEX, PARAMS, fetch)
+            except ConnectionError as e:
+                errors.append(e)
+
+        owner = threading.Thread(target=call)
+        owner.start()
+        started.wait()
+        waiter = threading.Thread(target=call)
+        waiter.start()
+        owner.join()
+        waiter.join()
+        self.assertEqual(len(errors), 2)
+        self.assertEqual(cache.stats()['size'], 0)
+
+
+
+class AsyncSlowFetch(SlowFetch):
+
+    def __init__(self, value, delay=0.1):
+        super().__init__(value, delay)
+        self.started = threading.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        self.started.set()
+        await asyncio.sleep(self.delay)
+        return self.value
+
+
+class AsyncResponseCacheTest(unittest.TestCase):
+
+    def test_concurrent_requests_are_coalesced(self):
+        cache = ResponseCache()
+        fetch = AsyncSlowFetch(dict(future_index=8400.0))
+
+        async def main():
+            return await asyncio.gather(*[cache.get_async(INDEX, PARAMS,
+                                                          fetch)
+                                          for _ in range(8)])
+
+        results = asyncio.run(main())
+        self.assertEqual(fetch.calls, 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(cache.stats()['coalesced'], 7)
+
+    def test_loops_in_different_threads(self):
+        cache = ResponseCache()
+        fetch = AsyncSlowFetch(dict(future_index=8400.0), delay=0.2)
+        results = []
+        errors = []
+
+        def run():
+            try:
+                results.append(asyncio.run(cache.get_async(INDEX, PARAMS,
+                                                           fetch)))
+            except Exception as e:
+                errors.append(e)
+
+        owner = threading.Thread(target=run)
+        owner.start()
+        fetch.started.wait()
+        # 第一个请求还未完成, 另一个事件循环不能await它的Future
+        other = threading.Thread(target=run)
+        other.start()
+        owner.join()
+        other.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(results, [dict(future_index=8400.0)] * 2)
+        self.assertEqual(fetch.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :test_instrument
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from urllib.request import urlopen
+
+from okex_restful_api.api_utils import (Instrumentation, PrometheusExporter,
+                                        rest_api, endpoint_of)
+from okex_restful_api.api_utils.instrument import (LatencyHistogram,
+                                                   error_class)
+from okex_restful_api.future_api import FutureApi
+from okex_restful_api.simulator import Exchange, SimulatorTransport
+
+SYMBOL, CONTRACT = 'btc_usd', 'quarter'
+TICKER = endpoint_of(rest_api.future.ticker)
+USERINFO = endpoint_of(rest_api.future.userinfo)
+LOGGER = 'okex_restful_api.api_utils.instrument'
+
+
+class LatencyHistogramTest(unittest.TestCase):
+
+    def test_percentile(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.percentile(50), 0.0)
+        for ms in range(1, 101):
+            histogram.add(ms / 1000.0)
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.total, 5.05)
+        # 分桶上界误差不超过一档(x1.25)
+        self.assertGreaterEqual(histogram.percentile(50), 0.05)
+        self.assertLessEqual(histogram.percentile(50), 0.05 * 1.25)
+        self.assertEqual(histogram.percentile(100), 0.1)
+        self.assertLessEqual(histogram.percentile(99), histogram.max)
+
+    def test_error_class(self):
+        self.assertIsNone(error_class(None, dict(result=True)))
+        self.assertEqual(error_class(None, dict(error_code=20024)),
+                         'error_code_20024')
+        self.assertEqual(error_class(TimeoutError()), 'TimeoutError')
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def setUp(self):
+        exchange = Exchange()
+        exchange.add_account('key', 'secret')
+        self.transport = SimulatorTransport(exchange)
+        self.instrument = Instrumentation()
+        self.api = FutureApi('key', 'secret', session=self.transport,
+                             instrument=self.instrument)
+
+    def test_stats(self):
+        for _ in range(3):
+            self.api.ticker(SYMBOL, CONTRACT)
+        FutureApi('key', 'wrong', session=self.transport,
+                  instrument=self.instrument).userinfo()
+        self.instrument.retry(rest_api.future.userinfo, TimeoutError())
+        stats = self.instrument.stats()
+        self.assertEqual(stats[TICKER]['requests'], 3)
+        self.assertGreater(stats[TICKER]['bytes'], 0)
+        self.assertEqual(stats[TICKER]['errors'], {})
+        self.assertGreater(stats[TICKER]['p99'], 0)
+        self.assertEqual(stats[USERINFO]['errors'], {'error_code_20024': 1})
+        self.assertEqual(stats[USERINFO]['retries'], 1)
+
+    def test_hooks(self):
+        calls = []
+        self.instrument.add_pre_hook(lambda *args: calls.append(args))
+        self.instrument.add_post_hook(lambda *args: calls.append(args))
+        self.api.ticker(SYMBOL, CONTRACT)
+        (method, resource, params), post = calls
+        self.assertEqual((method, endpoint_of(resource)), ('GET', TICKER))
+        self.assertEqual(params['symbol'], SYMBOL)
+        self.assertEqual(post[:3], (method, resource, params))
+        result, error, elapsed = post[3:]
+        self.assertIn('ticker', result)
+        self.assertIsNone(error)
+        self.assertGreaterEqual(elapsed, 0)
+
+    def test_failing_hook_is_logged(self):
+        def broken(*args):
+            raise KeyError('hook')
+
+        self.instrument.add_pre_hook(broken)
+        self.instrument.add_post_hook(broken)
+        with self.assertLogs(LOGGER, 'ERROR') as logs:
+            resp = self.api.ticker(SYMBOL, CONTRACT)
+        self.assertIn('ticker', resp)
+        self.assertEqual(len(logs.records), 2)
+        self.assertIsNotNone(logs.records[0].exc_info)
+
+    def test_prometheus(self):
+        self.api.ticker(SYMBOL, CONTRACT)
+        FutureApi('key', 'wrong', session=self.transport,
+                  instrument=self.instrument).userinfo()
+        text = self.instrument.to_prometheus()
+        self.assertTrue(text.endswith('\n'))
+        self.assertIn('okex_requests_total{endpoint="%s"} 1' % TICKER, text)
+        self.assertIn('okex_errors_total{endpoint="%s",error='
+                      '"error_code_20024"} 1' % USERINFO, text)
+        self.assertIn('okex_request_latency_seconds_count{endpoint="%s"} 1'
+                      % TICKER, text)
+
+
+class PrometheusExporterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.instrument = Instrumentation()
+        self.instrument.after('GET', rest_api.future.ticker, {},
+                              0.0, dict(result=True), nbytes=10)
+
+    def test_file_and_port(self):
+        path = os.path.join(self.root, 'okex.prom')
+        exporter = PrometheusExporter(self.instrument, path=path, port=0)
+        self.addCleanup(exporter.close)
+        exporter.write()
+        with open(path) as f:
+            self.assertEqual(f.read(), self.instrument.to_prometheus())
+        with urlopen('http://127.0.0.1:%d/metrics' % exporter.port) as r:
+            self.assertEqual(r.read().decode('utf-8'),
+                             self.instrument.to_prometheus())
+
+    def test_write_error_is_logged(self):
+        path = os.path.join(self.root, 'missing', 'okex.prom')
+        with self.assertLogs(LOGGER, 'ERROR') as logs:
+            PrometheusExporter(self.instrument, path=path,
+                               interval=60).close()
+        self.assertIn(path, logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
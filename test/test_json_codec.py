@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :test_json_codec
+"""
+import os
+import sys
+import json
+import subprocess
+import unittest
+from unittest import mock
+
+from okex_restful_api.api_utils import json_codec
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BODY = b'{"ticker":{"last":"8400.1","vol":12},"date":"1522300000"}'
+
+
+def run(code, env=None, flags=()):
+    """
+    在新进程中运行, 避免影响本进程已选择的解码器
+    """
+    return subprocess.run([sys.executable] + list(flags) + ['-c', code],
+                          cwd=ROOT, env=dict(os.environ, **(env or {})),
+                          capture_output=True, text=True, check=True
+                          ).stdout.strip()
+
+
+class JsonCodecTest(unittest.TestCase):
+
+    def test_load_decoder(self):
+        self.assertIs(json_codec.load_decoder('json'), json.loads)
+        for name in json_codec.PREFERENCE:
+            try:
+                loads = json_codec.load_decoder(name)
+            except ImportError:
+                continue
+            self.assertEqual(loads(BODY), json.loads(BODY))
+
+    def test_unsupported_decoder_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            json_codec.load_decoder('simplejson')
+        # -O会去掉assert, 校验不能依赖assert
+        self.assertEqual(run(
+            'from okex_restful_api.api_utils import json_codec\n'
+            'try:\n'
+            '    json_codec.load_decoder("simplejson")\n'
+            'except ValueError:\n'
+            '    print("ValueError")', flags=['-O']), 'ValueError')
+
+    def test_pick_decoder_falls_back(self):
+        with mock.patch.dict(sys.modules, orjson=None, ujson=None):
+            self.assertEqual(json_codec.pick_decoder('ujson'),
+                             ('json', json.loads))
+            self.assertEqual(json_codec.pick_decoder(), ('json', json.loads))
+
+    def test_unknown_preferred_decoder_warns(self):
+        with self.assertWarns(RuntimeWarning):
+            name, loads = json_codec.pick_decoder('simplejson')
+        self.assertIn(name, json_codec.PREFERENCE)
+        self.assertEqual(loads(BODY), json.loads(BODY))
+
+    def test_environment_variable(self):
+        code = ('from okex_restful_api.api_utils import json_codec\n'
+                'json_codec.loads(b"{}")\n'
+                'print(json_codec.name)')
+        self.assertEqual(run(code, dict(OKEX_JSON_DECODER='json')), 'json')
+
+    def test_set_decoder(self):
+        original = json_codec.name
+        self.addCleanup(json_codec.set_decoder, original)
+        json_codec.set_decoder('json')
+        self.assertEqual(json_codec.name, 'json')
+        self.assertIs(json_codec.loads, json.loads)
+        with self.assertRaises(ValueError):
+            json_codec.set_decoder('simplejson')
+        self.assertEqual(json_codec.name, 'json')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :test_kline_store
+"""
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from okex_restful_api.kline_store import (KlineStore, KlineSync,
+                                          kline_array, COLUMNS)
+from okex_restful_api.pagination import PageError
+from okex_restful_api.future_api import FutureApi
+from okex_restful_api.spot_api import SpotApi
+from okex_restful_api.simulator import Exchange, SimulatorTransport
+
+MINUTE = 60000
+SPOT, FUTURE, CONTRACT = 'ltc_btc', 'btc_usd', 'quarter'
+
+
+def bars(start, n, coin_volume=False):
+    """
+    :return: 从start开始每分钟一根的K线, 价格为序号
+    """
+    out = []
+    for i in range(n):
+        bar = [start + i * MINUTE, i, i + 0.5, i - 0.5, i + 0.25, 10.0 + i]
+        if coin_volume:
+            bar.append(0.1 * i)
+        out.append(bar)
+    return out
+
+
+def closed_start(n):
+    """
+    :return: 到上一分钟为止共n根K线的起始时间戳
+    """
+    now = int(time.time() * 1000)
+    return now - now % MINUTE - n * MINUTE
+
+
+class FakeKlineApi:
+    """
+    按since升序返回最多size根K线, error_at为返回错误的请求序号
+    """
+
+    def __init__(self, data, error_at=None):
+        self.data = data
+        self.error_at = error_at
+        self.sinces = []
+
+    def kline(self, symbol, type, contract_type=None, size=0, since=0):
+        self.sinces.append(since)
+        if len(self.sinces) == self.error_at:
+            return dict(result=False, error_code=10002)
+        return [bar for bar in self.data if bar[0] >= since][:size]
+
+
+class StoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.store = KlineStore(self.root)
+
+    def test_round_trip(self):
+        data = bars(1000 * MINUTE, 5, coin_volume=True)
+        self.assertIsNone(self.store.last_timestamp(FUTURE, '1min',
+                                                    CONTRACT))
+        self.assertEqual(self.store.append(FUTURE, '1min', data, CONTRACT),
+                         5)
+        self.assertEqual(self.store.last_timestamp(FUTURE, '1min',
+                                                   CONTRACT),
+                         data[-1][0])
+        columns = self.store.read(FUTURE, '1min', CONTRACT)
+        self.assertEqual(set(columns), {'ts'} | set(COLUMNS))
+        self.assertIsInstance(columns['close'], np.memmap)
+        self.assertEqual(columns['ts'].dtype, np.dtype('<i8'))
+        np.testing.assert_array_equal(columns['ts'],
+                                      [bar[0] for bar in data])
+        np.testing.assert_array_equal(columns['coin_volume'],
+                                      [bar[6] for bar in data])
+        with self.assertRaises(ValueError):
+            columns['close'][0] = 1.0
+
+    def test_spot_has_no_coin_volume(self):
+        self.store.append(SPOT, '1min', bars(0, 3))
+        path = self.store.path(SPOT, '1min')
+        self.assertTrue(path.endswith(os.path.join(SPOT, 'spot', '1min')))
+        self.assertNotIn('coin_volume', self.store.read(SPOT, '1min'))
+
+    def test_append_drops_old_and_duplicate_bars(self):
+        data = bars(0, 4)
+        self.store.append(SPOT, '1min', data[:2])
+        # 乱序, 重复, 以及不晚于已存最后时间戳的K线都被丢弃
+        self.assertEqual(self.store.append(
+            SPOT, '1min', [data[3], data[1], data[2], data[3]]), 2)
+        self.assertEqual(self.store.append(SPOT, '1min', data), 0)
+        self.assertEqual(self.store.append(SPOT, '1min', []), 0)
+        columns = self.store.read(SPOT, '1min')
+        np.testing.assert_array_equal(columns['ts'],
+                                      [bar[0] for bar in data])
+        np.testing.assert_array_equal(columns['open'], [0, 1, 2, 3])
+
+    def test_interrupted_write_is_truncated(self):
+        self.store.append(SPOT, '1min', bars(0, 2))
+        # 模拟写入close之后, 写入ts之前中断
+        path = self.store.path(SPOT, '1min')
+        with open(os.path.join(path, 'close.bin'), 'ab') as f:
+            f.write(np.array([9.0], dtype='<f8').tobytes())
+        columns = self.store.read(SPOT, '1min')
+        self.assertEqual(len(columns['close']), 2)
+        self.assertEqual(len(columns['ts']), 2)
+
+
+class KlineArrayTest(unittest.TestCase):
+
+    def test_formats(self):
+        exchange = Exchange()
+        market = exchange.markets[(FUTURE, CONTRACT)]
+        market.bars.extend(bars(closed_start(3), 3, coin_volume=True))
+        spot_market = exchange.markets[(SPOT, None)]
+        spot_market.bars.extend(bars(closed_start(3), 3, coin_volume=True))
+        transport = SimulatorTransport(exchange)
+        raw = FutureApi('key', 'secret', session=transport).kline(
+            FUTURE, '1min', CONTRACT)
+        expected = np.array(raw, dtype=np.float64)
+        self.assertEqual(expected.shape, (3, 7))
+        for result_type in ('numpy', 'object'):
+            api = FutureApi('key', 'secret', session=transport,
+                            result_type=result_type)
+            np.testing.assert_array_equal(
+                kline_array(api.kline(FUTURE, '1min', CONTRACT)), expected)
+        # 币币K线只有6列
+        for result_type in (None, 'numpy', 'object'):
+            api = SpotApi('key', 'secret', session=transport,
+                          result_type=result_type)
+            self.assertEqual(kline_array(api.kline(SPOT, '1min')).shape,
+                             (3, 6))
+        self.assertEqual(kline_array([]).shape[0], 0)
+
+
+class SyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.store = KlineStore(self.root)
+
+    def test_pages_from_last_plus_one(self):
+        start = closed_start(25)
+        api = FakeKlineApi(bars(start, 25))
+        sync = KlineSync(self.store, spot_api=api, size=10)
+        self.assertEqual(sync.sync(SPOT, '1min', since=start), 25)
+        self.assertEqual(api.sinces, [start, start + 9 * MINUTE + 1,
+                                      start + 19 * MINUTE + 1,
+                                      start + 24 * MINUTE + 1])
+        self.assertEqual(sync.sync(SPOT, '1min'), 0)
+        self.assertEqual(len(self.store.read(SPOT, '1min')['ts']), 25)
+
+    def test_unclosed_bar_is_dropped(self):
+        start = closed_start(3)
+        # 最后一根是当前分钟, 还未走完
+        api = FakeKlineApi(bars(start, 4))
+        sync = KlineSync(self.store, future_api=api, size=10)
+        self.assertEqual(sync.sync(FUTURE, '1min', CONTRACT, since=start), 3)
+        self.assertEqual(self.store.last_timestamp(FUTURE, '1min',
+                                                   CONTRACT),
+                         start + 2 * MINUTE)
+
+    def test_error_page_resumes_from_cursor(self):
+        start = closed_start(25)
+        api = FakeKlineApi(bars(start, 25), error_at=2)
+        sync = KlineSync(self.store, spot_api=api, size=10)
+        with self.assertRaises(PageError) as ctx:
+            sync.sync(SPOT, '1min', since=start)
+        self.assertEqual(ctx.exception.cursor, start + 9 * MINUTE + 1)
+        self.assertEqual(ctx.exception.resp['error_code'], 10002)
+        # 之前的页已落盘, 再次调用从断点继续
+        self.assertEqual(len(self.store.read(SPOT, '1min')['ts']), 10)
+        self.assertEqual(sync.sync(SPOT, '1min', since=start), 15)
+        self.assertEqual(api.sinces[2], ctx.exception.cursor)
+
+    def test_simulator(self):
+        exchange = Exchange()
+        exchange.add_account('key', 'secret')
+        transport = SimulatorTransport(exchange)
+        start = closed_start(5)
+        exchange.markets[(SPOT, None)].bars.extend(
+            bars(start, 6, coin_volume=True))
+        sync = KlineSync(self.store,
+                         spot_api=SpotApi('key', 'secret',
+                                          session=transport))
+        self.assertEqual(sync.sync(SPOT, '1min', since=start), 5)
+        columns = self.store.read(SPOT, '1min')
+        self.assertEqual(columns['ts'][-1], start + 4 * MINUTE)
+        np.testing.assert_array_equal(columns['volume'],
+                                      [10, 11, 12, 13, 14])
+        self.assertEqual(sync.sync(SPOT, '1min'), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
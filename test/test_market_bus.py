@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :test_market_bus
+"""
+import math
+import unittest
+import multiprocessing
+
+import numpy as np
+
+from okex_restful_api.future_api import FutureApi
+from okex_restful_api.spot_api import SpotApi
+from okex_restful_api.market_bus import (MarketBus, MarketBusPublisher,
+                                         MarketBusReader)
+from okex_restful_api.simulator import Exchange, SimulatorTransport
+
+TICKERS = [('btc_usd', 'quarter'), ('ltc_btc', None)]
+DEPTHS = [('btc_usd', 'quarter')]
+
+
+def read_in_child(name, queue):
+    with MarketBusReader(name) as reader:
+        ticker = reader.ticker('btc_usd', 'quarter')
+        depth = reader.depth('btc_usd', 'quarter')
+        queue.put((float(ticker['last']), float(ticker['vol']),
+                   depth['asks'].tolist(), depth['bids'].tolist(),
+                   reader.version('depth', 'btc_usd', 'quarter')))
+
+
+class MarketBusTest(unittest.TestCase):
+
+    def setUp(self):
+        self.publisher = MarketBusPublisher(tickers=TICKERS, depths=DEPTHS,
+                                            levels=5)
+        self.reader = MarketBusReader(self.publisher.name)
+
+    def tearDown(self):
+        self.reader.close()
+        self.publisher.close()
+
+    def test_unpublished_slots(self):
+        self.assertEqual(sorted(self.reader.keys(), key=str),
+                         sorted(self.publisher.bus.keys(), key=str))
+        self.assertIsNone(self.reader.ticker('btc_usd', 'quarter'))
+        self.assertIsNone(self.reader.depth('btc_usd', 'quarter'))
+        self.assertEqual(self.reader.version('ticker', 'ltc_btc'), 0)
+
+    def test_publish_ticker(self):
+        resp = dict(date='1523000000', ticker=dict(
+            last=8400.0, buy=8399.9, sell=8400.1, high=8500, low=8300,
+            vol=0))
+        self.assertTrue(self.publisher.publish_ticker('btc_usd', 'quarter',
+                                                      resp))
+        ticker = self.reader.ticker('btc_usd', 'quarter')
+        self.assertEqual(ticker['last'], 8400.0)
+        # 0成交量不是缺失值
+        self.assertEqual(ticker['vol'], 0.0)
+        self.assertEqual(self.reader.version('ticker', 'btc_usd',
+                                             'quarter'), 1)
+
+    def test_missing_ticker_field_is_nan(self):
+        self.publisher.publish_ticker('ltc_btc', None, dict(
+            ticker=dict(last='0.018', buy='0.017999', sell='0.018001')))
+        ticker = self.reader.ticker('ltc_btc')
+        self.assertEqual(ticker['last'], 0.018)
+        self.assertTrue(math.isnan(ticker['vol']))
+
+    def test_error_is_not_published(self):
+        self.assertFalse(self.publisher.publish_ticker(
+            'btc_usd', 'quarter', dict(error_code=20014)))
+        self.assertFalse(self.publisher.publish_depth(
+            'btc_usd', 'quarter', None))
+        self.assertEqual(self.reader.version('ticker', 'btc_usd',
+                                             'quarter'), 0)
+
+    def test_publish_depth_truncates_to_levels(self):
+        asks = [[100 + i, 1] for i in range(8)][::-1]
+        bids = [[99 - i, 2] for i in range(3)]
+        self.publisher.publish_depth('btc_usd', 'quarter',
+                                     dict(asks=asks, bids=bids))
+        depth = self.reader.depth('btc_usd', 'quarter')
+        self.assertEqual(depth['asks'][:, 0].tolist(),
+                         [100, 101, 102, 103, 104])
+        self.assertEqual(depth['bids'][:, 0].tolist(), [99, 98, 97])
+
+    def test_view_is_zero_copy(self):
+        view = self.reader.view('ticker', 'ltc_btc')
+        self.publisher.publish_ticker('ltc_btc', None,
+                                      dict(ticker=dict(last=1.5)))
+        self.assertEqual(float(view['last']), 1.5)
+
+    def test_reader_in_another_process(self):
+        self.publisher.publish_ticker('btc_usd', 'quarter', dict(
+            ticker=dict(last=8400.0, vol=0.0)))
+        self.publisher.publish_depth('btc_usd', 'quarter', dict(
+            asks=[[8401, 1], [8400.1, 2]], bids=[[8399.9, 3]]))
+        context = multiprocessing.get_context('spawn')
+        queue = context.Queue()
+        child = context.Process(target=read_in_child,
+                                args=(self.publisher.name, queue))
+        child.start()
+        result = queue.get(timeout=30)
+        child.join(30)
+        self.assertEqual(child.exitcode, 0)
+        self.assertEqual(result, (8400.0, 0.0, [[8400.1, 2], [8401, 1]],
+                                  [[8399.9, 3]], 1))
+        # 读取进程退出后共享内存仍然存在
+        MarketBus.attach(self.publisher.name).close()
+
+
+class PublisherTest(unittest.TestCase):
+
+    def test_poll_once_in_every_result_type(self):
+        transport = SimulatorTransport(Exchange())
+        for result_type in (None, 'numpy', 'object'):
+            with MarketBusPublisher(
+                    FutureApi(session=transport, result_type=result_type),
+                    SpotApi(session=transport, result_type=result_type),
+                    TICKERS, DEPTHS, levels=5) as publisher, \
+                    MarketBusReader(publisher.name) as reader:
+                self.assertEqual(publisher.poll_once(), 3, result_type)
+                ticker = reader.ticker('btc_usd', 'quarter')
+                depth = reader.depth('btc_usd', 'quarter')
+                self.assertEqual(ticker['vol'], 0.0)
+                self.assertEqual(float(reader.ticker('ltc_btc')['last']),
+                                 0.018)
+                self.assertEqual(len(depth['asks']), 5)
+                self.assertTrue(np.all(np.diff(depth['asks'][:, 0]) > 0))
+                self.assertEqual(depth['asks'][0, 0], ticker['sell'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :test_models
+"""
+import time
+import threading
+import unittest
+
+from okex_restful_api.future_api import FutureApi
+from okex_restful_api.spot_api import SpotApi
+from okex_restful_api.models import (Model, Ticker, DepthBook, Trade, Kline,
+                                     Order, Position, DECODERS,
+                                     orders_objects, position_objects)
+from okex_restful_api.simulator import Exchange, SimulatorTransport
+
+SPOT_ORDER = dict(order_id=7, symbol='ltc_btc', type='buy', status=0,
+                  price=0.018, amount='1.5', deal_amount=0, avg_price=0,
+                  create_date=1523000000000)
+FUTURE_ORDER = dict(order_id=8, symbol='btc_usd', type=1, status=2,
+                    price=8400.1, amount=1, deal_amount=1,
+                    price_avg=8400.2, contract_name='BTC0629',
+                    lever_rate=10, fee=-0.0001, unit_amount=100,
+                    create_date=1523000000000)
+
+
+class ParserTest(unittest.TestCase):
+
+    def test_ticker_strings_become_floats(self):
+        ticker = Ticker.from_json(dict(date='1523000000', ticker=dict(
+            buy='0.017999', sell='0.018001', last='0.018', high='0.02',
+            low='0.01', vol='12.5')))
+        self.assertEqual(ticker.date, 1523000000)
+        self.assertEqual(ticker.sell, 0.018001)
+        self.assertEqual(ticker.vol, 12.5)
+        self.assertIsNone(ticker.contract_id)
+
+    def test_depth_levels_are_best_first(self):
+        book = DepthBook.from_json(dict(asks=[[103, 1], [102, '2']],
+                                        bids=[[99, 5], [100, 4]]))
+        self.assertEqual(book.asks, ((102.0, 2.0), (103.0, 1.0)))
+        self.assertEqual(book.bids, ((100.0, 4.0), (99.0, 5.0)))
+        self.assertEqual((book.best_ask, book.best_bid), (102, 100))
+        self.assertEqual((book.mid, book.spread), (101, 2))
+        empty = DepthBook.from_json(dict(asks=[], bids=[]))
+        self.assertIsNone(empty.best_ask)
+        self.assertIsNone(empty.mid)
+
+    def test_trade(self):
+        trade = Trade.from_json(dict(tid='5', date=1523000000,
+                                     date_ms=1523000000123, price='8400.5',
+                                     amount='0.1', type='sell'))
+        self.assertEqual((trade.tid, trade.price, trade.type),
+                         (5, 8400.5, 'sell'))
+
+    def test_kline_with_and_without_coin_volume(self):
+        future = Kline.from_json([1523000000000, 1, 2, 0.5, 1.5, 100, 0.07])
+        spot = Kline.from_json([1523000000000, '1', '2', '0.5', '1.5',
+                                '100'])
+        self.assertEqual(future.coin_volume, 0.07)
+        self.assertIsNone(spot.coin_volume)
+        self.assertEqual(spot.close, 1.5)
+
+    def test_order_avg_price(self):
+        spot = Order.from_json(SPOT_ORDER)
+        future = Order.from_json(FUTURE_ORDER)
+        self.assertEqual(spot.amount, 1.5)
+        self.assertEqual(spot.avg_price, 0)
+        self.assertEqual(future.avg_price, 8400.2)
+        self.assertEqual(future.type, 1)
+
+    def test_position(self):
+        holding = position_objects(dict(result=True, force_liqu_price='1',
+                                        holding=[dict(
+                                            symbol='btc_usd',
+                                            buy_amount='2', sell_amount=0,
+                                            buy_price_avg=8400)]))
+        position, = holding['holding']
+        self.assertIsInstance(position, Position)
+        self.assertEqual(holding['force_liqu_price'], '1')
+        self.assertEqual(position.buy_amount, 2.0)
+        self.assertIsNone(position.buy_bond)
+
+    def test_error_responses_pass_through(self):
+        error = dict(result=False, error_code=20015)
+        for name, decode in DECODERS.items():
+            self.assertIs(decode(error), error, name)
+        self.assertEqual(orders_objects(dict(result=True)),
+                         dict(result=True))
+
+
+class DictCompatTest(unittest.TestCase):
+
+    def setUp(self):
+        self.order = Order.from_json(SPOT_ORDER)
+
+    def test_item_access(self):
+        self.assertEqual(self.order['status'], 0)
+        with self.assertRaises(KeyError):
+            self.order['missing']
+
+    def test_get(self):
+        self.assertEqual(self.order.get('price'), 0.018)
+        self.assertEqual(self.order.get('fee', 'n/a'), 'n/a')
+        self.assertEqual(self.order.get('missing', 1), 1)
+
+    def test_keys_and_contains(self):
+        keys = self.order.keys()
+        self.assertIn('order_id', keys)
+        self.assertNotIn('fee', keys)
+        self.assertIn('price', self.order)
+        self.assertNotIn('fee', self.order)
+        self.assertNotIn('missing', self.order)
+
+    def test_dict(self):
+        as_dict = dict(self.order)
+        self.assertEqual(set(as_dict), set(self.order.keys()))
+        self.assertEqual(as_dict['amount'], 1.5)
+        self.assertEqual(dict(self.order, account='a')['account'], 'a')
+        self.assertEqual(len(self.order.to_dict()), len(Order.FIELDS))
+
+    def test_equality(self):
+        self.assertEqual(self.order, Order.from_json(dict(SPOT_ORDER)))
+        self.assertNotEqual(self.order, Order.from_json(FUTURE_ORDER))
+        with self.assertRaises(TypeError):
+            hash(self.order)
+
+    def test_concurrent_first_access(self):
+        started = threading.Event()
+
+        def slow(value):
+            started.set()
+            time.sleep(0.05)
+            return value
+
+        class Slow(Model):
+            FIELDS = (('a', 'a', slow), ('b', 'b', None))
+            __slots__ = ('a', 'b')
+
+        obj = Slow.from_json(dict(a=1, b=2))
+        first = threading.Thread(target=lambda: obj.a)
+        first.start()
+        started.wait()
+        # 第一个线程转换期间访问其他字段
+        self.assertEqual(obj.b, 2)
+        first.join()
+        self.assertEqual(obj.a, 1)
+
+
+class ObjectResultTest(unittest.TestCase):
+
+    def test_clients_return_objects(self):
+        exchange = Exchange()
+        exchange.add_account('key', 'secret')
+        transport = SimulatorTransport(exchange)
+        future = FutureApi('key', 'secret', session=transport,
+                           result_type='object')
+        ticker = future.ticker('btc_usd', 'quarter')
+        self.assertIsInstance(ticker, Ticker)
+        order_id = future.trade('btc_usd', 'quarter', ticker.sell, 1,
+                                1)['order_id']
+        order, = future.order_info('btc_usd', 'quarter', 1,
+                                   order_id)['orders']
+        self.assertIsInstance(order, Order)
+        self.assertEqual((order.status, order.avg_price), (2, ticker.sell))
+        position, = future.position('btc_usd', 'quarter')['holding']
+        self.assertEqual(position.buy_amount, 1)
+        self.assertIsInstance(future.depth('btc_usd', 'quarter', 5),
+                              DepthBook)
+
+        spot = SpotApi('key', 'secret', session=transport,
+                       result_type='object')
+        self.assertIsInstance(spot.ticker('ltc_btc').last, float)
+        bars = spot.kline('ltc_btc', '1min')
+        self.assertTrue(all(isinstance(b, Kline) for b in bars))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :test_order_batcher
+"""
+import unittest
+
+from okex_restful_api.api_utils import (Instrumentation, rest_api,
+                                        endpoint_of)
+from okex_restful_api.future_api import FutureApi
+from okex_restful_api.spot_api import SpotApi
+from okex_restful_api.order_batcher import (FutureOrderBatcher,
+                                            SpotOrderBatcher, _split)
+from okex_restful_api.simulator import Exchange, SimulatorTransport
+from okex_restful_api.simulator.server import Faults
+
+SPOT, FUTURE, CONTRACT = 'ltc_btc', 'btc_usd', 'quarter'
+
+
+class SplitTest(unittest.TestCase):
+
+    def test_order_info_is_split_in_order(self):
+        info = [dict(order_id=1), dict(order_id=-1, error_code=10010)]
+        self.assertEqual(_split(dict(result=True, order_info=info), 2),
+                         info)
+
+    def test_whole_failure_goes_to_every_order(self):
+        resp = dict(result=False, error_code=10007)
+        self.assertEqual(_split(resp, 3), [resp] * 3)
+        # 数量对不上时无法对应, 同样整体返回
+        resp = dict(result=True, order_info=[dict(order_id=1)])
+        self.assertEqual(_split(resp, 2), [resp] * 2)
+
+
+class BatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        exchange = Exchange()
+        exchange.add_account('key', 'secret')
+        self.transport = SimulatorTransport(exchange)
+        self.instrument = Instrumentation()
+        self.spot = SpotApi('key', 'secret', session=self.transport,
+                            instrument=self.instrument)
+        self.future = FutureApi('key', 'secret', session=self.transport,
+                                instrument=self.instrument)
+        self.spot_bid = float(self.spot.ticker(SPOT)['ticker']['buy'])
+        self.future_bid = self.future.ticker(FUTURE,
+                                             CONTRACT)['ticker']['buy']
+
+    def requests(self, resource):
+        stats = self.instrument.stats().get(endpoint_of(resource), {})
+        return stats.get('requests', 0)
+
+    def spot_price(self, i=0):
+        return round(self.spot_bid * (0.9 - 0.001 * i), 6)
+
+    def test_full_batches_are_sent_at_once(self):
+        with SpotOrderBatcher(self.spot, window=10) as batcher:
+            futures = [batcher.trade(SPOT, 'buy', self.spot_price(i), 1)
+                       for i in range(12)]
+            results = [f.result(timeout=2) for f in futures[:10]]
+            self.assertEqual(self.requests(rest_api.spot.batch_trade), 2)
+            # 剩下的2个不满一批, 等待window
+            self.assertFalse(futures[10].done())
+        # close时发送排队中的订单
+        results += [f.result() for f in futures[10:]]
+        self.assertEqual(self.requests(rest_api.spot.batch_trade), 3)
+        self.assertEqual(self.requests(rest_api.spot.trade), 0)
+        order_ids = [r['order_id'] for r in results]
+        self.assertEqual(len(set(order_ids)), 12)
+        orders = self.spot.order_info(SPOT, -1)['orders']
+        self.assertEqual(sorted(o['order_id'] for o in orders),
+                         sorted(order_ids))
+
+    def test_window_flushes_partial_batch(self):
+        with SpotOrderBatcher(self.spot, window=0.01) as batcher:
+            futures = [batcher.trade(SPOT, 'buy', self.spot_price(i), 1)
+                       for i in range(2)]
+            for future in futures:
+                self.assertGreater(future.result(timeout=2)['order_id'], 0)
+        self.assertEqual(self.requests(rest_api.spot.batch_trade), 1)
+
+    def test_single_order_uses_trade(self):
+        with SpotOrderBatcher(self.spot, window=0.01) as batcher:
+            resp = batcher.trade(SPOT, 'buy', self.spot_price(), 1).result()
+        self.assertTrue(resp['result'])
+        self.assertEqual(self.requests(rest_api.spot.trade), 1)
+        self.assertEqual(self.requests(rest_api.spot.batch_trade), 0)
+
+    def test_market_orders_are_not_batched(self):
+        with SpotOrderBatcher(self.spot, window=10) as batcher:
+            resp = batcher.trade(SPOT, 'buy_market', price=0.001).result(2)
+        self.assertTrue(resp['result'])
+        self.assertEqual(self.requests(rest_api.spot.batch_trade), 0)
+
+    def test_partial_failure(self):
+        with SpotOrderBatcher(self.spot, window=10) as batcher:
+            futures = [batcher.trade(SPOT, 'buy', self.spot_price(), 1),
+                       batcher.trade(SPOT, 'buy', self.spot_price(), 1e9),
+                       batcher.trade(SPOT, 'buy', self.spot_price(), 1)]
+        results = [f.result() for f in futures]
+        self.assertEqual(self.requests(rest_api.spot.batch_trade), 1)
+        self.assertGreater(results[0]['order_id'], 0)
+        self.assertEqual(results[1]['error_code'], 10010)
+        self.assertGreater(results[2]['order_id'], 0)
+
+    def test_whole_batch_failure(self):
+        api = SpotApi('key', 'wrong', session=self.transport)
+        with SpotOrderBatcher(api, window=10) as batcher:
+            futures = [batcher.trade(SPOT, 'buy', self.spot_price(), 1)
+                       for _ in range(2)]
+        for future in futures:
+            self.assertEqual(future.result()['error_code'], 10007)
+
+    def test_lost_response_goes_to_every_order(self):
+        self.transport.faults = Faults(disconnect_rate=1.0)
+        with SpotOrderBatcher(self.spot, window=10) as batcher:
+            futures = [batcher.trade(SPOT, 'buy', self.spot_price(), 1)
+                       for _ in range(3)]
+        # http_post失败时返回None
+        self.assertEqual([f.result() for f in futures], [None] * 3)
+
+    def test_exception_goes_to_every_order(self):
+        error = KeyError('x')
+
+        class Broken(SpotOrderBatcher):
+            def _send(self, key, orders):
+                raise error
+
+        with Broken(self.spot, window=10) as batcher:
+            futures = [batcher.trade(SPOT, 'buy', self.spot_price(), 1)
+                       for _ in range(3)]
+        for future in futures:
+            self.assertIs(future.exception(), error)
+
+    def test_future_groups_by_lever_rate(self):
+        price = round(self.future_bid * 0.98, 2)
+        with FutureOrderBatcher(self.future, window=10) as batcher:
+            futures = [batcher.trade(FUTURE, CONTRACT, price, 1, 1,
+                                     lever_rate=lever_rate)
+                       for lever_rate in (10, 20, 10, 20, 10)]
+        results = [f.result() for f in futures]
+        self.assertTrue(all(r['order_id'] > 0 for r in results))
+        self.assertEqual(self.requests(rest_api.future.batch_trade), 2)
+        orders = self.future.order_info(FUTURE, CONTRACT, 1,
+                                        page_length=50)['orders']
+        levers = sorted(o['lever_rate'] for o in orders)
+        self.assertEqual(levers, [10, 10, 10, 20, 20])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :test_order_book
+"""
+import unittest
+
+from okex_restful_api.future_api import FutureApi
+from okex_restful_api.order_book import OrderBook, LevelChange
+from okex_restful_api.simulator import Exchange, SimulatorTransport
+
+
+def depth(asks, bids):
+    return dict(asks=[list(i) for i in asks], bids=[list(i) for i in bids])
+
+
+class OrderBookTest(unittest.TestCase):
+
+    def setUp(self):
+        self.book = OrderBook()
+        # 接口返回的asks价格降序, 顺序不影响结果
+        self.first = self.book.update(depth([(103, 1), (102, 2), (101, 3)],
+                                            [(100, 4), (99, 5)]), date=1)
+
+    def test_snapshot(self):
+        self.assertEqual(len(self.first), 5)
+        self.assertTrue(all(c.kind == 'added' for c in self.first))
+        self.assertEqual(self.book.best_ask, (101, 3))
+        self.assertEqual(self.book.best_bid, (100, 4))
+        self.assertEqual(self.book.mid, 100.5)
+        self.assertEqual(self.book.spread, 1)
+        self.assertEqual(self.book.date, 1)
+        self.assertEqual(list(self.book.asks.prices), [101, 102, 103])
+        self.assertEqual(list(self.book.bids.prices), [100, 99])
+
+    def test_diff_is_ordered_best_first(self):
+        changes = self.book.update(depth([(102, 2), (101, 1), (100.5, 7)],
+                                         [(100, 4), (98, 6)]))
+        self.assertEqual(changes, [
+            LevelChange('bids', 99, 5, 0, 'removed'),
+            LevelChange('bids', 98, 0, 6, 'added'),
+            LevelChange('asks', 100.5, 0, 7, 'added'),
+            LevelChange('asks', 101, 3, 1, 'resized'),
+            LevelChange('asks', 103, 1, 0, 'removed')])
+        self.assertEqual(self.book.best_ask, (100.5, 7))
+        self.assertEqual(list(self.book.bids.prices), [100, 98])
+
+    def test_resize_only_keeps_levels(self):
+        keys = self.book.asks.keys
+        changes = self.book.update(depth([(101, 1), (102, 2), (103, 1)],
+                                         [(100, 4), (99, 5)]))
+        self.assertEqual(changes, [LevelChange('asks', 101, 3, 1,
+                                               'resized')])
+        self.assertIs(self.book.asks.keys, keys)
+        self.assertEqual(self.book.asks.cumulative_size(103), 4)
+
+    def test_unchanged_snapshot(self):
+        self.assertEqual(self.book.update(depth(
+            [(101, 3), (102, 2), (103, 1)], [(99, 5), (100, 4)])), [])
+
+    def test_queries(self):
+        asks, bids = self.book.asks, self.book.bids
+        self.assertEqual(asks.size_at(102), 2)
+        self.assertEqual(asks.size_at(101.5), 0)
+        self.assertEqual(asks.cumulative_size(102), 5)
+        self.assertEqual(asks.cumulative_size(100), 0)
+        self.assertEqual(bids.cumulative_size(99), 9)
+        self.assertEqual(asks.price_for_size(4), 102)
+        self.assertEqual(bids.price_for_size(4), 100)
+        self.assertIsNone(asks.price_for_size(7))
+
+    def test_error_response_keeps_book(self):
+        for resp in (None, dict(error_code=20014),
+                     dict(result=False, error_code=20014)):
+            self.assertEqual(self.book.update(resp, date=2), [])
+        self.assertEqual(self.book.best_ask, (101, 3))
+        self.assertEqual(self.book.date, 1)
+
+    def test_empty_side(self):
+        changes = self.book.update(depth([], [(100, 4), (99, 5)]))
+        self.assertEqual([c.kind for c in changes], ['removed'] * 3)
+        self.assertIsNone(self.book.best_ask)
+        self.assertIsNone(self.book.mid)
+        self.assertIsNone(self.book.spread)
+
+
+class SimulatedDepthTest(unittest.TestCase):
+
+    def test_raw_and_numpy_depth_agree(self):
+        transport = SimulatorTransport(Exchange())
+        books = []
+        for result_type in (None, 'numpy'):
+            api = FutureApi(session=transport, result_type=result_type)
+            book = OrderBook()
+            book.update(api.depth('btc_usd', 'quarter', 10))
+            books.append(book)
+        raw, arrays = books
+        self.assertEqual(len(raw.asks), 10)
+        self.assertEqual(raw.best_ask, arrays.best_ask)
+        self.assertEqual(list(raw.bids.prices), list(arrays.bids.prices))
+        self.assertLess(raw.best_bid[0], raw.best_ask[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :test_order_tracker
+"""
+import time
+import unittest
+
+from okex_restful_api.future_api import FutureApi
+from okex_restful_api.spot_api import SpotApi
+from okex_restful_api.order_tracker import (FutureOrderTracker,
+                                            SpotOrderTracker, CHUNK)
+from okex_restful_api.simulator import Exchange, SimulatorTransport
+
+SYMBOL, CONTRACT = 'btc_usd', 'quarter'
+
+
+def simulated():
+    exchange = Exchange()
+    exchange.add_account('key', 'secret')
+    return SimulatorTransport(exchange)
+
+
+class FutureOrderTrackerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.api = FutureApi('key', 'secret', session=simulated())
+        self.tracker = FutureOrderTracker(self.api)
+        self.changes = []
+        self.tracker.subscribe(lambda *change: self.changes.append(change))
+        ticker = self.api.ticker(SYMBOL, CONTRACT)['ticker']
+        self.buy, self.sell = ticker['buy'], ticker['sell']
+
+    def trade(self, price):
+        return str(self.api.trade(SYMBOL, CONTRACT, price, 1,
+                                  1)['order_id'])
+
+    def test_filled_order_is_removed(self):
+        order_id = self.trade(self.sell)
+        self.tracker.register(SYMBOL, CONTRACT, order_id)
+        self.assertEqual(len(self.tracker), 1)
+        self.assertEqual(self.tracker.poll_once(), 1)
+        (changed_id, old, new), = self.changes
+        self.assertEqual(changed_id, order_id)
+        self.assertIsNone(old)
+        self.assertEqual(new['status'], 2)
+        self.assertEqual(len(self.tracker), 0)
+        self.assertEqual(self.tracker.poll_once(), 0)
+
+    def test_open_order_until_cancelled(self):
+        order_id = self.trade(round(self.buy * 0.99, 2))
+        self.tracker.register(SYMBOL, CONTRACT, order_id)
+        self.assertEqual(self.tracker.poll_once(), 1)
+        # 状态没有变化时不再发布
+        self.assertEqual(self.tracker.poll_once(), 0)
+        self.assertEqual(len(self.tracker), 1)
+
+        self.api.cancel(order_id, SYMBOL, CONTRACT)
+        self.assertEqual(self.tracker.poll_once(), 1)
+        _, old, new = self.changes[-1]
+        self.assertEqual((old['status'], new['status']), (0, -1))
+        self.assertEqual(len(self.tracker), 0)
+
+    def test_more_than_one_chunk(self):
+        price = round(self.buy * 0.98, 2)
+        ids = [self.trade(price) for _ in range(CHUNK + 5)]
+        for order_id in ids:
+            self.tracker.register(SYMBOL, CONTRACT, order_id)
+        self.assertEqual(self.tracker.poll_once(), len(ids))
+        self.assertEqual(sorted(c[0] for c in self.changes), sorted(ids))
+
+    def test_unregister(self):
+        ids = [self.trade(round(self.buy * 0.99, 2)) for _ in range(2)]
+        for order_id in ids:
+            self.tracker.register(SYMBOL, CONTRACT, order_id)
+        self.tracker.unregister(SYMBOL, CONTRACT, ids[0])
+        self.tracker.unregister(SYMBOL, CONTRACT, 'unknown')
+        self.assertEqual(len(self.tracker), 1)
+        self.tracker.poll_once()
+        self.assertEqual([c[0] for c in self.changes], ids[1:])
+
+    def test_failing_callback_is_logged(self):
+        def broken(*change):
+            raise KeyError('callback')
+
+        tracker = FutureOrderTracker(self.api)
+        tracker.subscribe(broken)
+        tracker.subscribe(lambda *change: self.changes.append(change))
+        tracker.register(SYMBOL, CONTRACT, self.trade(self.sell))
+        with self.assertLogs('okex_restful_api.order_tracker', 'ERROR'):
+            self.assertEqual(tracker.poll_once(), 1)
+        self.assertEqual(len(self.changes), 1)
+
+
+class SpotOrderTrackerTest(unittest.TestCase):
+
+    def test_completed_order_found_in_history(self):
+        api = SpotApi('key', 'secret', session=simulated())
+        ticker = api.ticker('ltc_btc')['ticker']
+        filled = api.trade('ltc_btc', 'buy', price=ticker['sell'],
+                           amount=1)['order_id']
+        resting = api.trade('ltc_btc', 'buy',
+                            price=float(ticker['buy']) * 0.9,
+                            amount=1)['order_id']
+        tracker = SpotOrderTracker(api)
+        for order_id in (filled, resting):
+            tracker.register('ltc_btc', order_id)
+        self.assertEqual(tracker.poll_once(), 2)
+        self.assertEqual(len(tracker), 1)
+        tracker.unregister('ltc_btc', resting)
+        self.assertEqual(len(tracker), 0)
+
+
+class IntervalTest(unittest.TestCase):
+
+    def test_next_interval(self):
+        tracker = FutureOrderTracker(None, min_interval=0.5,
+                                     max_interval=2.0)
+        intervals = []
+        for changed in (0, 0, 0, 0, 3, 1, 1):
+            tracker.interval = tracker._next_interval(changed)
+            intervals.append(tracker.interval)
+        self.assertEqual(intervals, [0.75, 1.125, 1.6875, 2.0, 1.0, 0.5,
+                                     0.5])
+
+    def test_idle_tracker_relaxes(self):
+        api = FutureApi('key', 'secret', session=simulated())
+        tracker = FutureOrderTracker(api, min_interval=0.01,
+                                     max_interval=0.05)
+        tracker.start()
+        try:
+            time.sleep(0.3)
+        finally:
+            tracker.stop()
+        self.assertEqual(tracker.interval, 0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
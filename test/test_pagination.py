@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :test_pagination
+"""
+import asyncio
+import threading
+import unittest
+
+from okex_restful_api.pagination import (Pages, PageError, iter_pages,
+                                         aiter_pages)
+from okex_restful_api.api_utils import rest_api
+from okex_restful_api.api_utils.transport import Response
+from okex_restful_api.async_api import AsyncFutureApi
+from okex_restful_api.future_api import FutureApi
+from okex_restful_api.spot_api import SpotApi
+from okex_restful_api.simulator import Exchange, SimulatorTransport
+from okex_restful_api.simulator.server import AsyncSimulatorTransport
+
+SPOT, FUTURE, CONTRACT = 'ltc_btc', 'btc_usd', 'quarter'
+ERROR = dict(result=False, error_code=10002)
+
+
+def numbered(n, page_length, errors=(), fetched=None):
+    """
+    :return: Pages, 共n条, 页码从1开始; errors中的页返回错误
+    """
+    fetched = [] if fetched is None else fetched
+
+    def fetch(page):
+        fetched.append(page)
+        if page in errors:
+            return ERROR
+        start = (page - 1) * page_length
+        return dict(items=list(range(start, min(start + page_length, n))))
+
+    def advance(page, resp, items):
+        return None if len(items) < page_length else page + 1
+
+    return Pages(fetch, lambda page, resp: resp['items'], advance, 1)
+
+
+def async_pages(pages):
+    """
+    把fetch变为协程
+    """
+    async def fetch(cursor):
+        await asyncio.sleep(0)
+        return pages.fetch(cursor)
+
+    return pages._replace(fetch=fetch)
+
+
+async def collect(pages, prefetch):
+    return [item async for item in aiter_pages(pages, prefetch)]
+
+
+class IterPagesTest(unittest.TestCase):
+
+    def test_stops_on_short_page(self):
+        for prefetch in (False, True):
+            fetched = []
+            items = list(iter_pages(numbered(7, 3, fetched=fetched),
+                                    prefetch))
+            self.assertEqual(items, list(range(7)))
+            self.assertEqual(fetched, [1, 2, 3])
+
+    def test_empty_last_page(self):
+        for prefetch in (False, True):
+            fetched = []
+            items = list(iter_pages(numbered(6, 3, fetched=fetched),
+                                    prefetch))
+            self.assertEqual(items, list(range(6)))
+            self.assertEqual(fetched, [1, 2, 3])
+
+    def test_lazy_without_prefetch(self):
+        fetched = []
+        items = iter_pages(numbered(9, 3, fetched=fetched))
+        self.assertEqual(fetched, [])
+        self.assertEqual([next(items) for _ in range(3)], [0, 1, 2])
+        self.assertEqual(fetched, [1])
+
+    def test_prefetch_overlaps_consumer(self):
+        started = threading.Event()
+        pages = numbered(9, 3)
+
+        def fetch(page):
+            if page == 2:
+                started.set()
+            return pages.fetch(page)
+
+        items = iter_pages(pages._replace(fetch=fetch), prefetch=True)
+        self.assertEqual(next(items), 0)
+        # 还在消费第1页时第2页已经开始请求
+        self.assertTrue(started.wait(2))
+        self.assertEqual(list(items), list(range(1, 9)))
+
+    def test_error_page_stops(self):
+        for prefetch in (False, True):
+            fetched = []
+            items = []
+            with self.assertRaises(PageError) as ctx:
+                for item in iter_pages(numbered(30, 3, errors=(2,),
+                                                fetched=fetched), prefetch):
+                    items.append(item)
+            self.assertEqual(items, [0, 1, 2])
+            self.assertEqual(ctx.exception.cursor, 2)
+            self.assertIs(ctx.exception.resp, ERROR)
+            # 出错的页之后不再请求
+            self.assertEqual(fetched, [1, 2])
+
+    def test_fetch_exception_propagates(self):
+        def fetch(page):
+            raise KeyError(page)
+
+        pages = numbered(9, 3)._replace(fetch=fetch)
+        for prefetch in (False, True):
+            with self.assertRaises(KeyError):
+                list(iter_pages(pages, prefetch))
+
+
+class AiterPagesTest(unittest.TestCase):
+
+    def test_stops_on_short_page(self):
+        for prefetch in (False, True):
+            fetched = []
+            pages = async_pages(numbered(7, 3, fetched=fetched))
+            self.assertEqual(asyncio.run(collect(pages, prefetch)),
+                             list(range(7)))
+            self.assertEqual(fetched, [1, 2, 3])
+
+    def test_error_page_stops(self):
+        for prefetch in (False, True):
+            fetched = []
+            pages = async_pages(numbered(30, 3, errors=(2,),
+                                         fetched=fetched))
+            with self.assertRaises(PageError) as ctx:
+                asyncio.run(collect(pages, prefetch))
+            self.assertEqual(ctx.exception.cursor, 2)
+            self.assertEqual(fetched, [1, 2])
+
+    def test_prefetch_is_cancelled_on_close(self):
+        cancelled = []
+
+        async def fetch(page):
+            if page == 2:
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.append(page)
+                    raise
+            return dict(items=[page] * 3)
+
+        pages = Pages(fetch, lambda page, resp: resp['items'],
+                      lambda page, resp, items: page + 1, 1)
+
+        async def first():
+            items = aiter_pages(pages, prefetch=True)
+            item = await items.__anext__()
+            await asyncio.sleep(0)
+            await items.aclose()
+            await asyncio.sleep(0)
+            return item
+
+        self.assertEqual(asyncio.run(first()), 1)
+        self.assertEqual(cancelled, [2])
+
+
+class FailingSession:
+    """
+    第fail_at次请求resource时返回系统错误, 其余转给transport
+    """
+
+    def __init__(self, transport, resource, fail_at):
+        self.transport = transport
+        self.resource = resource
+        self.fail_at = fail_at
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        return self.transport.get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        if url == self.resource:
+            self.calls += 1
+            if self.calls == self.fail_at:
+                return Response(b'{"result":false,"error_code":10002}')
+        return self.transport.post(url, **kwargs)
+
+
+class SimulatorPagesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.exchange = Exchange()
+        self.exchange.add_account('key', 'secret')
+        self.transport = SimulatorTransport(self.exchange)
+
+    def test_order_history(self):
+        api = SpotApi('key', 'secret', session=self.transport)
+        bid = float(api.ticker(SPOT)['ticker']['buy'])
+        order_ids = [api.trade(SPOT, 'buy', price=round(bid * 0.9, 6),
+                               amount=1)['order_id'] for _ in range(7)]
+        for prefetch in (False, True):
+            orders = list(api.iter_order_history(SPOT, 0, page_length=3,
+                                                 prefetch=prefetch))
+            self.assertEqual(sorted(o['order_id'] for o in orders),
+                             sorted(order_ids))
+
+    def test_trades_history(self):
+        api = FutureApi('key', 'secret', session=self.transport)
+        price = round(api.ticker(FUTURE, CONTRACT)['ticker']['sell'] * 1.01,
+                      2)
+        for _ in range(120):
+            api.trade(FUTURE, CONTRACT, price, 1, 1)
+        date = self.exchange.markets[(FUTURE, CONTRACT)].delivery
+        trades = list(api.iter_trades_history(FUTURE, date, prefetch=True))
+        tids = [t['tid'] for t in trades]
+        # 超过一页(100条), 按tid递增且不重复
+        self.assertGreater(len(tids), 100)
+        self.assertEqual(tids, sorted(set(tids)))
+
+        async def fetch_all():
+            async_api = AsyncFutureApi(
+                'key', 'secret',
+                session=AsyncSimulatorTransport(self.exchange))
+            return [t['tid'] async for t in async_api.iter_trades_history(
+                FUTURE, date, prefetch=True)]
+
+        self.assertEqual(asyncio.run(fetch_all()), tids)
+
+    def test_error_page_with_prefetch(self):
+        session = FailingSession(self.transport, rest_api.spot.order_history,
+                                 fail_at=2)
+        api = SpotApi('key', 'secret', session=session)
+        bid = float(api.ticker(SPOT)['ticker']['buy'])
+        for _ in range(7):
+            api.trade(SPOT, 'buy', price=round(bid * 0.9, 6), amount=1)
+        with self.assertRaises(PageError) as ctx:
+            list(api.iter_order_history(SPOT, 0, page_length=3,
+                                        prefetch=True))
+        self.assertEqual(ctx.exception.cursor, 2)
+        self.assertEqual(session.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
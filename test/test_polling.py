@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :test_polling
+"""
+import time
+import unittest
+
+import numpy as np
+
+from okex_restful_api.future_api import FutureApi
+from okex_restful_api.models import Ticker
+from okex_restful_api.polling import PollingScheduler, default_fingerprint
+from okex_restful_api.simulator import Exchange, SimulatorTransport
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeApi:
+    """
+    ticker按responses依次返回, 用完后重复最后一个
+    """
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def ticker(self, symbol):
+        self.calls += 1
+        resp = self.responses[min(self.calls, len(self.responses)) - 1]
+        if isinstance(resp, Exception):
+            raise resp
+        return resp
+
+
+def ticker(last, date=1):
+    return dict(date=date, ticker=dict(last=last))
+
+
+class FingerprintTest(unittest.TestCase):
+
+    def test_date_is_ignored(self):
+        self.assertEqual(default_fingerprint(ticker(1, date=1)),
+                         default_fingerprint(ticker(1, date=2)))
+        self.assertNotEqual(default_fingerprint(ticker(1)),
+                            default_fingerprint(ticker(2)))
+
+    def test_numpy_arrays(self):
+        a = dict(asks=np.array([[1.0, 2.0]]), bids=np.array([[0.5, 1.0]]))
+        b = dict(asks=np.array([[1.0, 2.0]]), bids=np.array([[0.5, 1.0]]))
+        c = dict(asks=np.array([[1.0, 3.0]]), bids=np.array([[0.5, 1.0]]))
+        self.assertTrue(default_fingerprint(a) == default_fingerprint(b))
+        self.assertFalse(default_fingerprint(a) == default_fingerprint(c))
+        self.assertTrue(default_fingerprint(np.arange(3)) ==
+                        default_fingerprint(np.arange(3)))
+
+    def test_objects(self):
+        first = Ticker.from_json(ticker(8400, date=1))
+        second = Ticker.from_json(ticker(8400, date=2))
+        self.assertEqual(default_fingerprint(first),
+                         default_fingerprint(second))
+
+
+class SchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.scheduler = PollingScheduler(clock=self.clock)
+        self.seen = []
+
+    def callback(self, key, resp):
+        self.seen.append(resp)
+
+    def advance(self, seconds):
+        self.clock.now += seconds
+        return self.scheduler.run_once()
+
+    def test_subscriptions_are_merged(self):
+        api = FakeApi(ticker(1))
+        other = []
+        key = self.scheduler.subscribe(api.ticker, 'btc_usd', interval=2,
+                                       callback=self.callback)
+        self.assertEqual(self.scheduler.subscribe(
+            api.ticker, 'btc_usd', interval=1,
+            callback=lambda k, r: other.append(r)), key)
+        # 参数不同的订阅不合并, 这里不会到期
+        self.scheduler.subscribe(api.ticker, 'ltc_usd', interval=100)
+        self.assertEqual(len(self.scheduler), 2)
+        stats = self.scheduler.stats()[key]
+        self.assertEqual((stats['target'], stats['interval'],
+                          stats['subscribers']), (1, 1, 2))
+        self.assertEqual(self.advance(2), 1)
+        self.assertEqual(api.calls, 1)
+        self.assertEqual(len(self.seen), 1)
+        self.assertEqual(len(other), 1)
+
+    def test_unsubscribe(self):
+        api = FakeApi(ticker(1), ticker(2), ticker(3))
+        key = self.scheduler.subscribe(api.ticker, 'btc_usd', interval=1,
+                                       callback=self.callback)
+        self.scheduler.subscribe(api.ticker, 'btc_usd', interval=1,
+                                 callback=print)
+        self.scheduler.unsubscribe(key, print)
+        self.assertEqual(self.scheduler.stats()[key]['subscribers'], 1)
+        self.advance(1)
+        self.scheduler.unsubscribe(key, self.callback)
+        self.assertEqual(len(self.scheduler), 0)
+        self.assertEqual(self.advance(10), 0)
+        self.assertEqual(api.calls, 1)
+
+    def test_not_due_yet(self):
+        api = FakeApi(ticker(1))
+        self.scheduler.subscribe(api.ticker, 'btc_usd', interval=10)
+        self.assertEqual(self.scheduler.run_once(), 0)
+        self.assertEqual(self.advance(10), 1)
+        self.assertEqual(self.scheduler.run_once(), 0)
+
+    def test_callback_only_on_change(self):
+        api = FakeApi(ticker(1, 1), ticker(1, 2), ticker(2, 3))
+        key = self.scheduler.subscribe(api.ticker, 'btc_usd', interval=1,
+                                       callback=self.callback,
+                                       max_interval=1)
+        for _ in range(3):
+            self.advance(1)
+        self.assertEqual([r['ticker']['last'] for r in self.seen], [1, 2])
+        stats = self.scheduler.stats()[key]
+        self.assertEqual((stats['polls'], stats['changes']), (3, 2))
+
+    def test_interval_relaxes_and_returns_to_target(self):
+        api = FakeApi(ticker(1))
+        key = self.scheduler.subscribe(api.ticker, 'btc_usd', interval=1,
+                                       max_interval=4)
+        intervals = []
+        for _ in range(10):
+            self.advance(self.scheduler.stats()[key]['interval'])
+            intervals.append(self.scheduler.stats()[key]['interval'])
+        # 第一次响应算作变化, 之后不变时逐步放宽到max_interval
+        self.assertEqual(intervals[0], 0.8)
+        self.assertEqual(intervals[-1], 4)
+        self.assertEqual(intervals, sorted(intervals))
+
+        api.responses.append(ticker(2))
+        self.advance(4)
+        self.assertEqual(self.scheduler.stats()[key]['interval'], 1)
+        api.responses.append(ticker(3))
+        self.advance(1)
+        self.assertEqual(self.scheduler.stats()[key]['interval'], 0.8)
+
+    def test_errors_back_off(self):
+        api = FakeApi(ConnectionError('down'), dict(error_code=20014),
+                      ticker(1))
+        key = self.scheduler.subscribe(api.ticker, 'btc_usd', interval=1,
+                                       callback=self.callback)
+        with self.assertLogs('okex_restful_api.polling', 'ERROR'):
+            self.advance(1)
+        self.advance(2)
+        stats = self.scheduler.stats()[key]
+        self.assertEqual((stats['errors'], stats['interval']), (2, 1.5625))
+        self.assertEqual(self.seen, [])
+        self.advance(2)
+        self.assertEqual(len(self.seen), 1)
+
+    def test_failing_callback_is_logged(self):
+        api = FakeApi(ticker(1))
+
+        def broken(key, resp):
+            raise KeyError(key)
+
+        self.scheduler.subscribe(api.ticker, 'btc_usd', interval=1,
+                                 callback=broken)
+        self.scheduler.subscribe(api.ticker, 'btc_usd', interval=1,
+                                 callback=self.callback)
+        with self.assertLogs('okex_restful_api.polling', 'ERROR'):
+            self.advance(1)
+        self.assertEqual(self.seen, [ticker(1)])
+
+    def test_rate_paces_requests(self):
+        # tighten=1使每个订阅在本轮只执行一次
+        scheduler = PollingScheduler(rate=50, tighten=1, clock=self.clock)
+        api = FakeApi(ticker(1))
+        for i in range(6):
+            scheduler.subscribe(api.ticker, 'sym%d' % i, interval=1)
+        self.clock.now += 1
+        start = time.monotonic()
+        self.assertEqual(scheduler.run_once(), 6)
+        # 第一个请求使用初始令牌, 之后每个间隔1/50秒
+        self.assertGreater(time.monotonic() - start, 0.08)
+
+
+class NumpyPollingTest(unittest.TestCase):
+
+    def test_numpy_depth(self):
+        api = FutureApi(session=SimulatorTransport(Exchange()),
+                        result_type='numpy')
+        clock = Clock()
+        scheduler = PollingScheduler(clock=clock)
+        seen = []
+        scheduler.subscribe(api.depth, 'btc_usd', 'quarter', 5,
+                            interval=1, callback=lambda k, r: seen.append(r))
+        for _ in range(3):
+            clock.now += 1
+            scheduler.run_once()
+        # 盘口没有变化时只在第一次回调
+        self.assertEqual(len(seen), 1)
+        self.assertEqual(seen[0]['asks'].shape, (5, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :test_rate_limit
+"""
+import time
+import asyncio
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from okex_restful_api.api_utils import (TokenBucket, RateLimiter, rest_api,
+                                        endpoint_of)
+
+SPOT_TRADE = rest_api.spot.trade
+TICKER = rest_api.future.ticker
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        # 预约排队: 第3个等0.1秒, 第4个等0.2秒
+        self.assertAlmostEqual(bucket.reserve(), 0.1, places=2)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, places=2)
+        stats = bucket.stats()
+        self.assertEqual((stats['acquired'], stats['waited']), (4, 2))
+        self.assertAlmostEqual(stats['wait_time'], 0.3, places=2)
+        self.assertAlmostEqual(stats['max_wait'], 0.2, places=2)
+
+    def test_refill_is_capped(self):
+        bucket = TokenBucket(rate=100, capacity=2)
+        time.sleep(0.05)
+        waits = [bucket.reserve() for _ in range(3)]
+        self.assertEqual(waits[:2], [0, 0])
+        self.assertGreater(waits[2], 0)
+
+    def test_from_limit(self):
+        bucket = TokenBucket.from_limit(20, 2)
+        self.assertEqual((bucket.rate, bucket.capacity), (10.0, 20.0))
+
+    def test_acquire_sleeps(self):
+        bucket = TokenBucket(rate=20, capacity=1)
+        bucket.acquire()
+        start = time.monotonic()
+        wait = bucket.acquire()
+        self.assertGreater(wait, 0)
+        self.assertGreaterEqual(time.monotonic() - start, wait * 0.9)
+
+    def test_acquire_async(self):
+        bucket = TokenBucket(rate=20, capacity=1)
+
+        async def acquire():
+            start = time.monotonic()
+            waits = [await bucket.acquire_async() for _ in range(3)]
+            return waits, time.monotonic() - start
+
+        waits, elapsed = asyncio.run(acquire())
+        self.assertEqual(waits[0], 0)
+        self.assertGreater(elapsed, 0.09)
+
+    def test_concurrent_reservations_are_spaced(self):
+        bucket = TokenBucket(rate=50, capacity=5)
+        with ThreadPoolExecutor(8) as executor:
+            waits = sorted(executor.map(lambda _: bucket.reserve(),
+                                        range(20)))
+        self.assertEqual(waits[:5], [0] * 5)
+        # 超出容量的15个按1/50秒依次排开
+        self.assertAlmostEqual(waits[-1], 15 / 50.0, places=2)
+        self.assertEqual(len(set(round(w, 3) for w in waits[5:])), 15)
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def test_default_limits(self):
+        limiter = RateLimiter()
+        self.assertEqual(limiter.limits[endpoint_of(SPOT_TRADE)], (20, 2))
+        self.assertIn(endpoint_of(rest_api.spot.cancel_order),
+                      limiter.limits)
+        self.assertIn(endpoint_of(rest_api.future.cancel), limiter.limits)
+
+    def test_unlimited_endpoint(self):
+        limiter = RateLimiter()
+        self.assertIsNone(limiter.bucket('key', TICKER))
+        self.assertEqual([limiter.reserve('key', TICKER)
+                          for _ in range(100)], [0.0] * 100)
+        self.assertEqual(limiter.stats(), {})
+
+    def test_keys_are_limited_separately(self):
+        limiter = RateLimiter(limits={SPOT_TRADE: (2, 1)})
+        self.assertEqual(limiter.limits[endpoint_of(SPOT_TRADE)], (2, 1))
+        for _ in range(2):
+            self.assertEqual(limiter.reserve('a', SPOT_TRADE), 0)
+        self.assertGreater(limiter.reserve('a', SPOT_TRADE), 0)
+        self.assertEqual(limiter.reserve('b', SPOT_TRADE), 0)
+        stats = limiter.stats()
+        path = endpoint_of(SPOT_TRADE)
+        self.assertEqual(stats[('a', path)]['waited'], 1)
+        self.assertEqual(stats[('b', path)]['waited'], 0)
+
+    def test_limit_follows_domain(self):
+        limiter = RateLimiter(limits={TICKER: (1, 10)})
+        self.assertIs(limiter.bucket('key', TICKER),
+                      limiter.bucket('key', 'http://127.0.0.1:8000'
+                                            + endpoint_of(TICKER)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :test_retry
+"""
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from okex_restful_api.api_utils import (Retrier, RetryPolicy, RateLimiter,
+                                        DeadlineExceeded, http_post,
+                                        rest_api)
+from okex_restful_api.api_utils.retry import remaining
+from okex_restful_api.api_utils.transport import Response
+from okex_restful_api.spot_api import SpotApi
+
+TICKER = rest_api.future.ticker
+USERINFO = rest_api.future.userinfo
+TRADE = rest_api.future.trade
+SPOT_TRADE = rest_api.spot.trade
+
+
+def fast(**kwargs):
+    return RetryPolicy(base_delay=0, jitter=0, **kwargs)
+
+
+class Flaky:
+    """
+    前failures次抛出error, 之后返回ok
+    """
+
+    def __init__(self, error, failures):
+        self.error = error
+        self.failures = failures
+        self.calls = 0
+        self.deadlines = []
+
+    def __call__(self, deadline):
+        self.calls += 1
+        self.deadlines.append(deadline)
+        if self.calls <= self.failures:
+            raise self.error
+        return 'ok'
+
+
+class RetrierTest(unittest.TestCase):
+
+    def test_categories(self):
+        retrier = Retrier()
+        self.assertEqual(retrier.category('GET', TICKER), 'public')
+        self.assertEqual(retrier.category('POST', USERINFO), 'signed')
+        self.assertEqual(retrier.category('POST', TRADE), 'mutating')
+
+    def test_public_retries_transient_errors(self):
+        retrier = Retrier(policies=dict(public=fast(attempts=3)))
+        send = Flaky(requests.exceptions.ConnectionError(), 2)
+        self.assertEqual(retrier.call('GET', TICKER, send), 'ok')
+        self.assertEqual(send.calls, 3)
+        self.assertEqual(retrier.stats()['retries'], 2)
+
+    def test_gives_up_after_attempts(self):
+        retrier = Retrier(policies=dict(signed=fast(attempts=2)))
+        send = Flaky(requests.exceptions.ReadTimeout(), 5)
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            retrier.call('POST', USERINFO, send)
+        self.assertEqual(send.calls, 2)
+
+    def test_non_transient_error_is_not_retried(self):
+        retrier = Retrier(policies=dict(public=fast(attempts=5)))
+        send = Flaky(KeyError('x'), 1)
+        with self.assertRaises(KeyError):
+            retrier.call('GET', TICKER, send)
+        self.assertEqual(send.calls, 1)
+
+    def test_mutating_is_not_replayed_after_send(self):
+        retrier = Retrier(policies=dict(mutating=fast(attempts=3,
+                                                      idempotent=False)))
+        # 读超时时请求可能已经到达交易所, 不能重发下单
+        send = Flaky(requests.exceptions.ReadTimeout(), 1)
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            retrier.call('POST', TRADE, send)
+        self.assertEqual(send.calls, 1)
+
+    def test_mutating_retries_when_unsent(self):
+        retrier = Retrier(policies=dict(mutating=fast(attempts=3,
+                                                      idempotent=False)))
+        send = Flaky(requests.exceptions.ConnectTimeout(), 1)
+        self.assertEqual(retrier.call('POST', TRADE, send), 'ok')
+        self.assertEqual(send.calls, 2)
+
+    def test_deadline_is_passed_to_send(self):
+        retrier = Retrier(policies=dict(public=fast(deadline=2.0)))
+        send = Flaky(None, 0)
+        start = time.monotonic()
+        retrier.call('GET', TICKER, send)
+        deadline = send.deadlines[0]
+        self.assertGreater(deadline, start)
+        self.assertLessEqual(deadline, time.monotonic() + 2.0)
+
+    def test_no_retry_past_deadline(self):
+        retrier = Retrier(policies=dict(public=RetryPolicy(
+            attempts=10, base_delay=1.0, jitter=0, deadline=0.5)))
+        send = Flaky(requests.exceptions.ConnectionError(), 10)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            retrier.call('GET', TICKER, send)
+        self.assertEqual(send.calls, 1)
+
+
+class TimeoutSession:
+    """
+    记录每次请求的timeout, 立即返回成功
+    """
+
+    def __init__(self):
+        self.timeouts = []
+
+    def post(self, url, params=None, headers=None, timeout=None):
+        self.timeouts.append(timeout)
+        return Response(b'{"result":true,"order_id":1}')
+
+
+class ThrottleDeadlineTest(unittest.TestCase):
+
+    def test_expired_deadline_is_not_sent(self):
+        self.assertIsNone(remaining(None))
+        with self.assertRaises(DeadlineExceeded):
+            remaining(time.monotonic() - 0.001)
+
+    def test_throttle_wait_is_not_counted(self):
+        retrier = Retrier(policies=dict(mutating=fast(deadline=0.2,
+                                                      idempotent=False)))
+        session = TimeoutSession()
+        resp = http_post(TRADE, dict(symbol='btc_usd'), session,
+                         retrier=retrier, throttle=lambda: 0.3)
+        self.assertEqual(resp['order_id'], 1)
+        self.assertGreater(session.timeouts[0], 0.15)
+
+    def test_rate_limited_orders_keep_their_timeout(self):
+        # 2次/0.2秒, 8个并发下单最多排队0.8秒, 远超0.1秒的deadline
+        retrier = Retrier(policies=dict(mutating=fast(deadline=0.1,
+                                                      idempotent=False)))
+        limiter = RateLimiter(limits={SPOT_TRADE: (2, 0.2)})
+        session = TimeoutSession()
+        api = SpotApi('key', 'secret', session=session, retrier=retrier,
+                      rate_limiter=limiter)
+        with ThreadPoolExecutor(8) as executor:
+            resps = list(executor.map(
+                lambda _: api.trade('ltc_btc', 'buy', price=1, amount=1),
+                range(8)))
+        self.assertTrue(all(r['result'] for r in resps))
+        self.assertEqual(len(session.timeouts), 8)
+        self.assertGreater(min(session.timeouts), 0.05)
+
+    def test_hedge_is_throttled(self):
+        retrier = Retrier(policies=dict(public=RetryPolicy(
+            hedge=True, hedge_min_samples=1)))
+        calls = []
+        retrier.call('GET', TICKER, lambda deadline: 'ok')
+
+        def slow(deadline):
+            calls.append(deadline)
+            if len(calls) == 1:
+                time.sleep(0.2)
+            return 'ok'
+
+        self.assertEqual(retrier.call('GET', TICKER, slow,
+                                      throttle=lambda: 0.01), 'ok')
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(retrier.stats()['hedges'], 1)
+        self.assertGreater(calls[1], calls[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
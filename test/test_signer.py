@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :test_signer
+"""
+import unittest
+
+from okex_restful_api.api_utils import (Signer, build_my_sign,
+                                        build_api_sign)
+
+API_KEY = 'a1b2c3d4-e5f6'
+SECRET_KEY = 'SECRET+/ key'
+
+
+class SignerTest(unittest.TestCase):
+
+    def test_sign_matches_build_my_sign(self):
+        signer = Signer(API_KEY, SECRET_KEY)
+        for params in (dict(api_key=API_KEY),
+                       dict(api_key=API_KEY, symbol='btc_usd',
+                            contract_type='quarter', price=8400.1, amount=1,
+                            type=1, match_price=0, lever_rate=10),
+                       dict(api_key=API_KEY, orders_data='[{price:3,'
+                            'amount:5,type:"sell"}]', symbol='ltc_btc'),
+                       dict(api_key=API_KEY, chargefee=0.0001,
+                            trade_pwd='中文 &=?', withdraw_address='1Ab')):
+            self.assertEqual(signer.sign(params),
+                             build_my_sign(params, SECRET_KEY))
+
+    def test_layout_cache_ignores_insertion_order(self):
+        signer = Signer(API_KEY, SECRET_KEY)
+        a = dict(api_key=API_KEY, symbol='btc_usd', order_id='1,2')
+        b = dict(order_id='1,2', symbol='btc_usd', api_key=API_KEY)
+        self.assertEqual(signer.sign(a), signer.sign(b))
+        self.assertEqual(signer.sign(b), build_my_sign(b, SECRET_KEY))
+
+    def test_api_sign(self):
+        signer = Signer(API_KEY, SECRET_KEY)
+        self.assertEqual(signer.api_sign(),
+                         build_api_sign(API_KEY, SECRET_KEY))
+
+    def test_sign_params_adds_sign(self):
+        params = dict(api_key=API_KEY, symbol='btc_usd')
+        expected = build_my_sign(params, SECRET_KEY)
+        signed = Signer(API_KEY, SECRET_KEY).sign_params(params)
+        self.assertIs(signed, params)
+        self.assertEqual(signed['sign'], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :test_simulator
+"""
+import unittest
+
+from okex_restful_api.future_api import FutureApi
+from okex_restful_api.spot_api import SpotApi
+from okex_restful_api.simulator import Exchange, SimulatorTransport
+
+SYMBOL, CONTRACT = 'btc_usd', 'quarter'
+
+
+def simulated():
+    exchange = Exchange()
+    exchange.add_account('key', 'secret')
+    return SimulatorTransport(exchange)
+
+
+class FutureRoundTripTest(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = simulated()
+        self.api = FutureApi('key', 'secret', session=self.transport)
+
+    def test_market_order_fills_and_opens_position(self):
+        ticker = self.api.ticker(SYMBOL, CONTRACT)['ticker']
+        self.assertLess(ticker['buy'], ticker['sell'])
+        resp = self.api.trade(SYMBOL, CONTRACT, ticker['sell'], 1, 1)
+        self.assertTrue(resp['result'])
+        order = self.api.order_info(SYMBOL, CONTRACT, 1,
+                                    resp['order_id'])['orders'][0]
+        self.assertEqual(order['status'], 2)
+        self.assertEqual(order['deal_amount'], 1)
+        holding = self.api.position(SYMBOL, CONTRACT)['holding'][0]
+        self.assertEqual(holding['buy_amount'], 1)
+
+    def test_resting_order_can_be_cancelled(self):
+        buy = self.api.ticker(SYMBOL, CONTRACT)['ticker']['buy']
+        resp = self.api.trade(SYMBOL, CONTRACT, round(buy * 0.99, 2), 1, 1)
+        order_id = resp['order_id']
+        order = self.api.order_info(SYMBOL, CONTRACT, 1,
+                                    order_id)['orders'][0]
+        self.assertEqual(order['status'], 0)
+        self.assertTrue(self.api.cancel(order_id, SYMBOL,
+                                        CONTRACT)['result'])
+        order = self.api.order_info(SYMBOL, CONTRACT, 1,
+                                    order_id)['orders'][0]
+        self.assertEqual(order['status'], -1)
+
+    def test_bad_signature_is_rejected(self):
+        api = FutureApi('key', 'wrong', session=self.transport)
+        resp = api.userinfo()
+        self.assertEqual(resp['error_code'], 20024)
+
+
+class SpotRoundTripTest(unittest.TestCase):
+
+    def test_buy_moves_balance(self):
+        api = SpotApi('key', 'secret', session=simulated())
+        sell = float(api.ticker('ltc_btc')['ticker']['sell'])
+        before = api.userinfo()['info']['funds']['free']
+        resp = api.trade('ltc_btc', 'buy', price=sell, amount=1)
+        self.assertTrue(resp['result'])
+        after = api.userinfo()['info']['funds']['free']
+        self.assertAlmostEqual(float(after['ltc']) - float(before['ltc']), 1)
+        self.assertLess(float(after['btc']), float(before['btc']))
+
+
+if __name__ == '__main__':
+    unittest.main()
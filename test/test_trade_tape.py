@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :test_trade_tape
+"""
+import unittest
+
+import numpy as np
+
+from okex_restful_api.future_api import FutureApi
+from okex_restful_api.spot_api import SpotApi
+from okex_restful_api.trade_tape import (TradeTape, Bar, SPOT_PAGE,
+                                         SpotTradeCollector,
+                                         FutureTradeCollector)
+from okex_restful_api.simulator import Exchange, SimulatorTransport
+
+T0 = 1523000000000
+
+
+class Clock:
+
+    def __init__(self, ms=T0):
+        self.ms = ms
+
+    def __call__(self):
+        return self.ms / 1000
+
+
+def trade(tid, ms, price=10.0, amount=1.0, type='buy'):
+    return dict(tid=tid, date=ms // 1000, date_ms=ms, price=price,
+                amount=amount, type=type)
+
+
+class TradeTapeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.tape = TradeTape(capacity=5, window=10, bar_seconds=60,
+                              clock=self.clock)
+
+    def test_dedupe_by_tid(self):
+        self.assertEqual(self.tape.extend([trade(2, T0), trade(1, T0)]), 2)
+        self.assertEqual(self.tape.extend([trade(2, T0), trade(3, T0)]), 1)
+        self.assertEqual(self.tape.last_tid, 3)
+        self.assertEqual(self.tape.extend(dict(error_code=10002)), 0)
+
+    def test_ring_buffer_wraps(self):
+        self.tape.extend([trade(i, T0 + i, price=i) for i in range(1, 9)])
+        self.assertEqual(len(self.tape), 5)
+        self.assertEqual([t.tid for t in self.tape.latest()],
+                         [4, 5, 6, 7, 8])
+        self.assertEqual([t.price for t in self.tape.latest(2)], [7, 8])
+        # 被覆盖的成交已移出窗口
+        self.clock.ms = T0 + 8
+        stats = self.tape.stats()
+        self.assertEqual(stats['count'], 5)
+        self.assertEqual(stats['volume'], 5)
+        self.assertEqual(stats['vwap'], 6)
+
+    def test_window_stats(self):
+        self.tape.extend([trade(1, T0, 10, 1, 'buy'),
+                          trade(2, T0 + 1000, 20, 3, 'sell')])
+        self.clock.ms = T0 + 1000
+        self.assertEqual(self.tape.volume, 4)
+        self.assertEqual(self.tape.vwap, 17.5)
+        self.assertEqual(self.tape.imbalance, -0.5)
+        self.tape.extend([trade(3, T0 + 10500, 30, 1, 'buy')])
+        self.clock.ms = T0 + 10500
+        self.assertEqual(self.tape.stats(), dict(
+            count=2, volume=4, buy_volume=1, sell_volume=3, vwap=22.5,
+            imbalance=-0.5))
+
+    def test_window_expires_without_new_trades(self):
+        self.tape.extend([trade(1, T0, 10, 2)])
+        self.clock.ms = T0 + 5000
+        self.assertEqual(self.tape.volume, 2)
+        self.clock.ms = T0 + 11000
+        self.assertEqual(self.tape.volume, 0)
+        self.assertIsNone(self.tape.vwap)
+        self.assertEqual(self.tape.imbalance, 0)
+        self.assertEqual(self.tape.stats()['count'], 0)
+        # 缓冲区不受窗口影响
+        self.assertEqual(len(self.tape), 1)
+
+    def test_bars(self):
+        self.tape.extend([trade(1, T0, 10, 1, 'buy'),
+                          trade(2, T0 + 1000, 12, 2, 'sell'),
+                          trade(3, T0 + 2000, 9, 1, 'buy'),
+                          trade(4, T0 + 61000, 11, 1, 'sell')])
+        ts = T0 - T0 % 60000
+        self.assertEqual(list(self.tape.bars),
+                         [Bar(ts, 10, 12, 9, 9, 4, 2, 2, 3)])
+        self.assertEqual(self.tape.bar, Bar(ts + 60000, 11, 11, 11, 11, 1,
+                                            0, 1, 1))
+
+    def test_numpy_rows(self):
+        rows = np.array([(2, T0, 10.0, 1.0, 1), (1, T0, 11.0, 2.0, -1)],
+                        dtype=[('tid', '<i8'), ('date_ms', '<i8'),
+                               ('price', '<f8'), ('amount', '<f8'),
+                               ('side', '<i1')])
+        self.assertEqual(self.tape.extend(rows), 2)
+        self.assertEqual([t.side for t in self.tape.latest()], [-1, 1])
+
+
+class CollectorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.exchange = Exchange()
+        self.exchange.add_account('key', 'secret')
+        self.transport = SimulatorTransport(self.exchange)
+
+    def spot_trades(self, api, n):
+        for i in range(n):
+            if i % 2:
+                api.trade('ltc_btc', 'buy_market', price=0.0018)
+            else:
+                api.trade('ltc_btc', 'sell_market', amount=0.1)
+
+    def test_spot_pages_with_since(self):
+        api = SpotApi('key', 'secret', session=self.transport)
+        self.spot_trades(api, 10)
+        collector = SpotTradeCollector(api, capacity=5000)
+        self.assertEqual(collector.poll('ltc_btc'), 10)
+        first_tid = collector.tape('ltc_btc').last_tid
+        # 超过一页的新成交需要按since=last_tid继续请求
+        self.spot_trades(api, SPOT_PAGE + 50)
+        added = collector.poll('ltc_btc')
+        self.assertGreater(added, SPOT_PAGE)
+        tape = collector.tape('ltc_btc')
+        tids = [t.tid for t in tape.latest()]
+        self.assertEqual(len(tids), 10 + added)
+        self.assertEqual(tids, list(range(tids[0], tids[0] + len(tids))))
+        self.assertGreater(tids[10], first_tid)
+        self.assertEqual(tape.last_tid, api.trades('ltc_btc')[-1]['tid'])
+        self.assertEqual(collector.poll('ltc_btc'), 0)
+        self.assertEqual(list(collector.tapes()), ['ltc_btc'])
+
+    def test_future_latest_page(self):
+        api = FutureApi('key', 'secret', session=self.transport)
+        ticker = api.ticker('btc_usd', 'quarter')['ticker']
+        collector = FutureTradeCollector(api)
+        for price, type in ((ticker['sell'], 1), (ticker['buy'], 2)):
+            api.trade('btc_usd', 'quarter', price, 1, type)
+        self.assertEqual(collector.poll('btc_usd', 'quarter'), 2)
+        self.assertEqual(collector.poll('btc_usd', 'quarter'), 0)
+        tape = collector.tape('btc_usd', 'quarter')
+        self.assertEqual([t.side for t in tape.latest()], [1, -1])
+        self.assertEqual(tape.volume, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+@File     :test_transport
+"""
+import os
+import gzip
+import shutil
+import tempfile
+import unittest
+
+from okex_restful_api.api_utils import (RecordingTransport, ReplayTransport,
+                                        ReplayServer, ReplayMiss, HttpSession,
+                                        RetryPolicy, Retrier, http_get,
+                                        http_post, rest_api)
+from okex_restful_api.api_utils.transport import request_key
+from okex_restful_api.future_api import FutureApi
+from okex_restful_api.spot_api import SpotApi
+from okex_restful_api.simulator import Exchange, SimulatorTransport
+
+SYMBOL, CONTRACT = 'btc_usd', 'quarter'
+
+
+def simulated():
+    exchange = Exchange()
+    exchange.add_account('key', 'secret')
+    return SimulatorTransport(exchange)
+
+
+class RecordReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_replay_returns_recorded_responses(self):
+        path = os.path.join(self.dir, 'session.jsonl.gz')
+        with RecordingTransport(simulated(), path) as recording:
+            api = FutureApi('key', 'secret', session=recording)
+            recorded = [api.ticker(SYMBOL, CONTRACT),
+                        api.depth(SYMBOL, CONTRACT, 5),
+                        api.userinfo()]
+        self.assertEqual(recording.count, 3)
+
+        replay = ReplayTransport(path=path)
+        # 记录中不含签名, 回放时可以使用任意key
+        api = FutureApi('other', 'keys', session=replay)
+        self.assertEqual([api.ticker(SYMBOL, CONTRACT),
+                          api.depth(SYMBOL, CONTRACT, 5),
+                          api.userinfo()], recorded)
+        self.assertEqual(replay.misses, 0)
+
+    def test_repeated_requests_replay_in_order(self):
+        replay = ReplayTransport()
+        url = rest_api.future.index + '?symbol=btc_usd'
+        for value in (1, 2):
+            replay.add('GET', url, dict(future_index=value))
+        self.assertEqual([replay.get(url).content for _ in range(3)],
+                         [b'{"future_index":1}', b'{"future_index":2}',
+                          b'{"future_index":2}'])
+
+    def test_miss(self):
+        replay = ReplayTransport()
+        with self.assertRaises(ReplayMiss):
+            replay.get(rest_api.future.index + '?symbol=btc_usd')
+        self.assertEqual(replay.misses, 1)
+
+    def test_withdraw_password_is_not_recorded(self):
+        path = os.path.join(self.dir, 'withdraw.jsonl')
+        with RecordingTransport(simulated(), path) as recording:
+            api = SpotApi('key', 'secret', session=recording)
+            resp = api.withdraw('btc', 0.002, 's3cret-pwd', '1Address',
+                                0.01, 'address')
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        self.assertNotIn('s3cret-pwd', text)
+        self.assertNotIn('trade_pwd', text)
+        self.assertNotIn('secret', text)
+        self.assertIn('1Address', text)
+
+        api = SpotApi('key', 'secret', session=ReplayTransport(path=path))
+        self.assertEqual(api.withdraw('btc', 0.002, 'other-pwd', '1Address',
+                                      0.01, 'address'), resp)
+
+    def test_request_key_ignores_domain_and_order(self):
+        self.assertEqual(
+            request_key('POST', 'https://www.okex.com/api/v1/trade.do',
+                        dict(symbol='ltc_btc', type='buy', sign='x')),
+            request_key('POST', 'http://127.0.0.1:1/api/v1/trade.do?'
+                        'type=buy', dict(symbol='ltc_btc', api_key='k')))
+
+    def test_gzip_records(self):
+        path = os.path.join(self.dir, 'ticker.jsonl.gz')
+        with RecordingTransport(simulated(), path) as recording:
+            FutureApi(session=recording).ticker(SYMBOL, CONTRACT)
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+
+class ReplayServerTest(unittest.TestCase):
+
+    def test_replay_over_http(self):
+        replay = ReplayTransport()
+        path = rest_api.future.paths['index']
+        replay.add('GET', path + '?symbol=btc_usd', dict(future_index=8400))
+        replay.add('POST', rest_api.future.paths['userinfo'],
+                   dict(result=True, info={}), params=dict(api_key='k'))
+        retrier = Retrier(policies=dict(public=RetryPolicy(attempts=1)))
+        with ReplayServer(replay) as server, HttpSession() as session:
+            self.assertEqual(http_get(server.url + path, session=session,
+                                      symbol='btc_usd'),
+                             dict(future_index=8400))
+            self.assertEqual(http_post(
+                server.url + rest_api.future.paths['userinfo'],
+                dict(api_key='k', sign='S'), session),
+                dict(result=True, info={}))
+            # 没有记录的请求返回404和error_code
+            self.assertEqual(http_get(server.url + path, session=session,
+                                      retrier=retrier, symbol='ltc_usd'),
+                             dict(error_code=404))
+
+
+if __name__ == '__main__':
+    unittest.main()